@@ -1,3 +1,6 @@
 from .users import User
-from .authtokens import AuthToken
+from .authtokens import AuthToken, TokenRevocations
 from .tasks import Task
+from .taskclosure import TaskClosure
+from .taskversion import TaskVersion, TaskListVersion
+from .replicasticky import ReplicaStickyUser
@@ -1,5 +1,5 @@
 from datetime import datetime
-from sqlalchemy import Column, Integer, String, Text, Boolean, ForeignKey, DateTime, Enum, CHAR
+from sqlalchemy import Column, Integer, String, Text, Boolean, ForeignKey, DateTime, Enum, CHAR, Index
 import enum
 
 from db import SqlAlchemyBase
@@ -59,6 +59,11 @@ class AuthToken(SqlAlchemyBase):
     """
 
     __tablename__ = "auth_tokens"
+    __table_args__ = (
+        Index("ix_auth_tokens_user_id_valid_until", "user_id", "valid_until"),
+        # Expired tokens sweep (token_sweeper.py)
+        Index("ix_auth_tokens_valid_until", "valid_until"),
+    )
     id = Column(CHAR(64), primary_key=True)
     user_id = Column(Integer, ForeignKey("users.id"))
     valid_until = Column(DateTime)
@@ -67,10 +72,12 @@ class AuthToken(SqlAlchemyBase):
     def __str__(self):
         return f"Auth token {self.id} owned by {self.user_id}. Valid until {self.valid_until}."
 
-    def serialize_from_object(self):
-        return {
-            "id": self.id,
-            "access_level": self.access_level.value,
-            "valid_until": self.valid_until.isoformat(),
-            "user_id": self.user_id,
-        }
+
+class TokenRevocations(SqlAlchemyBase):
+    """
+    Counter of revoked auth tokens (one row). Token caches of all workers drop their entries when it changes.
+    """
+
+    __tablename__ = "auth_token_revocations"
+    id = Column(Integer, primary_key=True)
+    generation = Column(Integer, nullable=False, default=0)
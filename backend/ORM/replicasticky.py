@@ -0,0 +1,32 @@
+from sqlalchemy import Column, Integer, ForeignKey, DateTime
+from sqlalchemy.dialects import mysql, postgresql, sqlite
+
+from db import SqlAlchemyBase, get_db_type
+
+
+class ReplicaStickyUser(SqlAlchemyBase):
+    """
+Read-your-writes of API clients with read replicas: reads of the user go to primary until sticky_until.
+Kept in DB, so all workers see it (webapp users carry the deadline in their session cookie instead).
+    """
+
+    __tablename__ = "replica_sticky_users"
+
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    sticky_until = Column(DateTime, nullable=False)
+
+
+def upsert_sticky_until(user_id: int, sticky_until):
+    """
+    :return: INSERT ... ON CONFLICT UPDATE statement for the dialect of primary DB
+    """
+    dialect = get_db_type()
+    table = ReplicaStickyUser.__table__
+    if dialect in ("mysql", "mariadb"):
+        statement = mysql.insert(table).values(user_id=user_id, sticky_until=sticky_until)
+        return statement.on_duplicate_key_update(sticky_until=statement.inserted.sticky_until)
+    insert = postgresql.insert if dialect == "postgresql" else sqlite.insert
+    statement = insert(table).values(user_id=user_id, sticky_until=sticky_until)
+    return statement.on_conflict_do_update(
+        index_elements=[table.c.user_id], set_={"sticky_until": statement.excluded.sticky_until},
+    )
@@ -0,0 +1,100 @@
+from sqlalchemy import Column, Integer, ForeignKey, Index, select, insert, delete, literal, true, event, inspect
+from sqlalchemy.orm import aliased
+
+from db import SqlAlchemyBase
+from .tasks import Task
+
+
+class TaskClosure(SqlAlchemyBase):
+    """
+Closure table of tasks hierarchy: one row for every (ancestor, descendant) pair, including (task, task, 0).
+Maintained by Task mapper events below, rows of deleted tasks are removed by FK cascade.
+    """
+
+    __tablename__ = "task_closure"
+    __table_args__ = (
+        Index("ix_task_closure_descendant_id_depth", "descendant_id", "depth"),
+    )
+
+    ancestor_id = Column(Integer, ForeignKey("tasks.id", ondelete="CASCADE"), primary_key=True)
+    descendant_id = Column(Integer, ForeignKey("tasks.id", ondelete="CASCADE"), primary_key=True)
+    depth = Column(Integer, nullable=False)
+
+
+def link_task(connection, task_id: int, parent_id: int or None):
+    """
+Adds closure rows of new task: itself and all ancestors of its parent.
+    """
+    rows = select(literal(task_id), literal(task_id), literal(0))
+    if parent_id is not None:
+        rows = rows.union_all(
+            select(TaskClosure.ancestor_id, literal(task_id), TaskClosure.depth + 1)
+            .where(TaskClosure.descendant_id == parent_id),
+        )
+    connection.execute(
+        insert(TaskClosure).from_select(["ancestor_id", "descendant_id", "depth"], rows),
+    )
+
+
+def link_tasks(connection, task_ids: [int]):
+    """
+Adds closure rows of tasks inserted without mapper events (bulk INSERT) with one INSERT ... SELECT.
+Parents of the tasks must be already linked.
+    """
+    rows = select(Task.id, Task.id, literal(0)).where(Task.id.in_(task_ids)).union_all(
+        select(TaskClosure.ancestor_id, Task.id, TaskClosure.depth + 1)
+        .join(TaskClosure, TaskClosure.descendant_id == Task.parent)
+        .where(Task.id.in_(task_ids)),
+    )
+    connection.execute(
+        insert(TaskClosure).from_select(["ancestor_id", "descendant_id", "depth"], rows),
+    )
+
+
+def move_task(connection, task_id: int, parent_id: int or None):
+    """
+Moves subtree of task under new parent (None - to the root level).
+    """
+    # Derived tables are materialized, so MariaDB allows reading the changed table (error 1093)
+    subtree = select(TaskClosure.descendant_id).where(TaskClosure.ancestor_id == task_id).subquery("subtree")
+    subtree_ids = select(subtree.c.descendant_id)
+    connection.execute(
+        delete(TaskClosure).where(
+            TaskClosure.descendant_id.in_(subtree_ids),
+            TaskClosure.ancestor_id.notin_(subtree_ids),
+        ),
+    )
+    if parent_id is None:
+        return
+    upper = aliased(TaskClosure)
+    lower = aliased(TaskClosure)
+    connection.execute(
+        insert(TaskClosure).from_select(
+            ["ancestor_id", "descendant_id", "depth"],
+            select(upper.ancestor_id, lower.descendant_id, upper.depth + lower.depth + 1)
+            .select_from(upper)
+            .join(lower, true())
+            .where(upper.descendant_id == parent_id, lower.ancestor_id == task_id),
+        ),
+    )
+
+
+@event.listens_for(Task, "after_insert")
+def _task_inserted(mapper, connection, target):
+    link_task(connection, target.id, target.parent)
+
+
+@event.listens_for(Task, "after_update")
+def _task_updated(mapper, connection, target):
+    if inspect(target).attrs.parent.history.has_changes():
+        move_task(connection, target.id, target.parent)
+
+
+@event.listens_for(Task, "after_delete")
+def _task_deleted(mapper, connection, target):
+    # FK cascade does the same, but SQLite enforces FKs only with PRAGMA foreign_keys
+    connection.execute(
+        delete(TaskClosure).where(
+            (TaskClosure.ancestor_id == target.id) | (TaskClosure.descendant_id == target.id),
+        ),
+    )
@@ -1,6 +1,9 @@
 from datetime import datetime
 
-from sqlalchemy import Column, Integer, String, Text, Boolean, ForeignKey, DateTime, Enum, VARCHAR, Sequence
+from sqlalchemy import Column, Integer, String, Text, Boolean, ForeignKey, DateTime, Enum, VARCHAR, Sequence, Index
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.schema import CreateColumn
+from sqlalchemy.sql.functions import next_value
 
 import enum
 
@@ -105,8 +108,31 @@ READABLE_POLITICS = [
 
 TABLE_ID = Sequence("table_id_seq", start=1000)
 
+
+@compiles(CreateColumn, "sqlite")
+def _create_column_sqlite(element, compiler, **kw):
+    # SQLite has no sequences: id is a rowid alias there and needs no DEFAULT
+    column = element.element
+    default = column.server_default
+    if default is None or not isinstance(getattr(default, "arg", None), next_value):
+        return compiler.visit_create_column(element, **kw)
+    column.server_default = None
+    try:
+        return compiler.visit_create_column(element, **kw)
+    finally:
+        column.server_default = default
+
+
 class Task(SqlAlchemyBase):
     __tablename__ = "tasks"
+    __table_args__ = (
+        Index("ix_tasks_owner_id_status", "owner_id", "status"),
+        Index("ix_tasks_parent", "parent"),
+        Index("ix_tasks_access_politics", "access_politics"),
+        Index("ix_tasks_deadline", "deadline"),
+        Index("ix_tasks_owner_id_id", "owner_id", "id"),
+        Index("ix_tasks_owner_id_deadline_id", "owner_id", "deadline", "id"),
+    )
 
     id = Column(Integer, TABLE_ID, primary_key=True, server_default=TABLE_ID.next_value())
     # id = Column(Integer, primary_key=True, autoincrement="ignore_fk")
@@ -0,0 +1,110 @@
+from sqlalchemy import Column, Integer, BigInteger, VARCHAR, ForeignKey, Select, delete, event, inspect, literal
+from sqlalchemy.dialects import mysql, postgresql, sqlite
+
+from db import SqlAlchemyBase
+from .tasks import Task, READABLE_POLITICS
+
+# Counters of shared tasks are split by owner, so writers of shared tasks don't all update one row
+SHARED_PARTITIONS = 16
+
+
+def user_scope(user_id: int) -> str:
+    return f"user:{user_id}"
+
+
+def shared_scope(owner_id: int) -> str:
+    return f"shared:{owner_id % SHARED_PARTITIONS}"
+
+
+SHARED_SCOPES = [f"shared:{partition}" for partition in range(SHARED_PARTITIONS)]
+
+
+class TaskVersion(SqlAlchemyBase):
+    """
+Change counter of a task, bumped by every write of the task (ETag of GET /tasks/<id>).
+No row - the task wasn't changed since creation. Rows of deleted tasks are removed by FK cascade.
+    """
+
+    __tablename__ = "task_versions"
+
+    task_id = Column(Integer, ForeignKey("tasks.id", ondelete="CASCADE"), primary_key=True)
+    version = Column(BigInteger, nullable=False, default=0)
+
+
+class TaskListVersion(SqlAlchemyBase):
+    """
+Change counters of task lists (ETag of GET /tasks): "user:<id>" - tasks owned by the user,
+"shared:<owner id % SHARED_PARTITIONS>" - tasks readable by other users (before or after the write).
+    """
+
+    __tablename__ = "task_list_versions"
+
+    scope = Column(VARCHAR(32), primary_key=True)
+    version = Column(BigInteger, nullable=False, default=0)
+
+
+def _upsert_increment(connection, table, key: str, keys: list or Select):
+    dialect = connection.dialect.name
+    insert = {"mysql": mysql.insert, "mariadb": mysql.insert, "postgresql": postgresql.insert}.get(
+        dialect, sqlite.insert,
+    )
+    statement = insert(table)
+    if isinstance(keys, Select):
+        # One INSERT ... SELECT ... ON CONFLICT for any number of rows
+        statement = statement.from_select([key, "version"], keys.add_columns(literal(1)))
+    if dialect in ("mysql", "mariadb"):
+        statement = statement.on_duplicate_key_update(version=table.c.version + 1)
+    else:
+        statement = statement.on_conflict_do_update(
+            index_elements=[table.c[key]], set_={"version": table.c.version + 1},
+        )
+    if isinstance(keys, Select):
+        connection.execute(statement)
+    else:
+        # Sorted keys - rows are locked in the same order by concurrent writers
+        connection.execute(statement, [{key: value, "version": 1} for value in sorted(set(keys))])
+
+
+def bump_versions(connection, owner_ids=(), shared: bool = False, task_ids=()):
+    """
+Increments version counters changed by a write in the same transaction.
+    :param connection: connection of the writing session (session.connection())
+    :param owner_ids: owners of written tasks
+    :param shared: a written task is (or was) readable by other users
+    :param task_ids: updated tasks, list of IDs or SELECT of IDs (ordered) for big sets
+    """
+    scopes = [user_scope(owner_id) for owner_id in owner_ids]
+    if shared:
+        scopes.extend(shared_scope(owner_id) for owner_id in owner_ids)
+    if scopes:
+        _upsert_increment(connection, TaskListVersion.__table__, "scope", scopes)
+    if isinstance(task_ids, Select):
+        _upsert_increment(connection, TaskVersion.__table__, "task_id", task_ids)
+    elif task_ids:
+        _upsert_increment(connection, TaskVersion.__table__, "task_id", list(task_ids))
+
+
+def _changed(target) -> bool:
+    state = inspect(target)
+    return any(state.attrs[column.key].history.has_changes() for column in Task.__table__.columns)
+
+
+@event.listens_for(Task, "after_insert")
+def _task_inserted(mapper, connection, target):
+    bump_versions(connection, [target.owner_id], target.access_politics in READABLE_POLITICS)
+
+
+@event.listens_for(Task, "after_update")
+def _task_updated(mapper, connection, target):
+    if not _changed(target):
+        return
+    politics = inspect(target).attrs.access_politics.history
+    shared = any(level in READABLE_POLITICS for level in (*politics.deleted, target.access_politics))
+    bump_versions(connection, [target.owner_id], shared, [target.id])
+
+
+@event.listens_for(Task, "after_delete")
+def _task_deleted(mapper, connection, target):
+    bump_versions(connection, [target.owner_id], target.access_politics in READABLE_POLITICS)
+    # FK cascade does the same, but SQLite enforces FKs only with PRAGMA foreign_keys
+    connection.execute(delete(TaskVersion).where(TaskVersion.task_id == target.id))
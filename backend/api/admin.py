@@ -0,0 +1,27 @@
+from flask import Blueprint, jsonify, Response
+
+from db import get_pool_stats
+from decorators import token_auth
+from .auth import limiter
+from ORM.authtokens import TokensAccessLevels
+from password_hashing import password_hasher
+from startup_report import startup_report
+from token_cache import token_cache
+
+bp = Blueprint("admin", __name__)
+
+
+@bp.route("/admin/metrics", methods=["GET"])
+@token_auth(allow_anonymous=False)
+def metrics(session=None, token_status=None, **kwargs):
+    """Runtime metrics of the worker process which handled the request (admin only)"""
+    if token_status != TokensAccessLevels.EVERYTHING_ADMIN:
+        return Response("Access denied", 403)
+    return jsonify({
+        "token_cache": token_cache.stats(),
+        "db_pool": get_pool_stats(),
+        "startup": startup_report.stats(),
+        "password_hashing": password_hasher.stats(),
+        # Disabled limiter (RATELIMIT_ENABLED=False) has no storage
+        "rate_limit": limiter.storage.stats() if limiter.enabled and hasattr(limiter.storage, "stats") else None,
+    })
@@ -1,14 +1,18 @@
 import hashlib
+import os
 import random
 from datetime import datetime, timedelta, UTC
-from flask import Blueprint, jsonify, request, Response, current_app
+from flask import Blueprint, jsonify, request, Response
 from flask_limiter import Limiter
 from flask_limiter.util import get_remote_address
 
-from werkzeug.security import generate_password_hash, check_password_hash
+from password_hashing import password_hasher, HashingBusy
 
-from db import create_session
+from db import get_session
+from ratelimit_storage import DEFAULT_STORAGE_URI, check_strategy
 from decorators import token_auth
+from token_cache import record_revocation
+from serialization import serialize_token
 
 from ORM.users import User
 from ORM.authtokens import AuthToken, TokensAccessLevels
@@ -16,7 +20,12 @@ from ORM.authtokens import AuthToken, TokensAccessLevels
 bp = Blueprint("auth", __name__)
 
 
-limiter = Limiter(get_remote_address, app=current_app)
+# Attached to the app in app.py. Counters are shared by workers of the host (SQLite file, see ratelimit_storage.py),
+# RATELIMIT_STORAGE_URI=memory:// keeps them per worker, redis://... shares them between hosts.
+RATELIMIT_STORAGE_URI = os.environ.get("RATELIMIT_STORAGE_URI", DEFAULT_STORAGE_URI)
+RATELIMIT_STRATEGY = os.environ.get("RATELIMIT_STRATEGY", "fixed-window")
+check_strategy(RATELIMIT_STORAGE_URI, RATELIMIT_STRATEGY)
+limiter = Limiter(get_remote_address, storage_uri=RATELIMIT_STORAGE_URI, strategy=RATELIMIT_STRATEGY)
 
 @bp.route("/token/create", methods=["POST"])
 @limiter.limit("5 per minute")
@@ -29,14 +38,16 @@ def create_token(session=None, **kwargs):
     access_level = TokensAccessLevels.level_by_id(token_access_level)
     duration = min(request_data.get("duration", 30), 120)
 
-    session = session or create_session()
+    session = session or get_session()
     user = session.query(User).filter_by(username=username).first()
-    if not user or not check_password_hash(user.password_hash, password):
-        session.close()
+    try:
+        password_ok = user is not None and password_hasher.check_user(user, password)
+    except HashingBusy:
+        return Response("Too many login attempts, try again later", 503, headers={"Retry-After": "1"})
+    if not password_ok:
         return Response("Access denied!", 403)
 
     if access_level == TokensAccessLevels.EVERYTHING_ADMIN and not user.is_admin:
-        session.close()
         return Response("Access denied!", 403)
     token = AuthToken()
     token.id = hashlib.blake2s(
@@ -46,10 +57,9 @@ def create_token(session=None, **kwargs):
     token.user_id = user.id
     token.access_level = access_level
     token.valid_until = datetime.now(UTC) + timedelta(hours=1, days=duration)
-    token_serialized = token.serialize_from_object()
+    token_serialized = serialize_token(token)
     session.add(token)
     session.commit()
-    session.close()
 
     res = jsonify(token_serialized)
     res.status_code = 201
@@ -65,20 +75,17 @@ def revoke_token(session=None, token_status:TokensAccessLevels=None, **kwargs):
     username = request_data.get("username", None)
     token = request_data.get("token", None)
     if token is None:
-        if session:
-            session.close()
         return Response("Bad request!, token in request body is missing", 400)
     token = token.split()[1]
     if session is None:
-        session = create_session()
+        session = get_session()
 
     user_obj = session.query(User).filter_by(username=username).first()
     if user_obj is None:
-        session.close()
         return Response("Access denied!", 403)
     token_obj: AuthToken = session.query(AuthToken).filter_by(id=token, user_id=user_obj.id).first()
     session.delete(token_obj)
+    record_revocation(session)
     session.commit()
-    session.close()
     return Response("", 204)
 
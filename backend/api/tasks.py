@@ -1,39 +1,133 @@
 from datetime import datetime, timedelta, UTC
 from flask import Blueprint, jsonify, request, Response
 
-from decorators import token_auth
-from db import create_session
+from decorators import token_auth, replica_reads
+from db import get_session
 from ORM.users import User
 from ORM.tasks import Task, TaskShareLevel, TaskStatus
 from ORM.authtokens import TokensAccessLevels
-
-from tasks import get_user_tasks
+from serialization import serialize_task
+from streaming import streaming_requested, stream_response
+
+from tasks import (
+    get_user_tasks_page,
+    iter_user_tasks,
+    PAGE_ORDERS,
+    get_task_subtree,
+    build_task_tree,
+    share_subtree,
+    is_descendant,
+    MAX_SUBTREE_DEPTH,
+    create_tasks,
+    MAX_BATCH_SIZE,
+    update_tasks,
+    parse_patch,
+    MAX_BULK_IDS,
+    BULK_FILTERS,
+    update_task_returning,
+    delete_task_returning,
+    task_list_etag,
+    task_etag,
+    select_task_with_version,
+    not_modified,
+)
 
 bp = Blueprint("tasks", __name__)
 
 
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+
+
 @bp.route("/tasks", methods=["GET"])
 @token_auth(allow_anonymous=False)
+@replica_reads
 def list_tasks(session=None, token_status=None, user_id=None, **kwargs):
+    """List visible tasks: all as an array (also streamed) or page by page if limit or cursor is given"""
     if session is None:
-        session = create_session()
-    # todo: move params from URL to request body!
-    tasks = get_user_tasks(user_id, session=session, **kwargs)
+        session = get_session()
+
+    args = request.args
+    # Without limit and cursor the response keeps its original shape: array of all tasks
+    paginated = "limit" in args or "cursor" in args
+    try:
+        limit = int(args.get("limit", DEFAULT_PAGE_SIZE))
+        filter_user = int(args["filter_user"]) if args.get("filter_user") else None
+    except ValueError:
+        return Response("Bad request! limit and filter_user must be integers", 400)
+    limit = min(max(limit, 1), MAX_PAGE_SIZE)
+
+    filter_status = args.get("filter_status") or None
+    if filter_status is not None and filter_status not in TaskStatus.__members__:
+        return Response("Bad request! Unknown filter_status", 400)
+
+    # Blank search (e.g. only spaces) is no search at all
+    filter_search = args.get("filter_search", "").strip() or None
+    stream = streaming_requested()
+    order_by = args.get("order_by", "rank" if filter_search and not stream else "id")
+    if order_by not in PAGE_ORDERS or (order_by == "rank" and not filter_search):
+        return Response("Bad request! order_by must be one of: " + ", ".join(PAGE_ORDERS) +
+                        " (rank requires filter_search)", 400)
+    filters = {
+        "write_permission_required": args.get("write_permission_required", "").lower() in ("1", "true", "yes"),
+        "filter_user": filter_user,
+        "filter_status": filter_status,
+        "filter_search": filter_search,
+    }
 
-    session.close()
-    return jsonify(tasks)
+    if stream:
+        if order_by != "id":
+            return Response("Bad request! Stream supports only order_by=id", 400)
+        try:
+            tasks = iter_user_tasks(user_id, session=session, cursor=args.get("cursor") or None, **filters)
+        except ValueError:
+            return Response("Bad request! Invalid cursor", 400)
+        if isinstance(tasks, int):
+            return Response("Access denied" if tasks == 403 else "User not found", tasks)
+        if not paginated:
+            return stream_response(tasks, session)
+        # Same shape as a page (keys are sorted like in jsonify output)
+        return stream_response(tasks, session, head='{"next_cursor":null,"tasks":[', tail="]}")
+
+    # filter_user (admins only) depends on other user's data and admin flag, it isn't cached
+    etag = None
+    if filter_user is None:
+        etag = task_list_etag(session, user_id, TokensAccessLevels.id_by_level(token_status))
+        cached = not_modified(etag)
+        if cached is not None:
+            return cached
+
+    try:
+        page = get_user_tasks_page(
+            user_id,
+            session=session,
+            limit=limit if paginated else None,
+            cursor=args.get("cursor") or None,
+            order_by=order_by,
+            **filters,
+        )
+    except ValueError:
+        return Response("Bad request! Invalid cursor", 400)
+
+    if isinstance(page, int):
+        return Response("Access denied" if page == 403 else "User not found", page)
+    tasks, next_cursor = page
+    response = jsonify({"tasks": tasks, "next_cursor": next_cursor} if paginated else tasks)
+    if etag is not None:
+        response.set_etag(etag)
+    return response
 
 
 @bp.route("/tasks/<int:id>", methods=["GET"])
 @token_auth(allow_anonymous=True)
+@replica_reads
 def get_task(id, session=None, token_status=None, user_id=None, **kwargs):
     """Get a specific task"""
     if session is None:
-        session = create_session()
+        session = get_session()
 
-    task = session.query(Task).filter_by(id=id).first()
+    task = session.execute(select_task_with_version(id)).first()
     if not task:
-        session.close()
         return Response("Task not found", 404)
 
     # Check permission
@@ -47,27 +141,56 @@ def get_task(id, session=None, token_status=None, user_id=None, **kwargs):
             TaskShareLevel.RW_ONLY_1_LEVELS,
             TaskShareLevel.RW_ONLY_2_LEVELS,
         ]:
-            session.close()
             return Response("Access denied", 403)
     elif token_status != TokensAccessLevels.EVERYTHING_ADMIN and task.owner_id != user_id:
         # Non-admin user trying to access another user's private task
         if task.access_politics == TaskShareLevel.PRIVATE:
-            session.close()
             return Response("Access denied", 403)
 
-    task_data = {
-        "id": task.id,
-        "owner_id": task.owner_id,
-        "parent": task.parent,
-        "title": task.title,
-        "description": task.description,
-        "status": task.status.value,
-        "access_politics": task.access_politics.name,
-        "creation_date": task.creation_date.isoformat(),
-        "deadline": task.deadline.isoformat() if task.deadline else None,
-    }
-    session.close()
-    return jsonify(task_data)
+    etag = task_etag(task, user_id, TokensAccessLevels.id_by_level(token_status) if token_status is not None else None)
+    cached = not_modified(etag)
+    if cached is not None:
+        return cached
+
+    task_data = serialize_task(task)
+    response = jsonify(task_data)
+    response.set_etag(etag)
+    return response
+
+
+@bp.route("/tasks/<int:id>/subtree", methods=["GET"])
+@token_auth(allow_anonymous=True)
+@replica_reads
+def get_task_subtree_view(id, session=None, token_status=None, user_id=None, **kwargs):
+    """Get a task with its descendants (nested tree or flat list with depth)"""
+    try:
+        max_depth = int(request.args.get("max_depth", MAX_SUBTREE_DEPTH))
+    except ValueError:
+        return Response("Bad request! max_depth must be integer", 400)
+    if max_depth < 0:
+        return Response("Bad request! max_depth must be positive", 400)
+    response_format = request.args.get("format", "tree")
+    if response_format not in ("tree", "flat"):
+        return Response("Bad request! format must be tree or flat", 400)
+
+    if session is None:
+        session = get_session()
+
+    tasks = get_task_subtree(
+        id,
+        session,
+        user_id=user_id,
+        is_admin=token_status == TokensAccessLevels.EVERYTHING_ADMIN,
+        max_depth=max_depth,
+    )
+    if tasks == 404:
+        return Response("Task not found", 404)
+    if tasks == 403:
+        return Response("Access denied", 403)
+
+    if response_format == "flat":
+        return jsonify(tasks)
+    return jsonify(build_task_tree(tasks)[0])
 
 
 @bp.route("/tasks", methods=["POST"])
@@ -75,16 +198,13 @@ def get_task(id, session=None, token_status=None, user_id=None, **kwargs):
 def create_task(session=None, token_status=None, user_id=None, **kwargs):
     """Create a new task"""
     if token_status is None or token_status < TokensAccessLevels.READ_CREATE:
-        if session:
-            session.close()
         return Response("Access denied - insufficient permissions", 403)
 
     if session is None:
-        session = create_session()
+        session = get_session()
 
     data = request.get_json()
     if not data or "title" not in data:
-        session.close()
         return Response("Missing required fields", 400)
 
     task = Task()
@@ -109,102 +229,190 @@ def create_task(session=None, token_status=None, user_id=None, **kwargs):
         try:
             task.deadline = datetime.fromisoformat(data.get("deadline"))
         except ValueError:
-            session.close()
             return Response("Invalid date format for deadline", 400)
 
     session.add(task)
     session.commit()
 
-    task_data = {
-        "id": task.id,
-        "owner_id": task.owner_id,
-        "parent": task.parent,
-        "title": task.title,
-        "description": task.description,
-        "status": task.status.value,
-        "access_politics": task.access_politics.name,
-        "creation_date": task.creation_date.isoformat(),
-        "deadline": task.deadline.isoformat() if task.deadline else None,
-    }
-    session.close()
+    task_data = serialize_task(task)
     return jsonify(task_data), 201
 
 
+@bp.route("/tasks/batch", methods=["POST"])
+@token_auth(allow_anonymous=False)
+def create_tasks_batch(session=None, token_status=None, user_id=None, **kwargs):
+    """Create many tasks in one transaction"""
+    if token_status is None or token_status < TokensAccessLevels.READ_CREATE:
+        return Response("Access denied - insufficient permissions", 403)
+
+    if session is None:
+        session = get_session()
+
+    data = request.get_json()
+    if not isinstance(data, list) or not data:
+        return Response("Expected non-empty array of tasks", 400)
+    if len(data) > MAX_BATCH_SIZE:
+        return Response(f"Too many tasks in batch (max {MAX_BATCH_SIZE})", 400)
+
+    try:
+        ids = create_tasks(session, user_id, data)
+    except ValueError as e:
+        session.rollback()
+        return Response(str(e), 400)
+    session.commit()
+    return jsonify({"ids": ids}), 201
+
+
+@bp.route("/tasks", methods=["PATCH"])
+@token_auth(allow_anonymous=False)
+def update_tasks_bulk(session=None, token_status=None, user_id=None, **kwargs):
+    """Apply the same field patch to many tasks (by ids or by filter)"""
+    if token_status is None or token_status < TokensAccessLevels.READ_UPDATE:
+        return Response("Access denied - insufficient permissions", 403)
+
+    if session is None:
+        session = get_session()
+
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict) or ("ids" in data) == ("filter" in data):
+        return Response("Bad request! Either ids or filter required", 400)
+    try:
+        values = parse_patch(data.get("patch"))
+    except ValueError as e:
+        return Response(f"Bad request! {e}", 400)
+
+    ids = data.get("ids")
+    filters = data.get("filter")
+    if ids is not None and (
+        not isinstance(ids, list)
+        or not ids
+        or len(ids) > MAX_BULK_IDS
+        or not all(isinstance(task_id, int) and not isinstance(task_id, bool) for task_id in ids)
+    ):
+        return Response(f"Bad request! ids must be a list of 1-{MAX_BULK_IDS} task IDs", 400)
+    if filters is not None and (
+        not isinstance(filters, dict)
+        or not filters
+        or any(key not in BULK_FILTERS for key in filters)
+        or ("status" in filters and filters["status"] not in [status.value for status in TaskStatus])
+        or ("parent" in filters and filters["parent"] is not None and not isinstance(filters["parent"], int))
+    ):
+        return Response(f"Bad request! filter supports {', '.join(BULK_FILTERS)}", 400)
+
+    result = update_tasks(
+        session,
+        user_id,
+        token_status == TokensAccessLevels.EVERYTHING_ADMIN,
+        values,
+        ids=ids,
+        filters=filters,
+    )
+    session.commit()
+    return jsonify(result)
+
+
 @bp.route("/tasks/<int:id>", methods=["PUT"])
 @token_auth(allow_anonymous=False)
 def update_task(id, session=None, token_status=None, user_id=None, **kwargs):
     """Update a task"""
     if token_status is None:
-        if session:
-            session.close()
         return Response("Authentication required", 401)
 
     if session is None:
-        session = create_session()
-
-    task = session.query(Task).filter_by(id=id).first()
-    if not task:
-        session.close()
-        return Response("Task not found", 404)
-
-    # Check permission
-    if token_status != TokensAccessLevels.EVERYTHING_ADMIN and task.owner_id != user_id:
-        # Check if the task is shared with write access
-        if task.access_politics not in [
-            TaskShareLevel.RW_ALL,
-            TaskShareLevel.RW_ONLY_1_LEVELS,
-            TaskShareLevel.RW_ONLY_2_LEVELS,
-        ]:
-            session.close()
-            return Response("Access denied", 403)
+        session = get_session()
 
     data = request.get_json()
     if not data:
-        session.close()
         return Response("No data provided", 400)
 
-    # Update fields
-    if "title" in data:
-        task.title = data.get("title")
-
-    if "description" in data:
-        task.description = data.get("description")
+    is_admin = token_status == TokensAccessLevels.EVERYTHING_ADMIN
+    values = {key: data.get(key) for key in ("title", "description") if key in data}
+    owner_values = {}
 
     if "status" in data and data["status"] in [status.value for status in TaskStatus]:
-        task.status = TaskStatus(data.get("status"))
+        values["status"] = TaskStatus(data.get("status"))
 
     # Only owner or admin can change access politics
-    if "access_politics" in data and (token_status == TokensAccessLevels.EVERYTHING_ADMIN or task.owner_id == user_id):
-        if data["access_politics"] in [level.name for level in TaskShareLevel]:
-            task.access_politics = TaskShareLevel[data.get("access_politics")]
-
-    if "parent" in data:
-        task.parent = data.get("parent")
+    if "access_politics" in data and data["access_politics"] in [level.name for level in TaskShareLevel]:
+        owner_values["access_politics"] = TaskShareLevel[data.get("access_politics")]
 
     if "deadline" in data:
         try:
-            task.deadline = datetime.fromisoformat(data.get("deadline"))
-        except ValueError:
-            session.close()
+            values["deadline"] = datetime.fromisoformat(data.get("deadline"))
+        except (TypeError, ValueError):
             return Response("Invalid date format for deadline", 400)
 
+    if "parent" not in data and (values or owner_values):
+        # Permission check and update in one statement
+        task = update_task_returning(session, id, user_id, is_admin, values, owner_values)
+        if task == 404:
+            return Response("Task not found", 404)
+        if task == 403:
+            return Response("Access denied", 403)
+    else:
+        # Moving task needs cycle check and task_closure update by mapper events
+        task = session.query(Task).filter_by(id=id).first()
+        if not task:
+            return Response("Task not found", 404)
+
+        # Check permission
+        if not is_admin and task.owner_id != user_id:
+            # Check if the task is shared with write access
+            if task.access_politics not in [
+                TaskShareLevel.RW_ALL,
+                TaskShareLevel.RW_ONLY_1_LEVELS,
+                TaskShareLevel.RW_ONLY_2_LEVELS,
+            ]:
+                return Response("Access denied", 403)
+
+        for key, value in values.items():
+            setattr(task, key, value)
+        if is_admin or task.owner_id == user_id:
+            for key, value in owner_values.items():
+                setattr(task, key, value)
+
+        if "parent" in data:
+            parent = data.get("parent")
+            if parent is not None and is_descendant(session, task.id, parent):
+                return Response("Task can't be moved under itself or its descendant", 400)
+            task.parent = parent
+
     session.commit()
 
-    task_data = {
-        "id": task.id,
-        "owner_id": task.owner_id,
-        "parent": task.parent,
-        "title": task.title,
-        "description": task.description,
-        "status": task.status.value,
-        "access_politics": task.access_politics.name,
-        "creation_date": task.creation_date.isoformat(),
-        "deadline": task.deadline.isoformat() if task.deadline else None,
-    }
-    session.close()
+    task_data = serialize_task(task)
     return jsonify(task_data)
 
 
+@bp.route("/tasks/<int:id>/share", methods=["PUT"])
+@token_auth(allow_anonymous=False)
+def share_task(id, session=None, token_status=None, user_id=None, **kwargs):
+    """Set share level of a task and its descendants"""
+    if token_status is None or token_status < TokensAccessLevels.READ_UPDATE:
+        return Response("Access denied - insufficient permissions", 403)
+
+    if session is None:
+        session = get_session()
+
+    data = request.get_json(silent=True)
+    if not data or data.get("access_politics") not in TaskShareLevel.__members__:
+        return Response("Bad request! Valid access_politics required", 400)
+    share_level = TaskShareLevel[data["access_politics"]]
+    if share_level == TaskShareLevel.PARENT_SELECT:
+        return Response("Bad request! PARENT_SELECT can't be propagated", 400)
+
+    task = session.query(Task).filter_by(id=id).first()
+    if not task:
+        return Response("Task not found", 404)
+
+    # Only owner or admin can change access politics
+    if token_status != TokensAccessLevels.EVERYTHING_ADMIN and task.owner_id != user_id:
+        return Response("Access denied", 403)
+
+    updated = share_subtree(session, task, share_level)
+    session.commit()
+    return jsonify({"id": id, "access_politics": share_level.name, "updated": updated})
+
+
 @bp.route("/tasks/<int:id>", methods=["DELETE"])
 @token_auth(allow_anonymous=False)
 def delete_task(id, session=None, token_status=None, user_id=None, **kwargs):
@@ -213,19 +421,14 @@ def delete_task(id, session=None, token_status=None, user_id=None, **kwargs):
         return Response("Authentication required", 401)
 
     if session is None:
-        session = create_session()
+        session = get_session()
 
-    task = session.query(Task).filter_by(id=id).first()
-    if not task:
-        session.close()
+    # Permission check and delete in one statement
+    error = delete_task_returning(session, id, user_id, token_status == TokensAccessLevels.EVERYTHING_ADMIN)
+    if error == 404:
         return Response("Task not found", 404)
-
-    # Check permission
-    if token_status != TokensAccessLevels.EVERYTHING_ADMIN and task.owner_id != user_id:
-        session.close()
+    if error == 403:
         return Response("Access denied", 403)
 
-    session.delete(task)
     session.commit()
-    session.close()
     return Response("", 204)
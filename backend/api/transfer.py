@@ -0,0 +1,70 @@
+import gzip
+
+from flask import Blueprint, request, Response
+
+from decorators import token_auth, replica_reads
+from db import get_session
+from ORM.authtokens import TokensAccessLevels
+from data_export import export_chunks, gzip_chunks, EXPORT_SECTIONS, EXPORT_MIMETYPES
+from serialization import dumps
+from streaming import stream_chunks, NDJSON_MIMETYPE
+from tasks import TaskImporter, read_records
+
+bp = Blueprint("transfer", __name__)
+
+
+@bp.route("/export", methods=["GET"])
+@token_auth(allow_anonymous=False)
+@replica_reads
+def export_data(session=None, token_status=None, user_id=None, **kwargs):
+    """Stream own user and tasks (everything for admin tokens) as NDJSON or CSV"""
+    if session is None:
+        session = get_session()
+
+    export_format = request.args.get("format", "ndjson")
+    sections = request.args.get("sections", ",".join(EXPORT_SECTIONS)).split(",")
+    try:
+        chunks = export_chunks(
+            session,
+            export_format,
+            sections,
+            owner_id=None if token_status == TokensAccessLevels.EVERYTHING_ADMIN else user_id,
+            cursor=request.args.get("cursor") or None,
+        )
+    except ValueError as e:
+        return Response(f"Bad request! {e}", 400)
+
+    compress = "gzip" in request.accept_encodings
+    response = stream_chunks(gzip_chunks(chunks) if compress else chunks, session, EXPORT_MIMETYPES[export_format])
+    response.headers["Content-Disposition"] = f"attachment; filename=export.{export_format}"
+    response.vary.add("Accept-Encoding")
+    if compress:
+        response.headers["Content-Encoding"] = "gzip"
+    return response
+
+
+@bp.route("/import", methods=["POST"])
+@token_auth(allow_anonymous=False)
+def import_data(session=None, token_status=None, user_id=None, **kwargs):
+    """Create tasks from NDJSON or CSV dump (format of /export) read from the request body as a stream"""
+    if token_status is None or token_status < TokensAccessLevels.READ_CREATE:
+        return Response("Access denied - insufficient permissions", 403)
+
+    if session is None:
+        session = get_session()
+
+    import_format = request.args.get("format") or ("csv" if request.mimetype == "text/csv" else "ndjson")
+    keep_owners = request.args.get("keep_owners", "").lower() in ("1", "true", "yes")
+    if keep_owners and token_status != TokensAccessLevels.EVERYTHING_ADMIN:
+        return Response("Access denied - keep_owners requires admin token", 403)
+    body = request.stream
+    if request.content_encoding == "gzip":
+        body = gzip.GzipFile(fileobj=body, mode="rb")
+    try:
+        records = read_records(body, import_format)
+    except ValueError as e:
+        return Response(f"Bad request! {e}", 400)
+
+    # Body is read while the response is streamed: progress and errors reach the client during the import
+    events = TaskImporter(session, user_id, keep_owners).run(records)
+    return stream_chunks((dumps(event) + "\n" for event in events), session, NDJSON_MIMETYPE)
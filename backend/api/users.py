@@ -1,70 +1,61 @@
 from flask import Blueprint, jsonify, request, Response
-from werkzeug.security import generate_password_hash, check_password_hash
+from sqlalchemy import select
+from password_hashing import password_hasher, HashingBusy
 
-from decorators import token_auth
-from db import create_session
+from decorators import token_auth, replica_reads
+from db import get_session
 from ORM.users import User
 from ORM.authtokens import TokensAccessLevels
+from ORM.taskversion import bump_versions
+from serialization import serialize_user, USER_COLUMNS
+from streaming import streaming_requested, stream_response, STREAM_CHUNK_SIZE
 
 bp = Blueprint("users", __name__)
 
 
 @bp.route("/users", methods=["GET"])
 @token_auth(allow_anonymous=False)
+@replica_reads
 def get_users(token_status=None, user_id=None, session=None, **kwargs):
     """Get user(s) - regular users can only see their own data, admins can see all users"""
     if session is None:
-        session = create_session()
+        session = get_session()
 
     # Check if admin is requesting all users
     if token_status == TokensAccessLevels.EVERYTHING_ADMIN:
-        users = session.query(User).all()
-        users_data = [{"id": user.id, "username": user.username, "email": user.email,
-                      "created_at": user.created_at.isoformat(), "is_admin": user.is_admin}
-                     for user in users]
-        session.close()
+        if streaming_requested():
+            rows = session.execute(
+                select(*USER_COLUMNS).order_by(User.id).execution_options(yield_per=STREAM_CHUNK_SIZE),
+            )
+            return stream_response((serialize_user(user) for user in rows), session)
+        users = session.execute(select(*USER_COLUMNS)).all()
+        users_data = [serialize_user(user) for user in users]
         return jsonify(users_data)
 
     # Regular user can only see their own data
-    user = session.query(User).filter_by(id=user_id).first()
+    user = session.execute(select(*USER_COLUMNS).where(User.id == user_id)).first()
     if not user:
-        session.close()
         return Response("User not found", 404)
-    res = jsonify({
-        "id": user.id,
-        "username": user.username,
-        "email": user.email,
-        "created_at": user.created_at.isoformat(),
-        "is_admin": user.is_admin,
-    })
-    session.close()
+    res = jsonify(serialize_user(user))
     return res
 
 
 @bp.route("/users/<int:id>", methods=["GET"])
 @token_auth(allow_anonymous=False)
+@replica_reads
 def get_user(id, token_status=None, user_id=None, session=None, **kwargs):
     """Get a specific user - users can only see themselves, admins can see any user"""
     if session is None:
-        session = create_session()
+        session = get_session()
 
     # Regular users can only see their own data
     if token_status != TokensAccessLevels.EVERYTHING_ADMIN and id != user_id:
-        session.close()
         return Response("Access denied", 403)
 
-    user = session.query(User).filter_by(id=id).first()
+    user = session.execute(select(*USER_COLUMNS).where(User.id == id)).first()
     if not user:
-        session.close()
         return Response("User not found", 404)
-    res = jsonify({
-        "id": user.id,
-        "username": user.username,
-        "email": user.email,
-        "created_at": user.created_at.isoformat(),
-        "is_admin": user.is_admin,
-    })
-    session.close()
+    res = jsonify(serialize_user(user))
     return res
 
 
@@ -73,43 +64,34 @@ def get_user(id, token_status=None, user_id=None, session=None, **kwargs):
 def create_user(token_status=None, user_id=None, session=None, **kwargs):
     """Create a new user - only admins can create users through API"""
     if token_status != TokensAccessLevels.EVERYTHING_ADMIN:
-        if session:
-            session.close()
         return Response("Access denied", 403)
 
     if session is None:
-        session = create_session()
+        session = get_session()
 
     data = request.get_json()
     if not data or not all(k in data for k in ("username", "email", "password")):
-        session.close()
         return Response("Missing required fields", 400)
 
     # Check if username or email already exists
     if session.query(User).filter_by(username=data["username"]).first():
-        session.close()
         return Response("Username already exists", 400)
     if session.query(User).filter_by(email=data["email"]).first():
-        session.close()
         return Response("Email already exists", 400)
 
     # Create new user
     user = User()
     user.username = data["username"]
     user.email = data["email"]
-    user.password_hash = generate_password_hash(data["password"])
+    try:
+        user.password_hash = password_hasher.hash(data["password"])
+    except HashingBusy:
+        return Response("Server is busy, try again later", 503, headers={"Retry-After": "1"})
     user.is_admin = data.get("is_admin", False)
 
     session.add(user)
     session.commit()
-    res = jsonify({
-        "id": user.id,
-        "username": user.username,
-        "email": user.email,
-        "created_at": user.created_at.isoformat(),
-        "is_admin": user.is_admin,
-    }), 201
-    session.close()
+    res = jsonify(serialize_user(user)), 201
     return res
 
 
@@ -118,54 +100,45 @@ def create_user(token_status=None, user_id=None, session=None, **kwargs):
 def update_user(id, token_status=None, user_id=None, session=None, **kwargs):
     """Update user - users can update only their own data, admins can update any user"""
     if token_status != TokensAccessLevels.EVERYTHING_ADMIN and id != user_id:
-        if session:
-            session.close()
         return Response("Access denied", 403)
 
     if session is None:
-        session = create_session()
+        session = get_session()
 
     user = session.query(User).filter_by(id=id).first()
     if not user:
-        session.close()
         return Response("User not found", 404)
 
     data = request.get_json()
     if not data:
-        session.close()
         return Response("No data provided", 400)
 
     # Update fields
     if "username" in data:
         existing = session.query(User).filter_by(username=data["username"]).first()
         if existing and existing.id != id:
-            session.close()
             return Response("Username already exists", 400)
         user.username = data["username"]
 
     if "email" in data:
         existing = session.query(User).filter_by(email=data["email"]).first()
         if existing and existing.id != id:
-            session.close()
             return Response("Email already exists", 400)
         user.email = data["email"]
 
     if "password" in data:
-        user.password_hash = generate_password_hash(data["password"])
+        try:
+            user.password_hash = password_hasher.hash(data["password"])
+        except HashingBusy:
+            session.rollback()
+            return Response("Server is busy, try again later", 503, headers={"Retry-After": "1"})
 
     # Only admins can change admin status
     if "is_admin" in data and token_status == TokensAccessLevels.EVERYTHING_ADMIN:
         user.is_admin = data["is_admin"]
 
     session.commit()
-    res = jsonify({
-        "id": user.id,
-        "username": user.username,
-        "email": user.email,
-        "created_at": user.created_at.isoformat(),
-        "is_admin": user.is_admin,
-    })
-    session.close()
+    res = jsonify(serialize_user(user))
     return res
 
 
@@ -174,19 +147,17 @@ def update_user(id, token_status=None, user_id=None, session=None, **kwargs):
 def delete_user(id, token_status=None, user_id=None, session=None, **kwargs):
     """Delete user - only admins can delete users"""
     if token_status != TokensAccessLevels.EVERYTHING_ADMIN:
-        if session:
-            session.close()
         return Response("Access denied", 403)
 
     if session is None:
-        session = create_session()
+        session = get_session()
 
     user = session.query(User).filter_by(id=id).first()
     if not user:
-        session.close()
         return Response("User not found", 404)
 
+    # Shared tasks of the user disappear from task lists of other users
+    bump_versions(session.connection(), [user.id], True)
     session.delete(user)
     session.commit()
-    session.close()
     return Response("", 204)
@@ -2,27 +2,41 @@ import sys
 import os
 import hashlib
 import logging
-from flask_swagger_ui import get_swaggerui_blueprint
-from flask_wtf.csrf import CSRFProtect, CSRFError
-from flask_cors import CORS
+
+from startup_report import startup_report
+
+startup_report.track_imports()
+
+with startup_report.step("import extensions"):
+    from flask_wtf.csrf import CSRFProtect, CSRFError
+    from flask_cors import CORS
 
 if os.environ.get("DOTENV", False):
     from dotenv import load_dotenv
     load_dotenv()
 
 
-from flask import Flask, get_flashed_messages, redirect, url_for, render_template, request, session, jsonify
-from db import global_init, create_session
+with startup_report.step("import db"):
+    from werkzeug.middleware.proxy_fix import ProxyFix
+    from flask import Flask, get_flashed_messages, redirect, url_for, render_template, request, session, jsonify
+    from db import global_init, create_session, close_request_session, production_mode
 
-from decorators import token_auth
+    from decorators import token_auth
+    from token_sweeper import token_sweeper
+    from serialization import FastJSONProvider
 
-from api import bp as api_bp
-from webapp import bp as webapp_bp
+with startup_report.step("import api"):
+    from api import bp as api_bp
+    from api.auth import limiter
+with startup_report.step("import webapp"):
+    from webapp import bp as webapp_bp
 
 URL_PREFIX = os.environ.get("URL_PREFIX", "")
 
 app = Flask(__name__, static_url_path=F"{URL_PREFIX}/static")
 app.secret_key = os.environ.get("SECRET_KEY", hashlib.sha256(os.urandom(24)).hexdigest())
+# orjson (if installed) for jsonify and request.get_json
+app.json = FastJSONProvider(app)
 
 # Enable CORS for all routes
 CORS(
@@ -51,74 +65,56 @@ app.config["PERMANENT_SESSION_LIFETIME"] = 7200  # 120 minutes in seconds
 app.config["WTF_CSRF_SSL_STRICT"] = False  # Allow CSRF protection on non-HTTPS connections
 app.config["WTF_CSRF_TIME_LIMIT"] = 7200  # Set CSRF token timeout to 2 hours
 
+# Client address from X-Forwarded-For set by this many reverse proxies (nginx), used by rate limits
+TRUSTED_PROXIES = int(os.environ.get("TRUSTED_PROXIES", 0))
+if TRUSTED_PROXIES:
+    app.wsgi_app = ProxyFix(app.wsgi_app, x_for=TRUSTED_PROXIES)
+
+app.config["RATELIMIT_ENABLED"] = os.environ.get("RATELIMIT_ENABLED", "True").upper() in ("TRUE", "YES", "1")
+limiter.init_app(app)
+
 # CSRF configuration
 csrf = CSRFProtect(app)  # Initialize with app directly
 
-# Exempt API blueprint from CSRF protection
-csrf.exempt(api_bp)
-
 # Register blueprints
 app.register_blueprint(api_bp)
 app.register_blueprint(webapp_bp)
 
-SWAGGER_URL = F"{URL_PREFIX}/api/v1/docs"
-API_URL = F"{URL_PREFIX}/static/openapi.yaml"
-
-swaggerui_blueprint = get_swaggerui_blueprint(
-    SWAGGER_URL,
-    API_URL,
-    config={"app_name": "ToDo list service API"},
-)
-app.register_blueprint(swaggerui_blueprint, url_prefix=SWAGGER_URL)
-csrf.exempt(swaggerui_blueprint)
-
-# Create API view endpoints array for manual exemption - make sure this comes AFTER api_bp registration
-api_views = []
-for rule in app.url_map.iter_rules():
-    if rule.rule.startswith(f"{URL_PREFIX}/api/"):
-        api_views.append(app.view_functions[rule.endpoint])
-
-# Now initialize CSRF with app and exempt API endpoints
-csrf.init_app(app)
-# Exempt individual API view functions
-for view in api_views:
-    csrf.exempt(view)
+# DB sessions of both blueprints are request scoped
+app.teardown_appcontext(close_request_session)
+app.before_request(startup_report.request_started)
+
+# Swagger UI is imported only if enabled, debug routes - only outside of production mode
+if os.environ.get("SWAGGER_UI", "True").upper() in ("TRUE", "YES", "1"):
+    with startup_report.step("swagger ui"):
+        from flask_swagger_ui import get_swaggerui_blueprint
+
+        SWAGGER_URL = F"{URL_PREFIX}/api/v1/docs"
+        API_URL = F"{URL_PREFIX}/static/openapi.yaml"
+
+        swaggerui_blueprint = get_swaggerui_blueprint(
+            SWAGGER_URL,
+            API_URL,
+            config={"app_name": "ToDo list service API"},
+        )
+        app.register_blueprint(swaggerui_blueprint, url_prefix=SWAGGER_URL)
+        csrf.exempt(swaggerui_blueprint)
+
+DEBUG_ROUTES = not production_mode()
+if DEBUG_ROUTES:
+    from debug_routes import bp as debug_bp
+    app.register_blueprint(debug_bp)
+
+# Exempt API from CSRF protection. Exemption of a blueprint doesn't cover its nested blueprints
+# (request.blueprint is "api.tasks"), so every API blueprint is exempted - one pass, no url_map walk.
+for name, blueprint in app.blueprints.items():
+    if name == "api" or name.startswith("api."):
+        csrf.exempt(blueprint)
 
 @app.route(F"{URL_PREFIX}/")
 def index():
     return redirect(url_for("webapp.todo.todo_list"))
 
-@app.route(F"{URL_PREFIX}/debug/session", methods=["GET"])
-def debug_session():
-    """Debug route to check session handling"""
-
-    # Set a test value in session
-    session["test_value"] = "Session is working"
-
-    # Return current session data
-    return jsonify({
-        "session_data": dict(session),
-        "cookies": dict(request.cookies),
-        "csrf_token": csrf._get_csrf_token(),
-        "headers": dict(request.headers),
-    })
-
-@app.route(F"{URL_PREFIX}/debug/csrf", methods=["GET"])
-def debug_csrf():
-    """Debug route to reset CSRF protection"""
-    from flask import jsonify
-
-    # Generate and set a new CSRF token
-    csrf_token = csrf._get_csrf_token()
-
-    # Return current token
-    return jsonify({
-        "new_csrf_token": csrf_token,
-        "session_csrf_token": session.get("csrf_token", None),
-        "session_data": dict(session),
-        "cookies": dict(request.cookies),
-    })
-
 # Error handlers
 @app.errorhandler(401)
 def unauthorized(error):
@@ -161,14 +157,18 @@ def analytics_env__vars():
     return dict(
         RYBBIT_SCRIPT=os.environ.get("RYBBIT_SCRIPT", False),
         RYBBIT_SITE_ID=os.environ.get("RYBBIT_SITE_ID", False),
+        DEBUG_ROUTES=DEBUG_ROUTES,
                 )
 
 
-global_init()
+with startup_report.step("global_init"):
+    global_init()
 logging.basicConfig(
     level=logging.INFO,
     format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
 )
+token_sweeper.start()
+startup_report.ready()
 
 if __name__ == "__main__":
     session = create_session()
@@ -0,0 +1,90 @@
+"""
+Before/after timings of the secondary indexes of tasks and auth_tokens tables.
+
+Usage (from backend directory, scratch DB only!):
+    DB_TYPE=sqlite DB_FILE_PATH=/tmp/bench.sqlite3 python -m benchmarks.bench_indexes --tasks 1000000
+"""
+import argparse
+import random
+from datetime import datetime
+
+from sqlalchemy import select
+
+from ORM.authtokens import AuthToken
+from ORM.tasks import Task, TaskStatus, READABLE_POLITICS
+
+from .common import init_bench_db, seed, measure, print_table
+
+BENCH_TABLES = ("tasks", "auth_tokens")
+
+
+def run_queries(session, user_ids, task_ids, repeats):
+    rnd = random.Random(31)
+    users = [(rnd.choice(user_ids),) for _ in range(repeats)]
+    parents = [(rnd.choice(task_ids),) for _ in range(repeats)]
+    now = datetime.now()
+
+    def owner_status(user_id):
+        session.execute(
+            select(Task.id, Task.title).where(Task.owner_id == user_id, Task.status == TaskStatus.PENDING),
+        ).all()
+
+    def owner_all(user_id):
+        session.execute(select(Task.id, Task.title, Task.status, Task.parent).where(Task.owner_id == user_id)).all()
+
+    def children(task_id):
+        session.execute(select(Task.id).where(Task.parent == task_id)).all()
+
+    def shared():
+        session.execute(select(Task.id).where(Task.access_politics.in_(READABLE_POLITICS))).all()
+
+    def tokens(user_id):
+        session.execute(
+            select(AuthToken.id).where(AuthToken.user_id == user_id, AuthToken.valid_until >= now),
+        ).all()
+
+    return [
+        ("owner_id + status (PENDING)", measure(owner_status, users)),
+        ("owner_id (todo page)", measure(owner_all, users)),
+        ("parent (direct children)", measure(children, parents)),
+        ("access_politics (all shared tasks)", measure(shared, [()] * max(repeats // 10, 5))),
+        ("auth_tokens user_id + valid_until", measure(tokens, users)),
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tasks", type=int, default=1_000_000)
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--tokens", type=int, default=100_000)
+    parser.add_argument("--repeats", type=int, default=200)
+    args = parser.parse_args()
+
+    db = init_bench_db()
+    session = db.create_session()
+    engine = session.get_bind()
+    print(f"Seeding {args.tasks} tasks, {args.users} users, {args.tokens} tokens...")
+    user_ids = seed(session, users=args.users, tasks=args.tasks, tokens=args.tokens)
+    task_ids = [row[0] for row in session.execute(select(Task.id)).all()]
+
+    indexes = [index for table in db.SqlAlchemyBase.metadata.sorted_tables if table.name in BENCH_TABLES
+               for index in table.indexes]
+    session.close()
+    for index in indexes:
+        index.drop(engine, checkfirst=True)
+
+    session = db.create_session()
+    before = run_queries(session, user_ids, task_ids, args.repeats)
+    session.close()
+
+    db.create_missing_indexes(engine)
+    session = db.create_session()
+    after = run_queries(session, user_ids, task_ids, args.repeats)
+    session.close()
+
+    print_table("Without secondary indexes:", before)
+    print_table("With secondary indexes:", after)
+
+
+if __name__ == "__main__":
+    main()
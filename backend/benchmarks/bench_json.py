@@ -0,0 +1,91 @@
+"""
+Serialization of a task list to JSON: ORM objects with hand-built dicts and stdlib json (as API views did before)
+vs rows of TASK_COLUMNS with serialization.serialize_task, stdlib json and orjson (FastJSONProvider).
+
+Usage (from backend directory, scratch DB only!):
+    DB_TYPE=sqlite DB_FILE_PATH=/tmp/bench.sqlite3 python -m benchmarks.bench_json --tasks 10000
+"""
+import argparse
+
+from flask import Flask
+from flask.json.provider import DefaultJSONProvider
+from sqlalchemy import select
+
+from ORM.tasks import Task
+
+from serialization import TASK_COLUMNS, serialize_task, FastJSONProvider, orjson
+
+from .common import init_bench_db, seed, clear, measure, print_table
+
+
+def orm_dicts(session, user_id):
+    """
+Task list as API views built it before: ORM objects and a dict per task.
+    """
+    return [
+        {
+            "id": task.id,
+            "owner_id": task.owner_id,
+            "parent": task.parent,
+            "title": task.title,
+            "description": task.description,
+            "status": task.status.value,
+            "access_politics": task.access_politics.name,
+            "creation_date": task.creation_date.isoformat(),
+            "deadline": task.deadline.isoformat() if task.deadline else None,
+        }
+        for task in session.query(Task).filter(Task.owner_id == user_id)
+    ]
+
+
+def row_dicts(session, user_id):
+    return [serialize_task(row) for row in session.execute(select(*TASK_COLUMNS).where(Task.owner_id == user_id))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tasks", type=int, default=10_000)
+    parser.add_argument("--repeats", type=int, default=30)
+    args = parser.parse_args()
+
+    db = init_bench_db()
+    session = db.create_session()
+    clear(session)
+    user_id = seed(session, users=1, tasks=args.tasks, tokens=0)[0]
+
+    app = Flask(__name__)
+    stdlib_json = DefaultJSONProvider(app)
+    fast_json = FastJSONProvider(app)
+    repeats = [(session, user_id)] * args.repeats
+
+    def dump(provider, build):
+        def run(session_, user_id_):
+            session_.expunge_all()
+            provider.dumps(build(session_, user_id_))
+        return run
+
+    scenarios = [
+        ("ORM objects, dicts, stdlib json", dump(stdlib_json, orm_dicts)),
+        ("rows, serialize_task, stdlib json", dump(stdlib_json, row_dicts)),
+    ]
+    if orjson is not None:
+        scenarios.append(("rows, serialize_task, orjson", dump(fast_json, row_dicts)))
+
+    rows = []
+    for name, func in scenarios:
+        stats = measure(func, repeats)
+        rows.append((f"{name}, {args.tasks / stats['median'] * 1000:,.0f} tasks/s", stats))
+    print_table(f"Query + serialization of {args.tasks} tasks (tasks/s by median):", rows)
+
+    data = row_dicts(session, user_id)
+    rows = [("stdlib json", measure(lambda: stdlib_json.dumps(data), [()] * args.repeats))]
+    if orjson is not None:
+        rows.append(("orjson", measure(lambda: fast_json.dumps(data), [()] * args.repeats)))
+    print_table(f"json.dumps only, {args.tasks} serialized tasks:", rows)
+
+    clear(session)
+    session.close()
+
+
+if __name__ == "__main__":
+    main()
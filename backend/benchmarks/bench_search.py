@@ -0,0 +1,60 @@
+"""
+filter_search latency: full-text engine of current DB_TYPE vs ILIKE scan.
+
+Usage (from backend directory, scratch DB only!):
+    DB_TYPE=sqlite DB_FILE_PATH=/tmp/bench.sqlite3 python -m benchmarks.bench_search --tasks 1000000
+"""
+import argparse
+import random
+
+from ORM.tasks import Task
+
+from tasks import get_user_tasks_page
+from tasks import search
+
+from .common import init_bench_db, seed, clear, measure, print_table, WORDS
+
+
+def run_queries(session, user_ids, repeats):
+    rnd = random.Random(5)
+    args = [(rnd.choice(user_ids), rnd.choice(WORDS)) for _ in range(repeats)]
+
+    def first_page(user_id, text):
+        get_user_tasks_page(user_id, session, limit=100, order_by="rank", filter_search=text)
+
+    def everything(user_id, text):
+        query = session.query(Task.id)
+        search.search_tasks(query, text).all()
+
+    return [
+        ("page of 100, ranked (get_user_tasks_page)", measure(first_page, args)),
+        ("all tasks of the system matching the word", measure(everything, args)),
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tasks", type=int, default=1_000_000)
+    parser.add_argument("--repeats", type=int, default=100)
+    args = parser.parse_args()
+
+    db = init_bench_db()
+    session = db.create_session()
+    clear(session)
+    print(f"Seeding {args.tasks} tasks...")
+    user_ids = seed(session, users=1000, tasks=args.tasks, tokens=0)
+
+    get_search_engine = search.get_search_engine
+    indexed = run_queries(session, user_ids, args.repeats)
+    search.get_search_engine = search.LikeSearch
+    scan = run_queries(session, user_ids, max(args.repeats // 10, 5))
+    search.get_search_engine = get_search_engine
+
+    print_table(f"{get_search_engine().__class__.__name__}:", indexed)
+    print_table("ILIKE scan:", scan)
+    clear(session)
+    session.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,171 @@
+"""
+Throughput of mixed read/write API traffic on SQLite: tuned profile (SQLITE_PROFILE=wal) vs the old setup
+(SQLITE_PROFILE=legacy: rollback journal, one QueuePool engine). Several worker processes with several threads
+each imitate uWSGI workers, requests go through Flask test client (no HTTP server overhead).
+
+Usage (from backend directory, the DB file is overwritten!):
+    python -m benchmarks.bench_sqlite --db-file /tmp/bench_sqlite.sqlite3 --processes 4 --threads 4
+"""
+import argparse
+import logging
+import multiprocessing
+import os
+import random
+import threading
+import time
+from datetime import datetime
+
+from .common import print_table
+
+PROFILES = ("legacy", "wal")
+
+
+def _use_db(db_file, profile):
+    os.environ["DB_TYPE"] = "sqlite"
+    os.environ["DB_FILE_PATH"] = db_file
+    os.environ["SQLITE_PROFILE"] = profile
+
+
+def prepare(db_file, profile, tasks):
+    for suffix in ("", "-wal", "-shm", "-journal"):
+        if os.path.exists(db_file + suffix):
+            os.remove(db_file + suffix)
+    _use_db(db_file, profile)
+    from .common import init_bench_db, seed
+    db = init_bench_db()
+    session = db.create_session()
+    seed(session, users=100, tasks=tasks, tokens=1000, shared_ratio=0.05)
+    session.close()
+    # seed() inserts bypass mapper events, build closure table once instead of in every worker
+    from tasks.tasks_closure import init_task_closure
+    init_task_closure(session.bind)
+
+
+def worker(db_file, profile, threads, duration, write_ratio, seed_value, results):
+    _use_db(db_file, profile)
+    from sqlalchemy import select
+    from app import app
+    from db import create_session
+    from ORM.authtokens import AuthToken
+    from ORM.tasks import Task
+    logging.disable(logging.INFO)
+
+    session = create_session()
+    tokens = session.execute(
+        select(AuthToken.id, AuthToken.user_id).where(AuthToken.valid_until > datetime.now()),
+    ).all()
+    own_tasks = {}
+    for task_id, owner_id in session.execute(select(Task.id, Task.owner_id)):
+        own_tasks.setdefault(owner_id, []).append(task_id)
+    session.close()
+    tokens = [(token_id, user_id) for token_id, user_id in tokens if user_id in own_tasks]
+
+    client = app.test_client()
+    deadline = time.monotonic() + duration
+    latencies = {"read": [], "write": []}
+    errors = []
+    lock = threading.Lock()
+
+    def run(thread_seed):
+        rnd = random.Random(thread_seed)
+        local = {"read": [], "write": []}
+        local_errors = 0
+        while time.monotonic() < deadline:
+            token_id, user_id = rnd.choice(tokens)
+            headers = {"Authorization": "Token " + token_id}
+            started = time.perf_counter()
+            if rnd.random() < write_ratio:
+                kind = "write"
+                if rnd.random() < 0.5:
+                    response = client.post(
+                        "/api/v1/tasks", json={"title": f"bench {rnd.random()}"}, headers=headers,
+                    )
+                else:
+                    response = client.put(
+                        f"/api/v1/tasks/{rnd.choice(own_tasks[user_id])}",
+                        json={"title": f"bench {rnd.random()}"},
+                        headers=headers,
+                    )
+            else:
+                kind = "read"
+                if rnd.random() < 0.5:
+                    response = client.get("/api/v1/tasks?limit=50", headers=headers)
+                else:
+                    response = client.get(f"/api/v1/tasks/{rnd.choice(own_tasks[user_id])}", headers=headers)
+            local[kind].append((time.perf_counter() - started) * 1000)
+            if response.status_code >= 500:
+                local_errors += 1
+        with lock:
+            latencies["read"].extend(local["read"])
+            latencies["write"].extend(local["write"])
+            errors.append(local_errors)
+
+    pool = [threading.Thread(target=run, args=(seed_value * 1000 + i,)) for i in range(threads)]
+    for thread in pool:
+        thread.start()
+    for thread in pool:
+        thread.join()
+    results.put((latencies, sum(errors)))
+
+
+def percentile(values, q):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * q))]
+
+
+def run_profile(args, profile):
+    context = multiprocessing.get_context("spawn")
+    setup = context.Process(target=prepare, args=(args.db_file, profile, args.tasks))
+    setup.start()
+    setup.join()
+
+    results = context.Queue()
+    processes = [
+        context.Process(
+            target=worker,
+            args=(args.db_file, profile, args.threads, args.duration, args.write_ratio, i, results),
+        )
+        for i in range(args.processes)
+    ]
+    for process in processes:
+        process.start()
+    collected = [results.get() for _ in processes]
+    for process in processes:
+        process.join()
+
+    reads = [value for latencies, _ in collected for value in latencies["read"]]
+    writes = [value for latencies, _ in collected for value in latencies["write"]]
+    return {
+        "rps": (len(reads) + len(writes)) / args.duration,
+        "errors": sum(errors for _, errors in collected),
+        "read_p50": percentile(reads, 0.5),
+        "read_p99": percentile(reads, 0.99),
+        "write_p50": percentile(writes, 0.5),
+        "write_p99": percentile(writes, 0.99),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--db-file", default="/tmp/bench_sqlite.sqlite3")
+    parser.add_argument("--tasks", type=int, default=20_000)
+    parser.add_argument("--processes", type=int, default=4)
+    parser.add_argument("--threads", type=int, default=4)
+    parser.add_argument("--duration", type=float, default=10)
+    parser.add_argument("--write-ratio", type=float, default=0.2)
+    args = parser.parse_args()
+
+    rows = []
+    for profile in PROFILES:
+        stats = run_profile(args, profile)
+        rows.append((f"{profile}: {stats.pop('rps'):.0f} req/s, {stats.pop('errors')} errors", stats))
+    print_table(
+        f"{args.processes} processes x {args.threads} threads, {args.write_ratio:.0%} writes, {args.duration}s:",
+        rows,
+    )
+
+
+if __name__ == "__main__":
+    main()
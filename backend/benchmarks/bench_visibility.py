@@ -0,0 +1,72 @@
+"""
+Latency of tasks visibility query (get_user_tasks) depending on total shared tasks count
+and on per-user tasks count. Old UNION query is measured for comparison.
+
+Usage (from backend directory, scratch DB only!):
+    DB_TYPE=sqlite DB_FILE_PATH=/tmp/bench.sqlite3 python -m benchmarks.bench_visibility --tasks 200000
+"""
+import argparse
+import random
+
+from ORM.tasks import Task, TaskShareLevel
+
+from tasks import get_user_tasks, get_user_tasks_page
+
+from .common import init_bench_db, seed, clear, measure, print_table
+
+
+def union_tasks(user_id, session):
+    """
+Visibility query as it was before: UNION of own tasks and all shared tasks.
+    """
+    q1 = session.query(Task).filter(Task.owner_id == user_id)
+    q2 = session.query(Task).filter(
+        Task.access_politics.notin_([TaskShareLevel.PARENT_SELECT, TaskShareLevel.PRIVATE]),
+    )
+    return q1.union(q2).with_entities(Task.id, Task.title, Task.status, Task.parent).all()
+
+
+def run_scenario(db, users, tasks, shared_ratio, repeats):
+    session = db.create_session()
+    clear(session)
+    user_ids = seed(session, users=users, tasks=tasks, tokens=0, shared_ratio=shared_ratio)
+    rnd = random.Random(7)
+    args = [(rnd.choice(user_ids), session) for _ in range(repeats)]
+    result = {
+        "union": measure(union_tasks, args)["median"],
+        "predicate": measure(get_user_tasks, args)["median"],
+        "predicate, page of 100": measure(
+            lambda user_id, session_: get_user_tasks_page(user_id, session_, limit=100), args,
+        )["median"],
+    }
+    session.close()
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tasks", type=int, default=200_000)
+    parser.add_argument("--repeats", type=int, default=30)
+    args = parser.parse_args()
+
+    db = init_bench_db()
+
+    rows = []
+    for shared_ratio in (0.001, 0.01, 0.1):
+        stats = run_scenario(db, 1000, args.tasks, shared_ratio, args.repeats)
+        rows.append((f"shared tasks: {int(args.tasks * shared_ratio)}, per user: {args.tasks // 1000}", stats))
+    print_table("Scaling with total shared tasks count (median):", rows)
+
+    rows = []
+    for users in (10000, 1000, 100):
+        stats = run_scenario(db, users, args.tasks, 0.001, args.repeats)
+        rows.append((f"per user: {args.tasks // users}, shared tasks: {int(args.tasks * 0.001)}", stats))
+    print_table("Scaling with per-user tasks count (median):", rows)
+
+    session = db.create_session()
+    clear(session)
+    session.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+"""
+Latency of single task update/delete: old ORM path (SELECT, permission check in Python, UPDATE/DELETE, reload
+for the response) vs one UPDATE/DELETE ... RETURNING statement with permission predicate (update_task_returning,
+delete_task_returning). Both commit after every call, like the API views.
+
+SQLite has no network round-trips, --rtt-ms adds a sleep before every statement to imitate a DB server.
+
+Usage (from backend directory, scratch DB only!):
+    DB_TYPE=sqlite DB_FILE_PATH=/tmp/bench.sqlite3 python -m benchmarks.bench_writes --tasks 100000 --rtt-ms 0.5
+"""
+import argparse
+import random
+import time
+
+from sqlalchemy import select, event
+
+from ORM.tasks import Task, TaskStatus, WRITABLE_POLITICS
+from tasks import update_task_returning, delete_task_returning
+from tasks.tasks_closure import init_task_closure
+
+from .common import init_bench_db, seed, clear, measure, print_table
+
+
+def serialize(task):
+    return {
+        "id": task.id,
+        "owner_id": task.owner_id,
+        "parent": task.parent,
+        "title": task.title,
+        "description": task.description,
+        "status": task.status.value,
+        "access_politics": task.access_politics.name,
+        "creation_date": task.creation_date.isoformat(),
+        "deadline": task.deadline.isoformat() if task.deadline else None,
+    }
+
+
+def orm_update(session, task_id, user_id, title):
+    """
+update_task as it was before.
+    """
+    task = session.query(Task).filter_by(id=task_id).first()
+    if task.owner_id != user_id and task.access_politics not in WRITABLE_POLITICS:
+        return 403
+    task.title = title
+    task.status = TaskStatus.DONE
+    session.commit()
+    return serialize(task)
+
+
+def returning_update(session, task_id, user_id, title):
+    task = update_task_returning(session, task_id, user_id, False, {"title": title, "status": TaskStatus.DONE})
+    session.commit()
+    return serialize(task)
+
+
+def orm_delete(session, task_id, user_id):
+    """
+delete_task as it was before.
+    """
+    task = session.query(Task).filter_by(id=task_id).first()
+    if task.owner_id != user_id:
+        return 403
+    session.delete(task)
+    session.commit()
+
+
+def returning_delete(session, task_id, user_id):
+    delete_task_returning(session, task_id, user_id, False)
+    session.commit()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tasks", type=int, default=100_000)
+    parser.add_argument("--repeats", type=int, default=2000)
+    parser.add_argument("--rtt-ms", type=float, default=0)
+    args = parser.parse_args()
+
+    db = init_bench_db()
+    session = db.create_session()
+    clear(session)
+    seed(session, users=1000, tasks=args.tasks, tokens=0)
+    init_task_closure(session.bind)
+
+    rnd = random.Random(11)
+    tasks = session.execute(select(Task.id, Task.owner_id)).all()
+    updates = rnd.sample(tasks, args.repeats * 2)
+    # Leaf tasks, so both delete paths remove exactly one task
+    parents = set(session.scalars(select(Task.parent).where(Task.parent.is_not(None))))
+    leaves = [task for task in tasks if task.id not in parents]
+    deletes = rnd.sample(leaves, args.repeats * 2)
+
+    if args.rtt_ms:
+        def round_trip(*_):
+            time.sleep(args.rtt_ms / 1000)
+        # COMMIT is a round-trip too, but it is the same for both paths
+        for engine in {session.get_bind(), session.get_bind(clause=select(Task.id))}:
+            event.listen(engine, "before_cursor_execute", round_trip)
+
+    def args_of(rows, *extra):
+        return [(session, row.id, row.owner_id, *extra) for row in rows]
+
+    rows = [
+        ("update, ORM (SELECT + UPDATE + reload)", measure(orm_update, args_of(updates[:args.repeats], "t1"))),
+        ("update, UPDATE ... RETURNING", measure(returning_update, args_of(updates[args.repeats:], "t2"))),
+        ("delete, ORM (SELECT + DELETE)", measure(orm_delete, args_of(deletes[:args.repeats]))),
+        ("delete, DELETE ... RETURNING", measure(returning_delete, args_of(deletes[args.repeats:]))),
+    ]
+    print_table(f"Single task writes, {args.tasks} tasks, {args.repeats} calls each, RTT {args.rtt_ms}ms:", rows)
+
+    clear(session)
+    session.close()
+
+
+if __name__ == "__main__":
+    main()
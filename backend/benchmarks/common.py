@@ -0,0 +1,126 @@
+import os
+import random
+import statistics
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import insert, delete, func, text
+
+from ORM.users import User
+from ORM.authtokens import AuthToken, TokensAccessLevels
+from ORM.tasks import Task, TaskShareLevel, TaskStatus
+
+CHUNK_SIZE = 10000
+
+WORDS = [f"word{i}" for i in range(10000)]
+
+PRIVATE_POLITICS = [TaskShareLevel.PRIVATE, TaskShareLevel.PARENT_SELECT]
+SHARED_POLITICS = [level for level in TaskShareLevel if level not in PRIVATE_POLITICS]
+
+
+def init_bench_db():
+    """
+Initializes DB from the usual env variables. Benchmarks must run against a scratch database.
+    """
+    if os.environ.get("DOTENV", False):
+        from dotenv import load_dotenv
+        load_dotenv()
+    import db
+    db.global_init()
+    return db
+
+
+def seed(session, users=1000, tasks=1_000_000, tokens=100_000, shared_ratio=0.01, seed_value=1231):
+    """
+Fills empty DB with generated users, tasks (random forest) and tokens.
+    :return: list of user ids
+    """
+    rnd = random.Random(seed_value)
+    if session.query(func.count(Task.id)).scalar():
+        raise RuntimeError("Benchmark DB is not empty. Use a scratch database.")
+
+    now = datetime.now()
+    user_offset = (session.query(func.max(User.id)).scalar() or 0) + 1
+    session.execute(insert(User), [
+        {"id": user_offset + i, "username": f"bench_{user_offset + i}", "email": f"bench_{user_offset + i}@bench",
+         "password_hash": "-", "created_at": now, "is_admin": False}
+        for i in range(users)
+    ])
+    user_ids = [user_offset + i for i in range(users)]
+
+    last_task_of_user = {}
+    rows = []
+    for i in range(tasks):
+        task_id = 1000 + i
+        owner_id = rnd.choice(user_ids)
+        parent = last_task_of_user.get(owner_id) if rnd.random() < 0.7 else None
+        last_task_of_user[owner_id] = task_id
+        rows.append({
+            "id": task_id,
+            "owner_id": owner_id,
+            "parent": parent,
+            "title": f"Task {task_id} {rnd.choice(WORDS)} {rnd.choice(WORDS)}",
+            "description": f"Generated task {task_id} of user {owner_id}: {rnd.choice(WORDS)}",
+            "status": rnd.choice(list(TaskStatus)),
+            "access_politics": rnd.choice(SHARED_POLITICS if rnd.random() < shared_ratio else PRIVATE_POLITICS),
+            "creation_date": now,
+            "deadline": now + timedelta(minutes=rnd.randint(-100000, 100000)),
+        })
+        if len(rows) >= CHUNK_SIZE:
+            session.execute(insert(Task), rows)
+            rows = []
+    if rows:
+        session.execute(insert(Task), rows)
+
+    rows = []
+    for i in range(tokens):
+        rows.append({
+            "id": f"{i:064x}",
+            "user_id": rnd.choice(user_ids),
+            "valid_until": now + timedelta(days=rnd.randint(-365, 120)),
+            "access_level": TokensAccessLevels.EVERYTHING_USER,
+        })
+        if len(rows) >= CHUNK_SIZE:
+            session.execute(insert(AuthToken), rows)
+            rows = []
+    if rows:
+        session.execute(insert(AuthToken), rows)
+
+    if session.bind.dialect.name == "postgresql":
+        session.execute(text("SELECT setval('table_id_seq', (SELECT max(id) FROM tasks))"))
+    session.commit()
+    return user_ids
+
+
+def clear(session):
+    """
+Removes everything created by seed().
+    """
+    session.execute(delete(AuthToken))
+    session.execute(delete(Task))
+    session.execute(delete(User).where(User.username.like("bench_%")))
+    session.commit()
+
+
+def measure(func_, args_list) -> {str: float}:
+    """
+Calls func_ for every args tuple and returns latency stats in milliseconds.
+    """
+    timings = []
+    for args in args_list:
+        started = time.perf_counter()
+        func_(*args)
+        timings.append((time.perf_counter() - started) * 1000)
+    timings.sort()
+    return {
+        "median": statistics.median(timings),
+        "p95": timings[int(len(timings) * 0.95) - 1] if len(timings) >= 20 else timings[-1],
+        "p99": timings[int(len(timings) * 0.99) - 1] if len(timings) >= 100 else timings[-1],
+    }
+
+
+def print_table(title, rows):
+    print()
+    print(title)
+    for name, stats in rows:
+        print(f"  {name:<48} " + "  ".join(f"{key}={value:9.3f}ms" for key, value in stats.items()))
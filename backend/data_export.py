@@ -0,0 +1,134 @@
+import csv
+import io
+import zlib
+from typing import Any, Iterator
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from ORM.tasks import Task
+from ORM.users import User
+from serialization import TASK_COLUMNS, USER_COLUMNS, serialize_task, serialize_user, dumps
+from streaming import STREAM_CHUNK_SIZE, STREAM_BATCH_SIZE
+
+EXPORT_FORMATS = ("ndjson", "csv")
+EXPORT_MIMETYPES = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+
+# Section: (columns, id column, owner column, serializer). Users go first, tasks reference them.
+# Hierarchy is exported as parent of every task, task_closure is rebuilt from it on import.
+EXPORT_SECTIONS = {
+    "users": (USER_COLUMNS, User.id, User.id, serialize_user),
+    "tasks": (TASK_COLUMNS, Task.id, Task.owner_id, serialize_task),
+}
+
+
+def parse_export_cursor(cursor: str) -> (str, int):
+    """
+    :param cursor: "<section>:<id>" of the last received record, e.g. "tasks:1234"
+    :raises ValueError: on malformed cursor
+    """
+    section, _, record_id = cursor.partition(":")
+    if section not in EXPORT_SECTIONS or not record_id.isdigit():
+        raise ValueError("cursor must be <section>:<id>, e.g. tasks:1234")
+    return section, int(record_id)
+
+
+def _iter_records(
+    session: Session,
+    sections: [str],
+    owner_id: int or None,
+    after: (str, int) or None,
+    chunk_size: int,
+) -> Iterator[tuple[str, {str: Any}]]:
+    for name in sections:
+        columns, id_column, owner_column, serialize = EXPORT_SECTIONS[name]
+        statement = select(*columns).order_by(id_column)
+        if owner_id is not None:
+            statement = statement.where(owner_column == owner_id)
+        if after is not None and after[0] == name:
+            statement = statement.where(id_column > after[1])
+        for row in session.execute(statement.execution_options(yield_per=chunk_size)):
+            yield name, serialize(row)
+
+
+def _iter_ndjson(records: Iterator[tuple[str, {str: Any}]]) -> Iterator[str]:
+    batch = []
+    for section, record in records:
+        batch.append(dumps({"type": section, **record}))
+        if len(batch) >= STREAM_BATCH_SIZE:
+            yield "\n".join(batch) + "\n"
+            batch = []
+    if batch:
+        yield "\n".join(batch) + "\n"
+
+
+def _iter_csv(records: Iterator[tuple[str, {str: Any}]], section: str) -> Iterator[str]:
+    fields = [column.key for column in EXPORT_SECTIONS[section][0]]
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(fields)
+    for i, (_, record) in enumerate(records, 1):
+        writer.writerow([record[field] for field in fields])
+        if i % STREAM_BATCH_SIZE == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+
+def gzip_chunks(chunks: Iterator[str]) -> Iterator[bytes]:
+    """
+Compresses text chunks on the fly into one gzip stream.
+    """
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    for chunk in chunks:
+        data = compressor.compress(chunk.encode("utf-8"))
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def export_chunks(
+    session: Session,
+    export_format: str = "ndjson",
+    sections: [str] = tuple(EXPORT_SECTIONS),
+    owner_id: int = None,
+    cursor: str = None,
+    chunk_size: int = STREAM_CHUNK_SIZE,
+) -> Iterator[str]:
+    """
+Export of users (without password hashes) and tasks, ordered by section and id.
+NDJSON: one object per line with "type" (section name) and serialized record.
+CSV: header and one row per record, only one section per file.
+Rows are fetched by chunk_size with yield_per (server-side cursor on PostgreSQL and MariaDB) and encoded
+while they come, memory use doesn't depend on data size. Arguments are checked before the first chunk,
+the session must stay open until the iterator is exhausted.
+    :param session: DB session
+    :param export_format: "ndjson" or "csv"
+    :param sections: names from EXPORT_SECTIONS
+    :param owner_id: export only this user and their tasks (None - everything)
+    :param cursor: "<section>:<id>" of the last received record, export continues after it
+    :param chunk_size: rows per fetch
+    :return: iterator of text chunks
+    :raises ValueError: on invalid arguments
+    """
+    if export_format not in EXPORT_FORMATS:
+        raise ValueError("format must be one of: " + ", ".join(EXPORT_FORMATS))
+    if not sections or any(name not in EXPORT_SECTIONS for name in sections):
+        raise ValueError("sections must be some of: " + ", ".join(EXPORT_SECTIONS))
+    sections = [name for name in EXPORT_SECTIONS if name in sections]
+    if export_format == "csv" and len(sections) != 1:
+        raise ValueError("CSV export holds one section")
+
+    after = None
+    if cursor:
+        after = parse_export_cursor(cursor)
+        if after[0] not in sections:
+            raise ValueError("cursor section is not exported")
+        # Sections before the cursor one are already received
+        sections = sections[sections.index(after[0]):]
+
+    records = _iter_records(session, sections, owner_id, after, chunk_size)
+    if export_format == "csv":
+        return _iter_csv(records, sections[0])
+    return _iter_ndjson(records)
@@ -1,13 +1,166 @@
+import logging
 import os
+import random
+import time
+from datetime import datetime, timedelta
 
 import sqlalchemy as sa
+from flask import g, has_request_context, session as flask_session
 import sqlalchemy.orm as orm
 from sqlalchemy.orm import Session
 import sqlalchemy.ext.declarative as dec
 
+from pool_metrics import PoolMetrics, MeteredQueuePool
+
 SqlAlchemyBase = dec.declarative_base()
 
+logger = logging.getLogger(__name__)
+
 __factory = None
+__engines = {}
+_replica_engines = []
+
+REPLICA_STICKY_SECONDS = float(os.environ.get("DB_REPLICA_STICKY_SECONDS", 5))
+
+
+class RoutingSession(Session):
+    """
+Session which sends SELECTs to a read bind and everything else to its main bind:
+    * a replica, if the view allowed it (use_replica) and the user didn't write recently
+    * otherwise info["read_bind"] (SQLite reader engine), if set
+Once the session has written, everything goes to the main bind until the transaction ends (_force_writer),
+so the session reads its own uncommitted changes.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._force_writer = False
+
+    def get_bind(self, mapper=None, clause=None, **kwargs):
+        # No clause: flush of ORM changes or session.connection() for Core writes
+        if clause is None or isinstance(clause, (sa.Insert, sa.Update, sa.Delete)):
+            self._force_writer = True
+        elif not self._force_writer and getattr(clause, "is_select", False):
+            read_bind = self._read_bind()
+            if read_bind is not None:
+                return read_bind
+        return super().get_bind(mapper, clause=clause, **kwargs)
+
+    def _read_bind(self):
+        if self.info.get("replica_reads") and _replica_engines:
+            if "replica" not in self.info:
+                # One replica per session, so all its reads see the same replication lag
+                self.info["replica"] = random.choice(_replica_engines)
+            return self.info["replica"]
+        return self.info.get("read_bind")
+
+
+@sa.event.listens_for(RoutingSession, "before_commit")
+def _committing(session):
+    if not _replica_engines:
+        return
+    # Pending ORM changes are flushed by commit after this event, do it now to know if the session writes
+    session.flush()
+    if session._force_writer:
+        remember_write(session)
+
+
+@sa.event.listens_for(RoutingSession, "after_transaction_end")
+def _transaction_ended(session, transaction):
+    if transaction.parent is None:
+        session._force_writer = False
+
+
+def _current_user_id() -> int or None:
+    if not has_request_context():
+        return None
+    # API (set by token_auth) or webapp login
+    return g.get("auth_user_id") or flask_session.get("user_id")
+
+
+def remember_write(session: Session):
+    """
+Sends reads of current user to primary for DB_REPLICA_STICKY_SECONDS (read-your-writes), in all workers.
+Webapp users carry the deadline in their session cookie, API clients in replica_sticky_users row
+written in the committed transaction.
+    """
+    if not has_request_context():
+        return
+    if "user_id" in flask_session:
+        flask_session["db_sticky_until"] = time.time() + REPLICA_STICKY_SECONDS
+        return
+    user_id = g.get("auth_user_id")
+    if user_id is not None:
+        from ORM.replicasticky import upsert_sticky_until
+        session.execute(upsert_sticky_until(user_id, datetime.utcnow() + timedelta(seconds=REPLICA_STICKY_SECONDS)))
+
+
+def is_sticky(session: Session, user_id: int or None) -> bool:
+    if flask_session.get("db_sticky_until", 0) > time.time():
+        return True
+    if user_id is None or "user_id" in flask_session:
+        return False
+    from ORM.replicasticky import ReplicaStickyUser
+    sticky_until = session.execute(
+        sa.select(ReplicaStickyUser.sticky_until).where(ReplicaStickyUser.user_id == user_id),
+    ).scalar()
+    return sticky_until is not None and sticky_until > datetime.utcnow()
+
+
+def use_replica(session: Session, user_id: int = None):
+    """
+Allows SELECTs of the session to go to a read replica (DB_REPLICA_SERVERS / DB_REPLICA_FILE_PATHS),
+unless the user wrote recently. Only for read-only views: replicas lag behind primary.
+    """
+    if not _replica_engines:
+        return
+    if is_sticky(session, user_id if user_id is not None else _current_user_id()):
+        return
+    session.info["replica_reads"] = True
+
+
+def get_db_type() -> str:
+    """
+DB family selected by DB_TYPE env variable: "sqlite", "postgresql", "mariadb", "mysql", ...
+    """
+    db_type = os.environ.get("DB_TYPE", "mariadb+pymysql").lower()
+    if db_type in ("sqlite", "sqlite3", "filedb"):
+        return "sqlite"
+    return db_type.split("+")[0]
+
+
+def uses_sqlite_wal_profile() -> bool:
+    return get_db_type() == "sqlite" and os.environ.get("SQLITE_PROFILE", "wal").lower() == "wal"
+
+
+def foreign_keys_enforced() -> bool:
+    """
+False for SQLite legacy profile: FK cascades (children, task_closure rows) must be done by the app.
+    """
+    return get_db_type() != "sqlite" or uses_sqlite_wal_profile()
+
+
+def get_conn_str(server: str = None, file_path: str = None) -> str:
+    """
+Connection string from env variables. server / file_path override DB_SERVER / DB_FILE_PATH (for replicas).
+    """
+    if get_db_type() == "sqlite":
+        file_path = file_path or os.environ.get("DB_FILE_PATH", "/tmp/db.sqlite3")
+        return f"sqlite:///{file_path}?check_same_thread=False"
+    server = server or os.environ.get("DB_SERVER", "127.0.0.1")
+    conn_str = f'{os.environ.get("DB_TYPE", "mariadb+pymysql")}://{os.environ.get("DB_USER", "user")}:{os.environ.get("DB_PASSWORD", "Password_123")}@{server}/{os.environ.get("DB", "ToDoListWebApp")}' # check_same_thread=False&
+    if os.environ.get("DB_TYPE", "mariadb+pymysql") == "mariadb+pymysql":
+        conn_str += f"?charset=utf8mb4&"
+    return conn_str
+
+
+def _create_engine(conn_str: str, writer: bool = True):
+    if uses_sqlite_wal_profile():
+        return create_sqlite_engine(conn_str, writer=writer)
+    connect_args = {} if conn_str.startswith("sqlite") else {
+        "connect_timeout": int(os.environ.get("DB_CONNECT_TIMEOUT", 60)),
+    }
+    return sa.create_engine(conn_str, echo=False, connect_args=connect_args, **get_pool_options())
 
 
 def global_init():
@@ -16,22 +169,221 @@ def global_init():
     if __factory:
         return
 
-    if os.environ.get("DB_TYPE", "???").lower() in ("sqlite", "sqlite3", "filedb"):
-        file_path = os.environ.get("DB_FILE_PATH", "/tmp/db.sqlite3")
-        conn_str = f"sqlite:///{file_path}?check_same_thread=False"
+    conn_str = get_conn_str()
+    engine = _add_engine("primary", _create_engine(conn_str))
+    session_info = {}
+    if uses_sqlite_wal_profile():
+        session_info["read_bind"] = _add_engine("sqlite_reader", create_sqlite_engine(conn_str, writer=False))
+
+    if get_db_type() == "sqlite":
+        replicas = [get_conn_str(file_path=path) for path in _env_list("DB_REPLICA_FILE_PATHS")]
     else:
-        conn_str = f'{os.environ.get("DB_TYPE", "mariadb+pymysql")}://{os.environ.get("DB_USER", "user")}:{os.environ.get("DB_PASSWORD", "Password_123")}@{os.environ.get("DB_SERVER", "127.0.0.1")}/{os.environ.get("DB", "ToDoListWebApp")}' # check_same_thread=False&
-        if os.environ.get("DB_TYPE", "mariadb+pymysql") == "mariadb+pymysql":
-            conn_str += f"?charset=utf8mb4&"
-    print(f"Connecting to DB: {conn_str}".replace(os.environ.get("DB_PASSWORD", "Password_123"), "<PASSWORD>"))
+        replicas = [get_conn_str(server=server) for server in _env_list("DB_REPLICA_SERVERS")]
+    for i, replica in enumerate(replicas):
+        _replica_engines.append(_add_engine(f"replica_{i}", _create_engine(replica, writer=False)))
 
-    engine = sa.create_engine(conn_str, echo=False, connect_args={"connect_timeout": 60}, pool_size=10, max_overflow=20)
-    __factory = orm.sessionmaker(bind=engine)
+    __factory = orm.sessionmaker(bind=engine, class_=RoutingSession, info=session_info)
     from ORM import __all_models
 
+    if not production_mode():
+        init_schema()
+    _register_fork_hooks()
+
+
+def dispose_engines_after_fork():
+    """
+Runs in a forked worker: drops pooled connections inherited from the parent without closing them
+(sockets still belong to the parent), so the worker opens its own connections on first use.
+Sharing a connection between processes mixes their protocol messages.
+    """
+    for engine, _ in __engines.values():
+        engine.dispose(close=False)
+
+
+def _register_fork_hooks():
+    os.register_at_fork(after_in_child=dispose_engines_after_fork)
+    try:
+        # uWSGI forks workers in C, os.register_at_fork callbacks aren't called there
+        from uwsgidecorators import postfork
+    except ImportError:
+        return
+    postfork(dispose_engines_after_fork)
+
+
+def production_mode() -> bool:
+    """
+STARTUP_MODE=production: workers don't touch DB schema on startup (`utils_cmd.py migrate` does it)
+and debug routes aren't registered.
+    """
+    return os.environ.get("STARTUP_MODE", "dev").lower() == "production"
+
+
+def init_schema():
+    """
+Creates missing tables and indexes, full-text search index and fills task_closure of old DBs.
+Needs several reflection queries, so in production mode it runs once per deploy instead of in every worker.
+    """
+    engine = __engines["primary"][0]
     SqlAlchemyBase.metadata.create_all(engine)
+    create_missing_indexes(engine)
+
+    from tasks.search import init_search_index
+    from tasks.tasks_closure import init_task_closure
+    init_search_index(engine)
+    init_task_closure(engine)
+
+
+def create_standalone_session_factory():
+    """
+Session factory with its own primary engine (no read routing), for background threads of the process
+which forks workers (uWSGI master): connections of this engine are opened after fork and never shared.
+    """
+    return orm.sessionmaker(bind=_create_engine(get_conn_str()))
+
+
+def _env_list(name: str) -> [str]:
+    return [item.strip() for item in os.environ.get(name, "").split(",") if item.strip()]
+
+
+def _add_engine(name: str, engine):
+    metrics = PoolMetrics()
+    metrics.attach(engine)
+    __engines[name] = (engine, metrics)
+    return engine
+
+
+def _env_flag(name: str, default: bool) -> bool:
+    return os.environ.get(name, str(default)).upper() in ("TRUE", "YES", "1")
+
+
+def get_pool_options() -> dict:
+    """
+Connection pool settings from env variables (per worker process):
+    DB_POOL_SIZE - connections kept open (default 10)
+    DB_MAX_OVERFLOW - extra connections opened under load and closed on checkin (default 20)
+    DB_POOL_TIMEOUT - seconds to wait for a free connection before error (default 30)
+    DB_POOL_RECYCLE - reconnect connections older than this many seconds, -1 - never (default -1)
+    DB_POOL_PRE_PING - test connection on checkout (default False)
+    DB_POOL_LIFO - reuse the most recently returned connection first, so idle ones can expire (default False)
+    """
+    return {
+        "poolclass": MeteredQueuePool,
+        "pool_size": int(os.environ.get("DB_POOL_SIZE", 10)),
+        "max_overflow": int(os.environ.get("DB_MAX_OVERFLOW", 20)),
+        "pool_timeout": float(os.environ.get("DB_POOL_TIMEOUT", 30)),
+        "pool_recycle": int(os.environ.get("DB_POOL_RECYCLE", -1)),
+        "pool_pre_ping": _env_flag("DB_POOL_PRE_PING", False),
+        "pool_use_lifo": _env_flag("DB_POOL_LIFO", False),
+    }
+
+
+def create_sqlite_engine(conn_str: str, writer: bool):
+    """
+SQLite profile (SQLITE_PROFILE=wal, default): WAL journal, so readers don't block the writer and vice versa.
+Writer engine has one connection (writes of the worker are serialized in the pool instead of failing
+with "database is locked") and takes the write lock at BEGIN. Reader engine has a pool (DB_POOL_*)
+of query-only connections. Writers of different workers wait for each other up to SQLITE_BUSY_TIMEOUT ms.
+SQLITE_PROFILE=legacy keeps rollback journal and a single engine.
+    """
+    pragmas = {
+        "journal_mode": "WAL",
+        "synchronous": "NORMAL",
+        "foreign_keys": "ON",
+        "busy_timeout": int(os.environ.get("SQLITE_BUSY_TIMEOUT", 5000)),
+        # Negative cache_size is in KiB
+        "cache_size": -int(os.environ.get("SQLITE_CACHE_SIZE", 65536)),
+        "mmap_size": int(os.environ.get("SQLITE_MMAP_SIZE", 268435456)),
+    }
+    if writer:
+        engine = sa.create_engine(
+            conn_str,
+            echo=False,
+            poolclass=MeteredQueuePool,
+            pool_size=1,
+            max_overflow=0,
+            pool_timeout=float(os.environ.get("DB_POOL_TIMEOUT", 30)),
+        )
+    else:
+        pragmas["query_only"] = "ON"
+        # Queue pool, not SingletonThreadPool: that one closes connections still used by other threads
+        # once there are more threads than pool_size. Connection is used by one thread at a time.
+        engine = sa.create_engine(
+            conn_str,
+            echo=False,
+            connect_args={"check_same_thread": False},
+            **get_pool_options(),
+        )
+
+    @sa.event.listens_for(engine, "connect")
+    def set_pragmas(dbapi_connection, connection_record):
+        if writer:
+            # Transactions are started by the "begin" listener below instead of pysqlite
+            dbapi_connection.isolation_level = None
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas.items():
+            cursor.execute(f"PRAGMA {name}={value}")
+        cursor.close()
+
+    if writer:
+        @sa.event.listens_for(engine, "begin")
+        def begin_immediate(connection):
+            # Take the write lock now: a deferred transaction upgraded later fails with SQLITE_BUSY without waiting
+            connection.exec_driver_sql("BEGIN IMMEDIATE")
+
+    return engine
+
+
+def get_pool_stats() -> {str: dict}:
+    """
+Statistics of DB connection pools of this worker process by pool name ("primary", "sqlite_reader", ...).
+    """
+    return {name: metrics.stats(engine.pool) for name, (engine, metrics) in __engines.items()}
+
+
+def create_missing_indexes(engine) -> [str]:
+    """
+Creates indexes declared in models but missing in DB.
+create_all() skips existing tables together with their indexes, so this is the upgrade path for old databases.
+    :param engine: DB engine
+    :return: names of created indexes
+    """
+    inspector = sa.inspect(engine)
+    created = []
+    for table in SqlAlchemyBase.metadata.sorted_tables:
+        if not inspector.has_table(table.name):
+            continue
+        existing = {index["name"] for index in inspector.get_indexes(table.name)}
+        for index in table.indexes:
+            if index.name in existing:
+                continue
+            logger.info("Creating index %s on %s", index.name, table.name)
+            index.create(engine)
+            created.append(index.name)
+    return created
 
 
 def create_session() -> Session:
     global __factory
     return __factory()
+
+
+def get_session() -> Session:
+    """
+Session of current request. Opened on first use (no DB connection is checked out before the first query)
+and closed by close_request_session on app context teardown.
+    """
+    if "db_session" not in g:
+        g.db_session = create_session()
+    return g.db_session
+
+
+def close_request_session(exception=None):
+    """
+Teardown handler: rolls back uncommitted changes of failed request and returns connection to the pool.
+    """
+    session = g.pop("db_session", None)
+    if session is None:
+        return
+    if exception is not None:
+        session.rollback()
+    session.close()
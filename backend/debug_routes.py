@@ -0,0 +1,40 @@
+import os
+
+from flask import Blueprint, request, session, jsonify, current_app
+
+bp = Blueprint("debug", __name__, url_prefix=F"{os.environ.get('URL_PREFIX', '')}/debug")
+
+
+def _csrf_token():
+    return current_app.extensions["csrf"]._get_csrf_token()
+
+
+@bp.route("/session", methods=["GET"])
+def debug_session():
+    """Debug route to check session handling"""
+
+    # Set a test value in session
+    session["test_value"] = "Session is working"
+
+    # Return current session data
+    return jsonify({
+        "session_data": dict(session),
+        "cookies": dict(request.cookies),
+        "csrf_token": _csrf_token(),
+        "headers": dict(request.headers),
+    })
+
+@bp.route("/csrf", methods=["GET"])
+def debug_csrf():
+    """Debug route to reset CSRF protection"""
+
+    # Generate and set a new CSRF token
+    csrf_token = _csrf_token()
+
+    # Return current token
+    return jsonify({
+        "new_csrf_token": csrf_token,
+        "session_csrf_token": session.get("csrf_token", None),
+        "session_data": dict(session),
+        "cookies": dict(request.cookies),
+    })
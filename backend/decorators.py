@@ -2,10 +2,11 @@ import logging
 from datetime import datetime
 
 from ORM.authtokens import TokensAccessLevels, AuthToken
-from flask import request, Response
+from flask import request, Response, g
 import functools
 
-from db import create_session
+from db import get_session, use_replica
+from token_cache import token_cache, is_token_format, get_revocation_generation, CachedToken, MISS
 
 logger = logging.getLogger(__name__)
 
@@ -31,19 +32,41 @@ def token_auth(allow_anonymous=False):
             if token_type == "Bearer":
                 return Response("Unauthorized: JWT auth not supported!", 401)
 
-            session = create_session()
-
-            if token_type == "Token":
-                # print(token)
-                token: AuthToken = session.query(AuthToken).get(token)
-                if token and token.valid_until >= datetime.now():
-                    logger.info("Auth passed: %s", token)
-                    token_status = token.access_level
-                    user_id = token.user_id
-                else:
-                    return Response("Unauthorized: bad token!", 401)
-            else:
+            if token_type != "Token":
                 return Response("Unauthorized: bad token type!", 401)
+
+            if not is_token_format(token):
+                return Response("Unauthorized: bad token!", 401)
+
+            session = get_session()
+            if token_cache.enabled:
+                token_cache.sync(get_revocation_generation(session))
+            cached = token_cache.get(token)
+            if cached is MISS:
+                token_obj: AuthToken = session.query(AuthToken).get(token)
+                cached = CachedToken(
+                    token_obj.access_level, token_obj.user_id, token_obj.valid_until,
+                ) if token_obj else None
+                token_cache.put(token, cached)
+
+            if cached and cached.valid_until >= datetime.now():
+                logger.info("Auth passed: token of user %s", cached.user_id)
+                token_status = cached.access_level
+                user_id = cached.user_id
+                g.auth_user_id = user_id
+            else:
+                return Response("Unauthorized: bad token!", 401)
             return func(*args2, token_status=token_status, user_id=user_id, session=session,**kwargs2)
         return check_token_auth
     return decorator
+
+
+def replica_reads(func):
+    """
+Lets SELECTs of a read-only view go to a read replica (if configured). Place it below token_auth.
+    """
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        use_replica(get_session(), kwargs.get("user_id"))
+        return func(*args, **kwargs)
+    return wrapper
@@ -0,0 +1,201 @@
+import os
+import tempfile
+import threading
+import time
+
+from werkzeug.security import generate_password_hash, check_password_hash, DEFAULT_PBKDF2_ITERATIONS
+
+from ORM.users import User
+
+try:
+    import fcntl
+except ImportError:
+    # Not POSIX: slots are per process
+    fcntl = None
+
+PASSWORD_HASH_LENGTH = User.password_hash.type.length
+DEFAULT_LOCK_DIR = os.path.join(tempfile.gettempdir(), "todo-app-password-hashing")
+
+
+class HashingBusy(Exception):
+    """
+Hashing queue of the host is full, request should be retried later (503).
+    """
+
+
+def method_prefix(method: str) -> str:
+    """
+Prefix of hashes made by generate_password_hash with method, with werkzeug defaults filled in,
+e.g. "scrypt" -> "scrypt:32768:8:1".
+    :raise ValueError: unknown method
+    """
+    name, *args = method.split(":")
+    if name == "scrypt":
+        n, r, p = args or (2 ** 15, 8, 1)
+        return f"scrypt:{n}:{r}:{p}"
+    if name == "pbkdf2":
+        hash_name = args[0] if args else "sha256"
+        iterations = args[1] if len(args) > 1 else DEFAULT_PBKDF2_ITERATIONS
+        return f"pbkdf2:{hash_name}:{iterations}"
+    raise ValueError(f"Invalid hash method '{method}'.")
+
+
+class PasswordHasher:
+    """
+Bounds password hashing of all workers of the host. uWSGI workers run one request at a time,
+so a bound per process would never queue anything: slots are flock()ed files in lock_dir instead.
+A request takes one of `workers + max_queue` queue slots (none free - HashingBusy, 503 without hashing),
+then waits for one of `workers` run slots, so at most `workers` hashes burn CPU of the host at once.
+Waiting requests still hold their worker, but a login burst beyond the queue is rejected at once
+instead of occupying every uWSGI worker. Locks are released by the OS if a worker dies.
+Counters of stats() are per process.
+    """
+
+    def __init__(self, method="scrypt", workers=2, max_queue=16, lock_dir=DEFAULT_LOCK_DIR):
+        self.method = method
+        self.prefix = method_prefix(method)
+        self.workers = workers
+        self.max_queue = max_queue
+        self.lock_dir = lock_dir
+        self._lock = threading.Lock()
+        self._slots = {}  # name -> threading.Lock, without fcntl
+        self._pid = None
+        self._reset_counters()
+
+    def _reset_counters(self):
+        self.queued = 0
+        self.running = 0
+        self.completed = 0
+        self.rejected = 0
+        self.rehashed = 0
+        self.wait_seconds_sum = 0.0
+        self.wait_seconds_max = 0.0
+
+    def _acquire(self, name: str, blocking: bool = False):
+        """
+    :return: handle of the locked slot for _release, None if it is taken (not blocking)
+        """
+        if fcntl is None:
+            with self._lock:
+                slot = self._slots.setdefault(name, threading.Lock())
+            return slot if slot.acquire(blocking) else None
+        # New open file description every time: flock() of one fd doesn't exclude threads of the process
+        fd = os.open(os.path.join(self.lock_dir, name), os.O_RDWR | os.O_CREAT, 0o600)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX if blocking else fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            os.close(fd)
+            return None
+        return fd
+
+    @staticmethod
+    def _release(handle):
+        if fcntl is not None:
+            os.close(handle)
+        else:
+            handle.release()
+
+    def _run(self, func, *args):
+        with self._lock:
+            if self._pid != os.getpid():
+                if fcntl is not None:
+                    os.makedirs(self.lock_dir, exist_ok=True)
+                self._pid = os.getpid()
+                self._reset_counters()
+        submitted = time.perf_counter()
+        ticket = None
+        for i in range(self.workers + self.max_queue):
+            ticket = self._acquire(f"queue-{i}")
+            if ticket is not None:
+                break
+        else:
+            with self._lock:
+                self.rejected += 1
+            raise HashingBusy()
+        try:
+            with self._lock:
+                self.queued += 1
+            slot = None
+            for j in range(self.workers):
+                slot = self._acquire(f"run-{j}")
+                if slot is not None:
+                    break
+            else:
+                slot = self._acquire(f"run-{i % self.workers}", blocking=True)
+            wait = time.perf_counter() - submitted
+            with self._lock:
+                self.queued -= 1
+                self.running += 1
+                self.wait_seconds_sum += wait
+                self.wait_seconds_max = max(self.wait_seconds_max, wait)
+            try:
+                return func(*args)
+            finally:
+                self._release(slot)
+                with self._lock:
+                    self.running -= 1
+                    self.completed += 1
+        finally:
+            self._release(ticket)
+
+    def hash(self, password: str) -> str:
+        """
+    :return: hash of password with configured method
+    :raise HashingBusy: queue is full
+        """
+        pwhash = self._run(generate_password_hash, password, self.method)
+        if len(pwhash) > PASSWORD_HASH_LENGTH:
+            raise ValueError(
+                f"PASSWORD_HASH_METHOD={self.method} gives {len(pwhash)} chars hashes, "
+                f"users.password_hash column holds {PASSWORD_HASH_LENGTH}",
+            )
+        return pwhash
+
+    def check(self, pwhash: str, password: str) -> bool:
+        """
+    :raise HashingBusy: queue is full
+        """
+        return self._run(check_password_hash, pwhash, password)
+
+    def needs_rehash(self, pwhash: str) -> bool:
+        """
+True if hash was made with other method or cost than configured one (e.g. "scrypt:32768:8:1").
+        """
+        return pwhash.split("$", 1)[0] != self.prefix
+
+    def check_user(self, user, password: str) -> bool:
+        """
+Checks password of user and rehashes it with configured parameters if they changed.
+Caller commits the session if user.password_hash was changed.
+    :raise HashingBusy: queue is full
+        """
+        if not user.password_hash or not self.check(user.password_hash, password):
+            return False
+        if self.needs_rehash(user.password_hash):
+            user.password_hash = self.hash(password)
+            with self._lock:
+                self.rehashed += 1
+        return True
+
+    def stats(self) -> {str: int or float or str}:
+        with self._lock:
+            return {
+                "method": self.method,
+                "workers": self.workers,
+                "max_queue": self.max_queue,
+                "queue_depth": self.queued,
+                "running": self.running,
+                "completed": self.completed,
+                "rejected": self.rejected,
+                "rehashed": self.rehashed,
+                "wait_seconds_sum": round(self.wait_seconds_sum, 4),
+                "wait_seconds_max": round(self.wait_seconds_max, 4),
+            }
+
+
+password_hasher = PasswordHasher(
+    method=os.environ.get("PASSWORD_HASH_METHOD", "scrypt"),
+    workers=int(os.environ.get("PASSWORD_HASH_WORKERS", 2)),
+    max_queue=int(os.environ.get("PASSWORD_HASH_QUEUE", 16)),
+    lock_dir=os.environ.get("PASSWORD_HASH_LOCK_DIR", DEFAULT_LOCK_DIR),
+)
@@ -0,0 +1,114 @@
+import os
+import threading
+import time
+
+from sqlalchemy import event
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import QueuePool
+
+# Upper bounds (seconds) of connection wait time histogram buckets, last bucket is +inf
+WAIT_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 10.0, 30.0)
+
+
+class PoolMetrics:
+    """
+Counters of one DB connection pool of this worker process.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.created = 0
+        self.invalidated = 0
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_buckets = [0] * (len(WAIT_BUCKETS) + 1)
+        self.wait_sum = 0.0
+        self.wait_max = 0.0
+
+    def observe_wait(self, seconds: float, timed_out: bool = False):
+        bucket = len(WAIT_BUCKETS)
+        for i, bound in enumerate(WAIT_BUCKETS):
+            if seconds <= bound:
+                bucket = i
+                break
+        with self._lock:
+            self.wait_buckets[bucket] += 1
+            self.wait_sum += seconds
+            self.wait_max = max(self.wait_max, seconds)
+            if timed_out:
+                self.timeouts += 1
+
+    def _on_connect(self, *args):
+        with self._lock:
+            self.created += 1
+
+    def _on_checkout(self, *args):
+        with self._lock:
+            self.checkouts += 1
+
+    def _on_invalidate(self, *args):
+        with self._lock:
+            self.invalidated += 1
+
+    def attach(self, engine):
+        if isinstance(engine.pool, MeteredQueuePool):
+            engine.pool.metrics = self
+        event.listen(engine.pool, "connect", self._on_connect)
+        event.listen(engine.pool, "checkout", self._on_checkout)
+        event.listen(engine.pool, "invalidate", self._on_invalidate)
+        event.listen(engine.pool, "soft_invalidate", self._on_invalidate)
+
+    def stats(self, pool) -> dict:
+        with self._lock:
+            waits = sum(self.wait_buckets)
+            result = {
+                "pid": os.getpid(),
+                "pool_class": pool.__class__.__name__,
+                "created": self.created,
+                "invalidated": self.invalidated,
+                "checkouts": self.checkouts,
+                "timeouts": self.timeouts,
+                "wait_seconds": {
+                    "count": waits,
+                    "sum": self.wait_sum,
+                    "max": self.wait_max,
+                    "histogram": {
+                        **{f"le_{bound}": count for bound, count in zip(WAIT_BUCKETS, self.wait_buckets)},
+                        "le_inf": self.wait_buckets[-1],
+                    },
+                },
+            }
+        if isinstance(pool, QueuePool):
+            result.update({
+                "size": pool.size(),
+                "checked_in": pool.checkedin(),
+                "checked_out": pool.checkedout(),
+                "overflow": max(pool.overflow(), 0),
+            })
+        return result
+
+
+class MeteredQueuePool(QueuePool):
+    """
+QueuePool which reports time spent waiting for a connection to its PoolMetrics.
+    """
+
+    metrics: PoolMetrics = None
+
+    def _do_get(self):
+        if self.metrics is None:
+            return super()._do_get()
+        started = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except PoolTimeoutError:
+            self.metrics.observe_wait(time.perf_counter() - started, timed_out=True)
+            raise
+        self.metrics.observe_wait(time.perf_counter() - started)
+        return connection
+
+    def recreate(self):
+        # engine.dispose() replaces the pool, keep counting into the same metrics
+        pool = super().recreate()
+        pool.metrics = self.metrics
+        return pool
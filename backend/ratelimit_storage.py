@@ -0,0 +1,129 @@
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from urllib.parse import urlparse, parse_qs
+
+from limits.storage import Storage
+
+DEFAULT_STORAGE_URI = F"sqlite:///{os.path.join(tempfile.gettempdir(), 'todo-app-ratelimit.sqlite3')}"
+SQLITE_STRATEGIES = ("fixed-window",)
+
+
+def check_strategy(storage_uri: str, strategy: str):
+    """
+Fails at startup instead of on the first limited request if storage can't run the strategy.
+    :raise ValueError: strategy is not supported by SQLiteStorage
+    """
+    if urlparse(storage_uri).scheme in SQLiteStorage.STORAGE_SCHEME and strategy not in SQLITE_STRATEGIES:
+        raise ValueError(
+            f"RATELIMIT_STRATEGY={strategy} is not supported by SQLite rate limit storage, "
+            f"use {' or '.join(SQLITE_STRATEGIES)} or RATELIMIT_STORAGE_URI=memory:// or redis://...",
+        )
+
+
+class SQLiteStorage(Storage):
+    """
+Flask-Limiter (limits) storage in a local SQLite file, shared by all workers of the host:
+    sqlite:///path/to/file.sqlite3?max_keys=100000&purge_interval=60
+Counters of fixed windows are rows (key, count, expires), every hit is one upsert in a BEGIN IMMEDIATE
+transaction, so workers see the same counters. Expired rows are purged every purge_interval seconds
+and if there are more than max_keys rows the ones expiring first are evicted, so file size is bounded.
+Only fixed-window strategy (flask-limiter default) is supported, see check_strategy.
+    """
+
+    STORAGE_SCHEME = ["sqlite"]
+
+    def __init__(self, uri: str, wrap_exceptions: bool = False, **options):
+        super().__init__(uri, wrap_exceptions=wrap_exceptions, **options)
+        parsed = urlparse(uri)
+        params = {key: values[0] for key, values in parse_qs(parsed.query).items()}
+        # sqlite:////abs/path and sqlite:///relative/path, like SQLAlchemy URLs
+        self.path = parsed.path[1:]
+        self.max_keys = int(params.get("max_keys", 100000))
+        self.purge_interval = float(params.get("purge_interval", 60))
+        self._local = threading.local()
+        self._next_purge = 0.0
+        with self._connection() as connection:
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS limits "
+                "(key TEXT PRIMARY KEY, count INTEGER NOT NULL, expires REAL NOT NULL) WITHOUT ROWID",
+            )
+            connection.execute("CREATE INDEX IF NOT EXISTS ix_limits_expires ON limits (expires)")
+
+    @property
+    def base_exceptions(self):
+        return sqlite3.Error
+
+    def _connection(self) -> sqlite3.Connection:
+        # One connection per thread and process (connections must not cross fork)
+        connection = getattr(self._local, "connection", None)
+        if connection is None or self._local.pid != os.getpid():
+            connection = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            connection.execute("PRAGMA journal_mode=WAL")
+            # Counters don't need durability
+            connection.execute("PRAGMA synchronous=OFF")
+            self._local.connection = connection
+            self._local.pid = os.getpid()
+        return connection
+
+    def incr(self, key: str, expiry: int, amount: int = 1) -> int:
+        now = time.time()
+        connection = self._connection()
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            connection.execute(
+                "INSERT INTO limits (key, count, expires) VALUES (?, ?, ?) "
+                "ON CONFLICT (key) DO UPDATE SET "
+                "count = CASE WHEN expires <= ? THEN excluded.count ELSE count + excluded.count END, "
+                "expires = CASE WHEN expires <= ? THEN excluded.expires ELSE expires END",
+                (key, amount, now + expiry, now, now),
+            )
+            count = connection.execute("SELECT count FROM limits WHERE key = ?", (key,)).fetchone()[0]
+            if now >= self._next_purge:
+                self._purge(connection, now)
+            connection.execute("COMMIT")
+        except BaseException:
+            connection.execute("ROLLBACK")
+            raise
+        return count
+
+    def _purge(self, connection: sqlite3.Connection, now: float):
+        self._next_purge = now + self.purge_interval
+        connection.execute("DELETE FROM limits WHERE expires <= ?", (now,))
+        extra = connection.execute("SELECT count(*) FROM limits").fetchone()[0] - self.max_keys
+        if extra > 0:
+            connection.execute(
+                "DELETE FROM limits WHERE key IN (SELECT key FROM limits ORDER BY expires LIMIT ?)", (extra,),
+            )
+
+    def get(self, key: str) -> int:
+        row = self._connection().execute(
+            "SELECT count FROM limits WHERE key = ? AND expires > ?", (key, time.time()),
+        ).fetchone()
+        return row[0] if row else 0
+
+    def get_expiry(self, key: str) -> float:
+        row = self._connection().execute(
+            "SELECT expires FROM limits WHERE key = ? AND expires > ?", (key, time.time()),
+        ).fetchone()
+        return row[0] if row else time.time()
+
+    def check(self) -> bool:
+        try:
+            self._connection().execute("SELECT 1")
+            return True
+        except sqlite3.Error:
+            return False
+
+    def reset(self) -> int:
+        return self._connection().execute("DELETE FROM limits").rowcount
+
+    def clear(self, key: str) -> None:
+        self._connection().execute("DELETE FROM limits WHERE key = ?", (key,))
+
+    def stats(self) -> {str: int or str}:
+        row = self._connection().execute("SELECT count(*), coalesce(sum(expires > ?), 0) FROM limits", (time.time(),))
+        keys, active = row.fetchone()
+        return {"path": self.path, "keys": keys, "active_keys": active, "max_keys": self.max_keys}
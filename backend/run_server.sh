@@ -4,9 +4,14 @@ mkdir -p /static/todo-app/static/ || true
 # cp -r ./static/* /static/;
 cp -r ./static/* /static/todo-app/static/ || true
 
+# Workers don't create DB schema in production mode
+if [ "$STARTUP_MODE" = "production" ]; then
+  python3 utils_cmd.py migrate || exit 1
+fi
+
 if [ -f "/usr/bin/python3.14t" ]; then
   uwsgi --plugin http --http 0.0.0.0:5000 --plugin python3 --wsgi-file app.py --callable app --master --ini uWSGI.ini
 else
   # used default python3
-  uwsgi --plugin http --http 0.0.0.0:5000 --plugin python3 --wsgi-file app.py --callable app --master
+  uwsgi --plugin http --http 0.0.0.0:5000 --plugin python3 --wsgi-file app.py --callable app --master --enable-threads
 fi
@@ -0,0 +1,141 @@
+import json
+from datetime import date
+from typing import Any
+
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+from ORM.tasks import Task
+from ORM.users import User
+from ORM.authtokens import AuthToken
+
+# Columns for select(*COLUMNS): serializers below work on such rows as well as on ORM objects
+TASK_COLUMNS = (
+    Task.id,
+    Task.owner_id,
+    Task.parent,
+    Task.title,
+    Task.description,
+    Task.status,
+    Task.access_politics,
+    Task.creation_date,
+    Task.deadline,
+)
+TASK_SHORT_COLUMNS = (Task.id, Task.title, Task.status, Task.parent)
+USER_COLUMNS = (User.id, User.username, User.email, User.created_at, User.is_admin)
+TOKEN_COLUMNS = (AuthToken.id, AuthToken.access_level, AuthToken.valid_until, AuthToken.user_id)
+
+
+def serialize_task(row) -> {str: Any}:
+    """
+    :param row: Task or row with TASK_COLUMNS
+    """
+    return {
+        "id": row.id,
+        "owner_id": row.owner_id,
+        "parent": row.parent,
+        "title": row.title,
+        "description": row.description,
+        "status": row.status.value,
+        "access_politics": row.access_politics.name,
+        "creation_date": row.creation_date.isoformat(),
+        "deadline": row.deadline.isoformat() if row.deadline else None,
+    }
+
+
+def serialize_task_short(row) -> {str: Any}:
+    """
+    :param row: Task or row with TASK_SHORT_COLUMNS
+    """
+    return {
+        "id": row.id,
+        "title": row.title,
+        "status": row.status.value,
+        "parent": row.parent,
+    }
+
+
+def serialize_user(row) -> {str: Any}:
+    """
+    :param row: User or row with USER_COLUMNS
+    """
+    return {
+        "id": row.id,
+        "username": row.username,
+        "email": row.email,
+        "created_at": row.created_at.isoformat(),
+        "is_admin": row.is_admin,
+    }
+
+
+def serialize_token(row) -> {str: Any}:
+    """
+    :param row: AuthToken or row with TOKEN_COLUMNS
+    """
+    return {
+        "id": row.id,
+        "access_level": row.access_level.value,
+        "valid_until": row.valid_until.isoformat(),
+        "user_id": row.user_id,
+    }
+
+
+class FastJSONProvider(DefaultJSONProvider):
+    """
+JSON provider of the app (app.json): orjson if it is installed, stdlib json of DefaultJSONProvider otherwise.
+Output is the same with both: sorted keys, compact unless app.debug, dates in ISO 8601
+(DefaultJSONProvider gives RFC 822 dates).
+    """
+
+    engine = "orjson" if orjson is not None else "json"
+
+    @staticmethod
+    def default(o):
+        if isinstance(o, date):
+            return o.isoformat()
+        return DefaultJSONProvider.default(o)
+
+    def _options(self) -> int:
+        options = orjson.OPT_NON_STR_KEYS
+        if self.sort_keys:
+            options |= orjson.OPT_SORT_KEYS
+        if self.compact is False or (self.compact is None and self._app.debug):
+            options |= orjson.OPT_INDENT_2
+        return options
+
+    def dumps(self, obj: Any, **kwargs: Any) -> str:
+        # Custom json.dumps arguments (e.g. from tojson filter) are only supported by stdlib json
+        if orjson is None or kwargs:
+            return super().dumps(obj, **kwargs)
+        return orjson.dumps(obj, default=self.default, option=self._options()).decode("utf-8")
+
+    def loads(self, s: str or bytes, **kwargs: Any) -> Any:
+        if orjson is None or kwargs:
+            return super().loads(s, **kwargs)
+        return orjson.loads(s)
+
+    def response(self, *args: Any, **kwargs: Any):
+        if orjson is None:
+            return super().response(*args, **kwargs)
+        obj = self._prepare_response_obj(args, kwargs)
+        body = orjson.dumps(obj, default=self.default, option=self._options() | orjson.OPT_APPEND_NEWLINE)
+        return self._app.response_class(body, mimetype=self.mimetype)
+
+
+def dumps(obj: Any) -> str:
+    """
+Compact JSON without app context (CLI, streams), same encoding as FastJSONProvider.
+    """
+    if orjson is not None:
+        return orjson.dumps(obj, default=FastJSONProvider.default, option=orjson.OPT_NON_STR_KEYS).decode("utf-8")
+    return json.dumps(obj, default=FastJSONProvider.default, separators=(",", ":"))
+
+
+def loads(s: str or bytes) -> Any:
+    if orjson is not None:
+        return orjson.loads(s)
+    return json.loads(s)
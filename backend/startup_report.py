@@ -0,0 +1,98 @@
+import builtins
+import logging
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+# Slowest module imports kept in the report
+IMPORT_REPORT_SIZE = 20
+
+
+class StartupReport:
+    """
+Startup timings of the process: duration of app.py steps (imports, DB init, app setup), slowest module imports,
+time until the app is ready and until the first request starts (from import of this module).
+Under uWSGI without lazy-apps the app is imported in the master, so workers report master's timings
+and their first request counts from that import.
+    """
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.steps = {}
+        self.imports = {}
+        self._original_import = None
+        self.ready_seconds = None
+        self.first_request_seconds = None
+        self._lock = threading.Lock()
+
+    def elapsed(self) -> float:
+        return round(time.perf_counter() - self.started, 4)
+
+    @contextmanager
+    def step(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.steps[name] = round(time.perf_counter() - start, 4)
+
+    def track_imports(self):
+        """
+Records duration of the first import of every module until ready(), including its nested imports
+(like cumulative column of python -X importtime). Only import statements are seen, not importlib calls.
+        """
+        if self._original_import is not None:
+            return
+        original = self._original_import = builtins.__import__
+
+        def timed_import(name, globals=None, locals=None, fromlist=(), level=0):
+            if level or name in sys.modules:
+                return original(name, globals, locals, fromlist, level)
+            start = time.perf_counter()
+            module = original(name, globals, locals, fromlist, level)
+            self.imports.setdefault(name, round(time.perf_counter() - start, 4))
+            return module
+
+        builtins.__import__ = timed_import
+
+    def slowest_imports(self) -> {str: float}:
+        return dict(sorted(self.imports.items(), key=lambda item: item[1], reverse=True)[:IMPORT_REPORT_SIZE])
+
+    def ready(self):
+        if self._original_import is not None:
+            builtins.__import__ = self._original_import
+        self.ready_seconds = self.elapsed()
+        logger.info(
+            "Startup: ready in %ss (%s)",
+            self.ready_seconds, ", ".join(f"{name} {seconds}s" for name, seconds in self.steps.items()),
+        )
+        logger.debug(
+            "Startup: slowest imports: %s",
+            ", ".join(f"{name} {seconds}s" for name, seconds in self.slowest_imports().items()),
+        )
+
+    def request_started(self):
+        """
+before_request hook, only the first call of the process does something.
+        """
+        if self.first_request_seconds is not None:
+            return
+        with self._lock:
+            if self.first_request_seconds is None:
+                self.first_request_seconds = self.elapsed()
+                logger.info("Startup: first request of process %s after %ss", os.getpid(), self.first_request_seconds)
+
+    def stats(self) -> {str: float or dict}:
+        return {
+            "steps": dict(self.steps),
+            "imports": self.slowest_imports(),
+            "ready_seconds": self.ready_seconds,
+            "first_request_seconds": self.first_request_seconds,
+        }
+
+
+startup_report = StartupReport()
@@ -0,0 +1,81 @@
+from typing import Any, Iterable, Iterator
+
+from flask import Response, current_app, request, stream_with_context
+from sqlalchemy.orm import Session
+
+NDJSON_MIMETYPE = "application/x-ndjson"
+
+# Rows per server-side cursor fetch (yield_per) of streaming views
+STREAM_CHUNK_SIZE = 1000
+# Encoded items per write to the WSGI server
+STREAM_BATCH_SIZE = 500
+
+
+def wants_ndjson() -> bool:
+    return request.accept_mimetypes.best_match(["application/json", NDJSON_MIMETYPE]) == NDJSON_MIMETYPE
+
+
+def streaming_requested() -> bool:
+    """
+Stream mode of listing views: ?stream=true or Accept: application/x-ndjson.
+    """
+    return request.args.get("stream", "").lower() in ("1", "true", "yes") or wants_ndjson()
+
+
+def _batches(items: Iterable[Any], batch_size: int) -> Iterator[list[str]]:
+    dumps = current_app.json.dumps
+    batch = []
+    for item in items:
+        batch.append(dumps(item))
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def iter_json_array(items: Iterable[Any], head: str = "[", tail: str = "]") -> Iterator[str]:
+    """
+Encodes items one by one as a JSON array. head and tail can wrap it into an object, e.g. '{"tasks": [' and ']}'.
+    """
+    yield head
+    separator = ""
+    for batch in _batches(items, STREAM_BATCH_SIZE):
+        yield separator + ",".join(batch)
+        separator = ","
+    yield tail
+
+
+def iter_ndjson(items: Iterable[Any]) -> Iterator[str]:
+    for batch in _batches(items, STREAM_BATCH_SIZE):
+        yield "\n".join(batch) + "\n"
+
+
+def stream_response(items: Iterable[Any], session: Session = None, head: str = "[", tail: str = "]") -> Response:
+    """
+Chunked response with items encoded while they are fetched: JSON array (see iter_json_array)
+or NDJSON if client accepts it. Memory use doesn't depend on number of items.
+    :param items: iterator of JSON serializable items, e.g. rows of a yield_per query
+    :param session: DB session used by items
+    """
+    if wants_ndjson():
+        return stream_chunks(iter_ndjson(items), session, NDJSON_MIMETYPE)
+    return stream_chunks(iter_json_array(items, head, tail), session, "application/json")
+
+
+def stream_chunks(chunks: Iterable[str or bytes], session: Session = None, mimetype: str = None) -> Response:
+    """
+Chunked response of already encoded chunks. Request context is kept until the stream ends,
+session is closed after the last chunk (or on client disconnect).
+    """
+    def generate():
+        try:
+            yield from chunks
+        finally:
+            if session is not None:
+                session.close()
+
+    response = Response(stream_with_context(generate()), mimetype=mimetype)
+    # nginx passes chunks to the client as they come instead of buffering the whole response
+    response.headers["X-Accel-Buffering"] = "no"
+    return response
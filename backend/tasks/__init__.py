@@ -1 +1,15 @@
-from .tasks_list import get_user_tasks
+from .tasks_list import get_user_tasks, get_user_tasks_page, iter_user_tasks, PAGE_ORDERS
+from .tasks_tree import get_task_subtree, build_task_tree, share_subtree, MAX_SUBTREE_DEPTH
+from .tasks_batch import create_tasks, MAX_BATCH_SIZE
+from .tasks_bulk import update_tasks, parse_patch, MAX_BULK_IDS, BULK_FILTERS
+from .tasks_write import update_task_returning, delete_task_returning
+from .tasks_import import TaskImporter, read_records, IMPORT_FORMATS
+from .etags import task_list_etag, task_etag, select_task_with_version, not_modified
+from .tasks_closure import (
+    get_descendant_ids,
+    get_ancestor_ids,
+    is_descendant,
+    get_task_depth,
+    nearest_common_ancestor,
+    get_effective_politics,
+)
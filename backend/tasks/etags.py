@@ -0,0 +1,72 @@
+import hashlib
+import hmac
+
+from flask import current_app, request, Response
+from sqlalchemy import select, func, Select
+from sqlalchemy.orm import Session
+
+from ORM.tasks import Task
+from serialization import TASK_COLUMNS
+from ORM.taskversion import TaskVersion, TaskListVersion, SHARED_SCOPES, user_scope
+
+
+def _etag(*parts) -> str:
+    """
+HMAC of the parts keyed with app secret key: clients can't compute a tag themselves to probe
+whether a task exists and which version it has.
+    """
+    key = current_app.secret_key
+    if isinstance(key, str):
+        key = key.encode("utf-8")
+    message = ":".join(str(part) for part in parts).encode("utf-8")
+    return hmac.new(key, message, hashlib.sha256).hexdigest()[:32]
+
+
+def task_list_etag(session: Session, user_id: int, token_level: int) -> str:
+    """
+ETag of GET /tasks page: the list consists of user's own tasks and tasks shared with everyone,
+so it changes only with "user:<id>" and "shared:<partition>" counters (one primary key IN lookup).
+Query string (filters, cursor, limit) is a part of the tag. The list holds only what the requester may read;
+filter_user (403 for non-admins) is never tagged.
+    """
+    versions = dict(session.execute(
+        select(TaskListVersion.scope, TaskListVersion.version)
+        .where(TaskListVersion.scope.in_([user_scope(user_id), *SHARED_SCOPES])),
+    ).all())
+    return _etag(
+        "list", user_id, token_level,
+        *(versions.get(scope, 0) for scope in [user_scope(user_id), *SHARED_SCOPES]),
+        request.query_string.decode("utf-8", "replace"),
+    )
+
+
+def select_task_with_version(task_id: int) -> Select:
+    """
+    :return: select of TASK_COLUMNS with task version counter as "version" column (one primary key lookup)
+    """
+    return (
+        select(*TASK_COLUMNS, func.coalesce(TaskVersion.version, 0).label("version"))
+        .outerjoin(TaskVersion, TaskVersion.task_id == Task.id)
+        .where(Task.id == task_id)
+    )
+
+
+def task_etag(task, user_id: int or None, token_level: int or None) -> str:
+    """
+ETag of GET /tasks/<id> from the task version counter (row of select_task_with_version).
+Every write of the task, including access_politics changes, bumps the counter, so permissions are rechecked
+after any change. Tag depends on the requester: one user's tag is useless for another one.
+Call it only after the requester is allowed to read the task, so 304 is never returned instead of 403.
+    """
+    return _etag("task", task.id, task.version, user_id, token_level)
+
+
+def not_modified(etag: str or None) -> Response or None:
+    """
+    :return: 304 response if If-None-Match of the request matches the ETag, otherwise None
+    """
+    if etag is None or etag not in request.if_none_match:
+        return None
+    response = Response(status=304)
+    response.set_etag(etag)
+    return response
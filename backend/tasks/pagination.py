@@ -0,0 +1,25 @@
+import base64
+import json
+
+
+def encode_cursor(values: list) -> str:
+    """
+Packs keyset values of the last returned row into opaque cursor string.
+    """
+    raw = json.dumps(values, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> list:
+    """
+Unpacks cursor made by encode_cursor.
+    :raises ValueError: if cursor is malformed
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        values = json.loads(raw)
+    except ValueError as e:
+        raise ValueError("Malformed cursor") from e
+    if not isinstance(values, list) or not values:
+        raise ValueError("Malformed cursor")
+    return values
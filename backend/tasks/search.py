@@ -0,0 +1,170 @@
+"""
+Full-text search of tasks (filter_search).
+
+Engine is selected by DB_TYPE:
+    * postgresql - generated tsvector column + GIN index
+    * mariadb/mysql - FULLTEXT index
+    * sqlite - FTS5 external content table kept in sync by triggers
+    * other - ILIKE fallback (no index)
+
+Indexes are maintained by DB itself, so every write path (API, webapp, cascades) keeps them in sync.
+"""
+import os
+import re
+
+import sqlalchemy as sa
+from sqlalchemy.orm import Query
+from sqlalchemy.dialects.mysql import match as mysql_match
+
+from db import get_db_type
+from ORM.tasks import Task
+
+SEARCH_LANGUAGE = os.environ.get("SEARCH_LANGUAGE", "simple")
+# Name of a PostgreSQL text search configuration, it is a part of the generated column DDL
+SEARCH_LANGUAGE_FORMAT = re.compile(r"[A-Za-z_][A-Za-z0-9_]*")
+
+
+class LikeSearch:
+    """
+Fallback for DBs without supported full-text engine.
+    """
+
+    def init_index(self, connection):
+        pass
+
+    def apply(self, query: Query, text: str) -> (Query, sa.ColumnElement or None):
+        """
+    :return: (filtered query, relevance sort key: ascending, best match first; None if engine doesn't rank)
+        """
+        query = query.filter(
+            sa.or_(
+                Task.title.ilike(f"%{text}%"),
+                Task.description.ilike(f"%{text}%"),
+            ),
+        )
+        return query, None
+
+
+class PostgresSearch(LikeSearch):
+    vector = sa.literal_column("tasks.search_vector")
+
+    def init_index(self, connection):
+        known = SEARCH_LANGUAGE_FORMAT.fullmatch(SEARCH_LANGUAGE) and connection.execute(
+            sa.text("SELECT 1 FROM pg_ts_config WHERE cfgname = :name"),
+            {"name": SEARCH_LANGUAGE},
+        ).first()
+        if not known:
+            raise ValueError(f"SEARCH_LANGUAGE={SEARCH_LANGUAGE!r} is not a text search configuration of the DB")
+        connection.execute(sa.text(
+            "ALTER TABLE tasks ADD COLUMN IF NOT EXISTS search_vector tsvector GENERATED ALWAYS AS ("
+            f"to_tsvector('{SEARCH_LANGUAGE}', coalesce(title, '') || ' ' || coalesce(description, ''))"
+            ") STORED",
+        ))
+        connection.execute(sa.text(
+            "CREATE INDEX IF NOT EXISTS ix_tasks_search_vector ON tasks USING GIN (search_vector)",
+        ))
+
+    def apply(self, query, text):
+        ts_query = sa.func.websearch_to_tsquery(SEARCH_LANGUAGE, text)
+        query = query.filter(self.vector.op("@@")(ts_query))
+        return query, -sa.func.ts_rank(self.vector, ts_query, type_=sa.Float)
+
+
+class MariaDBSearch(LikeSearch):
+
+    def init_index(self, connection):
+        indexes = sa.inspect(connection).get_indexes("tasks")
+        if not any(index["name"] == "ix_tasks_fulltext" for index in indexes):
+            connection.execute(sa.text("CREATE FULLTEXT INDEX ix_tasks_fulltext ON tasks (title, description)"))
+
+    def apply(self, query, text):
+        relevance = mysql_match(Task.title, Task.description, against=text).in_natural_language_mode()
+        return query.filter(relevance), -relevance
+
+
+class SQLiteSearch(LikeSearch):
+    fts = sa.literal_column("tasks_fts")
+    fts_rowid = sa.literal_column("tasks_fts.rowid")
+
+    def init_index(self, connection):
+        exists = connection.execute(
+            sa.text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'tasks_fts'"),
+        ).first()
+        if exists:
+            return
+        connection.execute(sa.text(
+            "CREATE VIRTUAL TABLE tasks_fts USING fts5(title, description, content='tasks', content_rowid='id')",
+        ))
+        connection.execute(sa.text(
+            "CREATE TRIGGER tasks_fts_ai AFTER INSERT ON tasks BEGIN "
+            "INSERT INTO tasks_fts(rowid, title, description) VALUES (new.id, new.title, new.description); "
+            "END",
+        ))
+        connection.execute(sa.text(
+            "CREATE TRIGGER tasks_fts_ad AFTER DELETE ON tasks BEGIN "
+            "INSERT INTO tasks_fts(tasks_fts, rowid, title, description) "
+            "VALUES ('delete', old.id, old.title, old.description); "
+            "END",
+        ))
+        connection.execute(sa.text(
+            "CREATE TRIGGER tasks_fts_au AFTER UPDATE OF title, description ON tasks BEGIN "
+            "INSERT INTO tasks_fts(tasks_fts, rowid, title, description) "
+            "VALUES ('delete', old.id, old.title, old.description); "
+            "INSERT INTO tasks_fts(rowid, title, description) VALUES (new.id, new.title, new.description); "
+            "END",
+        ))
+        # Index tasks created before search was enabled
+        connection.execute(sa.text("INSERT INTO tasks_fts(tasks_fts) VALUES ('rebuild')"))
+
+    @staticmethod
+    def fts_query(text: str) -> str:
+        # Quote every word, so user input is never parsed as FTS5 query syntax
+        return " ".join('"' + word.replace('"', '""') + '"' for word in text.split())
+
+    def apply(self, query, text):
+        fts_query = self.fts_query(text)
+        if not fts_query:
+            # Nothing to match, same as empty tsquery of PostgreSQL
+            return query.filter(sa.false()), None
+        query = query.join(sa.table("tasks_fts"), self.fts_rowid == Task.id).filter(
+            self.fts.op("MATCH")(fts_query),
+        )
+        return query, sa.func.bm25(self.fts, type_=sa.Float)
+
+
+def get_search_engine() -> LikeSearch:
+    match get_db_type():
+        case "postgresql":
+            return PostgresSearch()
+        case "mariadb" | "mysql":
+            return MariaDBSearch()
+        case "sqlite":
+            return SQLiteSearch()
+        case _:
+            return LikeSearch()
+
+
+def init_search_index(engine):
+    """
+Creates full-text index (if missing) for DB selected by DB_TYPE.
+    """
+    with engine.begin() as connection:
+        get_search_engine().init_index(connection)
+
+
+def search_tasks_ranked(query: Query, text: str) -> (Query, sa.ColumnElement or None):
+    """
+Filters query of tasks by full-text search without ordering it.
+    :return: (filtered query, relevance sort key: ascending, best match first; None if engine doesn't rank)
+    """
+    return get_search_engine().apply(query, text)
+
+
+def search_tasks(query: Query, text: str) -> Query:
+    """
+Filters query of tasks by full-text search and orders it by relevance.
+    """
+    query, rank = search_tasks_ranked(query, text)
+    if rank is not None:
+        query = query.order_by(rank, Task.id)
+    return query
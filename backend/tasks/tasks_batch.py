@@ -0,0 +1,149 @@
+from datetime import datetime
+from typing import Any
+
+from sqlalchemy import select, insert
+from sqlalchemy.orm import Session
+
+from ORM.tasks import Task, TaskStatus, TaskShareLevel, READABLE_POLITICS
+from ORM.taskclosure import link_tasks
+from ORM.taskversion import bump_versions
+
+MAX_BATCH_SIZE = 10000
+# Size of IN (...) lists, old SQLite allows only 999 parameters per statement
+IN_CHUNK_SIZE = 500
+
+TITLE_LENGTH = Task.__table__.c.title.type.length
+DESCRIPTION_LENGTH = Task.__table__.c.description.type.length
+
+
+def parse_task_item(label: str, item: Any, owner_id: int, now: datetime) -> dict:
+    """
+Validates one task payload (same rules as POST /tasks) and converts it to a row of tasks table.
+Used by batch creation and import. Parent isn't checked for existence here.
+    :param label: item name for error messages, e.g. "Task 3"
+    :param owner_id: owner of the task
+    :param now: creation date (and default deadline)
+    :return: column values for insert_task_rows
+    :raise ValueError: with message for client
+    """
+    if not isinstance(item, dict):
+        raise ValueError(f"{label}: object expected")
+    title = item.get("title")
+    if not isinstance(title, str) or not title:
+        raise ValueError(f"{label}: missing required fields")
+    if len(title) > TITLE_LENGTH:
+        raise ValueError(f"{label}: title is longer than {TITLE_LENGTH}")
+    description = item.get("description")
+    if description is not None and (not isinstance(description, str) or len(description) > DESCRIPTION_LENGTH):
+        raise ValueError(f"{label}: description must be a string up to {DESCRIPTION_LENGTH} chars")
+    parent = item.get("parent")
+    if parent is not None and (not isinstance(parent, int) or isinstance(parent, bool)):
+        raise ValueError(f"{label}: parent must be a task ID")
+    if parent is not None and item.get("parent_temp_id") is not None:
+        raise ValueError(f"{label}: parent and parent_temp_id are mutually exclusive")
+
+    if "deadline" not in item:
+        deadline = now
+    elif item["deadline"] is None:
+        deadline = None
+    else:
+        try:
+            deadline = datetime.fromisoformat(item["deadline"])
+        except (TypeError, ValueError):
+            raise ValueError(f"{label}: invalid date format for deadline")
+
+    status = item.get("status")
+    politics = item.get("access_politics")
+    return {
+        "owner_id": owner_id,
+        "parent": parent,
+        "title": title,
+        "description": description,
+        "status": TaskStatus(status) if status in [s.value for s in TaskStatus] else TaskStatus.NONE,
+        "access_politics": TaskShareLevel[politics] if politics in TaskShareLevel.__members__
+        else TaskShareLevel.PRIVATE,
+        "creation_date": now,
+        "deadline": deadline,
+    }
+
+
+def _is_temp_id(value: Any) -> bool:
+    # bool is int, True would collide with 1
+    return isinstance(value, (str, int)) and not isinstance(value, bool)
+
+
+def insert_task_rows(session: Session, rows: [dict]) -> [int]:
+    """
+Inserts rows of tasks table (parse_task_item) with one multi-row INSERT ... RETURNING id.
+task_closure and version counters are not updated, caller does it (link_tasks, bump_versions).
+    :return: IDs of new tasks in order of rows
+    """
+    if session.get_bind().dialect.insert_executemany_returning_sort_by_parameter_order:
+        # Multi-row INSERT ... RETURNING, ids come back in order of rows
+        return list(session.scalars(insert(Task).returning(Task.id, sort_by_parameter_order=True), rows))
+    # MariaDB < 10.5 and SQLite < 3.35 have no RETURNING
+    return [session.execute(insert(Task).values(**row)).inserted_primary_key[0] for row in rows]
+
+
+def create_tasks(session: Session, owner_id: int, items: [dict]) -> [int]:
+    """
+Creates tasks of owner from list of payloads (fields of POST /tasks) in the session transaction.
+Task may reference a task created earlier in the same batch by "parent_temp_id" equal to its "temp_id".
+All payloads are validated before the first INSERT. Tasks are inserted level by level
+(one multi-row INSERT per level of intra-batch hierarchy), closure rows are added set-based.
+Caller commits the session.
+    :param session: DB session
+    :param owner_id: ID of owner of new tasks
+    :param items: list of task payloads
+    :return: IDs of created tasks in order of items
+    :raise ValueError: validation error with message for client, nothing is inserted
+    """
+    now = datetime.utcnow()
+    rows = []
+    levels = []
+    parent_indexes = []
+    temp_ids = {}
+    for index, item in enumerate(items):
+        rows.append(parse_task_item(f"Task {index}", item, owner_id, now))
+        parent_temp_id = item.get("parent_temp_id")
+        if parent_temp_id is None:
+            parent_indexes.append(None)
+            levels.append(0)
+        elif not _is_temp_id(parent_temp_id):
+            raise ValueError(f"Task {index}: parent_temp_id must be a string or integer")
+        elif parent_temp_id in temp_ids:
+            parent_indexes.append(temp_ids[parent_temp_id])
+            levels.append(levels[temp_ids[parent_temp_id]] + 1)
+        else:
+            raise ValueError(f"Task {index}: parent_temp_id must reference temp_id of an earlier task")
+        temp_id = item.get("temp_id")
+        if temp_id is not None:
+            if not _is_temp_id(temp_id) or temp_id in temp_ids:
+                raise ValueError(f"Task {index}: temp_id must be a unique string or integer")
+            temp_ids[temp_id] = index
+
+    parents = sorted({row["parent"] for row in rows if row["parent"] is not None})
+    found = set()
+    for i in range(0, len(parents), IN_CHUNK_SIZE):
+        chunk = parents[i:i + IN_CHUNK_SIZE]
+        found.update(session.scalars(select(Task.id).where(Task.id.in_(chunk))))
+    missing = [parent for parent in parents if parent not in found]
+    if missing:
+        raise ValueError(f"Parent tasks not found: {missing[:10]}")
+
+    ids = [None] * len(rows)
+    for level in range(max(levels) + 1 if levels else 0):
+        indexes = [i for i, item_level in enumerate(levels) if item_level == level]
+        for i in indexes:
+            if parent_indexes[i] is not None:
+                rows[i]["parent"] = ids[parent_indexes[i]]
+        level_ids = insert_task_rows(session, [rows[i] for i in indexes])
+        for i, task_id in zip(indexes, level_ids):
+            ids[i] = task_id
+        for i in range(0, len(level_ids), IN_CHUNK_SIZE):
+            link_tasks(session.connection(), level_ids[i:i + IN_CHUNK_SIZE])
+    if rows:
+        bump_versions(
+            session.connection(), [owner_id], any(row["access_politics"] in READABLE_POLITICS for row in rows),
+        )
+    return ids
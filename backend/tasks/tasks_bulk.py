@@ -0,0 +1,130 @@
+from datetime import datetime
+from typing import Any
+
+from sqlalchemy import select, update, or_, true
+from sqlalchemy.orm import Session
+
+from ORM.tasks import Task, TaskStatus, TaskShareLevel, WRITABLE_POLITICS, READABLE_POLITICS
+from ORM.taskversion import bump_versions
+from .tasks_batch import IN_CHUNK_SIZE, TITLE_LENGTH, DESCRIPTION_LENGTH
+
+MAX_BULK_IDS = 10000
+
+BULK_FILTERS = ("parent", "status")
+
+
+def writable_predicate(user_id: int, is_admin: bool, owner_only: bool = False, task=Task):
+    """
+SQL condition of tasks user can change: own tasks and tasks shared with RW_* level (only own ones with owner_only).
+Same rules as PUT /tasks/<id>.
+    :param task: Task or its alias the condition is about
+    """
+    if is_admin:
+        return true()
+    if owner_only:
+        return task.owner_id == user_id
+    return or_(task.owner_id == user_id, task.access_politics.in_(WRITABLE_POLITICS))
+
+
+def parse_patch(data: Any) -> {str: Any}:
+    """
+Validates field patch of bulk update and converts it to column values.
+    :raise ValueError: with message for client
+    """
+    if not isinstance(data, dict) or not data:
+        raise ValueError("patch must be a non-empty object")
+    values = {}
+    for key, value in data.items():
+        if key == "title":
+            if not isinstance(value, str) or not value or len(value) > TITLE_LENGTH:
+                raise ValueError(f"title must be a non-empty string up to {TITLE_LENGTH} chars")
+            values["title"] = value
+        elif key == "description":
+            if value is not None and (not isinstance(value, str) or len(value) > DESCRIPTION_LENGTH):
+                raise ValueError(f"description must be a string up to {DESCRIPTION_LENGTH} chars")
+            values["description"] = value
+        elif key == "status":
+            if value not in [status.value for status in TaskStatus]:
+                raise ValueError("Invalid status")
+            values["status"] = TaskStatus(value)
+        elif key == "access_politics":
+            if value not in TaskShareLevel.__members__:
+                raise ValueError("Invalid access_politics")
+            values["access_politics"] = TaskShareLevel[value]
+        elif key == "deadline":
+            try:
+                values["deadline"] = datetime.fromisoformat(value) if value is not None else None
+            except (TypeError, ValueError):
+                raise ValueError("Invalid date format for deadline")
+        else:
+            raise ValueError(f"Field {key} can't be changed in bulk")
+    return values
+
+
+def update_returning(session: Session, where: list, values: {str: Any}) -> [int]:
+    """
+Runs UPDATE tasks SET values WHERE where, bumps version counters and returns IDs of changed tasks.
+Uses UPDATE ... RETURNING if DB supports it, otherwise (MariaDB) locks matching rows
+with SELECT ... FOR UPDATE and updates them by ID in the same transaction.
+    """
+    statement = update(Task).values(**values).execution_options(synchronize_session=False)
+    columns = (Task.id, Task.owner_id, Task.access_politics)
+    if session.get_bind().dialect.update_returning:
+        rows = session.execute(statement.where(*where).returning(*columns)).all()
+    else:
+        rows = session.execute(select(*columns).where(*where).with_for_update()).all()
+        for i in range(0, len(rows), IN_CHUNK_SIZE):
+            session.execute(statement.where(Task.id.in_([row.id for row in rows[i:i + IN_CHUNK_SIZE]])))
+    if rows:
+        bump_versions(
+            session.connection(),
+            {row.owner_id for row in rows},
+            "access_politics" in values or any(row.access_politics in READABLE_POLITICS for row in rows),
+            [row.id for row in rows],
+        )
+    return [row.id for row in rows]
+
+
+def update_tasks(
+    session: Session,
+    user_id: int,
+    is_admin: bool,
+    values: {str: Any},
+    ids: [int] = None,
+    filters: {str: Any} = None,
+) -> {str: [int]}:
+    """
+Applies the same field values to many tasks. Permission rules are part of UPDATE ... WHERE,
+so tasks are neither loaded nor checked one by one. Caller commits the session.
+    :param session: DB session
+    :param user_id: ID of request sender
+    :param is_admin: admin can change any task
+    :param values: column values (see parse_patch)
+    :param ids: IDs of tasks to change
+    :param filters: conditions instead of IDs: {"parent": ID or None, "status": "PENDING"}
+    :return: {"updated": [...]} and for ids also {"forbidden": [...], "not_found": [...]}
+    """
+    permission = writable_predicate(user_id, is_admin, owner_only="access_politics" in values)
+    if ids is None:
+        where = [permission]
+        if "parent" in filters:
+            parent = filters["parent"]
+            where.append(Task.parent == parent if parent is not None else Task.parent.is_(None))
+        if "status" in filters:
+            where.append(Task.status == TaskStatus(filters["status"]))
+        return {"updated": sorted(update_returning(session, where, values))}
+
+    ids = sorted(set(ids))
+    updated = []
+    for i in range(0, len(ids), IN_CHUNK_SIZE):
+        updated += update_returning(session, [Task.id.in_(ids[i:i + IN_CHUNK_SIZE]), permission], values)
+    updated_set = set(updated)
+    rest = [task_id for task_id in ids if task_id not in updated_set]
+    existing = set()
+    for i in range(0, len(rest), IN_CHUNK_SIZE):
+        existing.update(session.scalars(select(Task.id).where(Task.id.in_(rest[i:i + IN_CHUNK_SIZE]))))
+    return {
+        "updated": sorted(updated),
+        "forbidden": [task_id for task_id in rest if task_id in existing],
+        "not_found": [task_id for task_id in rest if task_id not in existing],
+    }
@@ -0,0 +1,120 @@
+import logging
+
+from sqlalchemy import select, insert, delete, literal, func
+from sqlalchemy.orm import Session, aliased
+
+from ORM.tasks import Task, TaskShareLevel
+from ORM.taskclosure import TaskClosure
+
+from .tasks_tree import MAX_SUBTREE_DEPTH
+
+logger = logging.getLogger(__name__)
+
+
+def get_descendant_ids(session: Session, task_id: int, max_depth: int = None, include_self: bool = False) -> [int]:
+    """
+IDs of task descendants (nearest first).
+    """
+    query = select(TaskClosure.descendant_id).where(TaskClosure.ancestor_id == task_id)
+    if not include_self:
+        query = query.where(TaskClosure.depth > 0)
+    if max_depth is not None:
+        query = query.where(TaskClosure.depth <= max_depth)
+    return list(session.scalars(query.order_by(TaskClosure.depth, TaskClosure.descendant_id)))
+
+
+def get_ancestor_ids(session: Session, task_id: int) -> [int]:
+    """
+IDs of task ancestors, from parent to root.
+    """
+    query = (
+        select(TaskClosure.ancestor_id)
+        .where(TaskClosure.descendant_id == task_id, TaskClosure.depth > 0)
+        .order_by(TaskClosure.depth)
+    )
+    return list(session.scalars(query))
+
+
+def is_descendant(session: Session, ancestor_id: int, task_id: int) -> bool:
+    """
+Is task under ancestor (or the same task).
+    """
+    query = select(TaskClosure.depth).where(
+        TaskClosure.ancestor_id == ancestor_id,
+        TaskClosure.descendant_id == task_id,
+    )
+    return session.execute(query).first() is not None
+
+
+def get_task_depth(session: Session, task_id: int) -> int or None:
+    """
+Depth of task in the hierarchy (0 - root task), None if task does not exist.
+    """
+    return session.scalar(select(func.max(TaskClosure.depth)).where(TaskClosure.descendant_id == task_id))
+
+
+def nearest_common_ancestor(session: Session, first_id: int, second_id: int) -> int or None:
+    """
+Nearest task which is ancestor (or self) of both tasks.
+    """
+    first = aliased(TaskClosure)
+    second = aliased(TaskClosure)
+    query = (
+        select(first.ancestor_id)
+        .join(second, second.ancestor_id == first.ancestor_id)
+        .where(first.descendant_id == first_id, second.descendant_id == second_id)
+        .order_by(first.depth)
+        .limit(1)
+    )
+    return session.scalar(query)
+
+
+def get_effective_politics(session: Session, task_id: int) -> TaskShareLevel or None:
+    """
+Access politics of task, PARENT_SELECT resolved to the nearest ancestor with own politics.
+    """
+    query = (
+        select(Task.access_politics)
+        .join(TaskClosure, TaskClosure.ancestor_id == Task.id)
+        .where(TaskClosure.descendant_id == task_id, Task.access_politics != TaskShareLevel.PARENT_SELECT)
+        .order_by(TaskClosure.depth)
+        .limit(1)
+    )
+    return session.scalar(query)
+
+
+def rebuild_task_closure(connection):
+    """
+Recalculates closure table from tasks.parent (for databases created before the closure table).
+    """
+    connection.execute(delete(TaskClosure))
+    tree = select(
+        Task.id.label("ancestor_id"),
+        Task.id.label("descendant_id"),
+        literal(0).label("depth"),
+    ).cte("tree", recursive=True)
+    child = aliased(Task)
+    tree = tree.union_all(
+        select(tree.c.ancestor_id, child.id, tree.c.depth + 1)
+        .join(tree, child.parent == tree.c.descendant_id)
+        .where(tree.c.depth < MAX_SUBTREE_DEPTH),
+    )
+    # group by: broken data with parent cycles must not violate the primary key
+    rows = select(tree.c.ancestor_id, tree.c.descendant_id, func.min(tree.c.depth)).group_by(
+        tree.c.ancestor_id,
+        tree.c.descendant_id,
+    )
+    connection.execute(insert(TaskClosure).from_select(["ancestor_id", "descendant_id", "depth"], rows))
+
+
+def init_task_closure(engine):
+    """
+Fills empty closure table if there are tasks.
+    """
+    with engine.begin() as connection:
+        if connection.execute(select(TaskClosure.ancestor_id).limit(1)).first() is not None:
+            return
+        if connection.execute(select(Task.id).limit(1)).first() is None:
+            return
+        logger.info("Building task_closure table")
+        rebuild_task_closure(connection)
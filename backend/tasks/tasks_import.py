@@ -0,0 +1,292 @@
+import csv
+import io
+import os
+import time
+from collections import defaultdict
+from datetime import datetime
+from typing import Any, IO, Iterator
+
+from sqlalchemy import select
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session
+
+from ORM.tasks import READABLE_POLITICS
+from ORM.users import User
+from ORM.taskclosure import link_tasks
+from ORM.taskversion import bump_versions
+from serialization import loads
+from .tasks_batch import parse_task_item, insert_task_rows, IN_CHUNK_SIZE
+
+IMPORT_FORMATS = ("ndjson", "csv")
+# Tasks per transaction
+IMPORT_CHUNK_SIZE = 5000
+# Only so many per-line errors are reported, the rest are counted
+MAX_REPORTED_ERRORS = 1000
+# External ids kept in memory (id map and tasks waiting for parent), about 110 bytes per id
+IMPORT_MAX_IDS = int(os.environ.get("IMPORT_MAX_IDS", 5_000_000))
+
+
+def _read_ndjson(stream: IO[bytes]) -> Iterator[tuple[int, Any]]:
+    for line, data in enumerate(stream, 1):
+        if not data.strip():
+            continue
+        try:
+            # Lines are decoded one by one: invalid UTF-8 is an invalid line, not a broken stream
+            yield line, loads(data)
+        except ValueError:
+            yield line, ValueError(f"Line {line}: invalid JSON")
+
+
+def _read_csv(stream: IO[bytes]) -> Iterator[tuple[int, Any]]:
+    undecodable = []
+    read = [0]  # physical lines read, reader.line_num isn't advanced by a line which raised csv.Error
+
+    def decoded_lines():
+        for line, data in enumerate(stream, 1):
+            read[0] = line
+            try:
+                yield data.decode("utf-8")
+            except UnicodeDecodeError:
+                undecodable.append(line)
+                yield data.decode("utf-8", "replace")
+
+    reader = csv.DictReader(decoded_lines())
+    while True:
+        try:
+            record = next(reader)
+        except StopIteration:
+            return
+        except csv.Error as e:
+            yield read[0], ValueError(f"Line {read[0]}: {e}")
+            continue
+        if undecodable:
+            yield reader.line_num, ValueError(f"Line {undecodable[0]}: invalid UTF-8")
+            undecodable.clear()
+            continue
+        # CSV has no null, empty cells are null (export writes None as empty cell)
+        yield reader.line_num, {key: value if value != "" else None for key, value in record.items()}
+
+
+def read_records(stream: IO[bytes], import_format: str) -> Iterator[tuple[int, Any]]:
+    """
+Parses NDJSON or CSV (format of GET /export) from a binary stream while it is read.
+    :return: iterator of (line number, record), record is ValueError for unparsable line.
+    Errors of the stream itself (e.g. bad gzip) are raised by the iterator, TaskImporter.run reports them.
+    :raises ValueError: on unknown format
+    """
+    if import_format not in IMPORT_FORMATS:
+        raise ValueError("format must be one of: " + ", ".join(IMPORT_FORMATS))
+    if not isinstance(stream, io.BufferedIOBase):
+        # e.g. request.stream, iterated by lines
+        stream = io.BufferedReader(stream)
+    return _read_csv(stream) if import_format == "csv" else _read_ndjson(stream)
+
+
+def _optional_int(value: Any, field: str, line: int) -> int or None:
+    if value is None or (isinstance(value, int) and not isinstance(value, bool)):
+        return value
+    if isinstance(value, str) and value.isdigit():
+        return int(value)
+    raise ValueError(f"Line {line}: {field} must be an integer")
+
+
+class TaskImporter:
+    """
+Imports task records (read_records) in chunks of chunk_size tasks, one transaction per chunk.
+External ids ("id") are mapped to new ones and "parent" may reference any task of the dump:
+a task waits until its parent is inserted (in dumps ordered by id only moved tasks wait).
+Tasks of one chunk are inserted level by level with multi-row INSERTs, closure rows and
+version counters are updated in the same transaction.
+Invalid lines and tasks with parent missing in the dump are rejected with per-line errors.
+Memory: every external id stays in the id map until the end (any later task may reference it), about 110 bytes
+per task, so the import is aborted after max_ids ids (IMPORT_MAX_IDS) instead of exhausting memory of the worker.
+    """
+
+    def __init__(
+        self,
+        session: Session,
+        owner_id: int,
+        keep_owners: bool = False,
+        chunk_size=IMPORT_CHUNK_SIZE,
+        max_ids=IMPORT_MAX_IDS,
+    ):
+        """
+    :param session: DB session, committed after every chunk
+    :param owner_id: owner of imported tasks
+    :param keep_owners: use owner_id of records (must be existing users) instead
+    :param chunk_size: tasks per transaction
+    :param max_ids: limit of external ids kept in memory
+        """
+        self.session = session
+        self.owner_id = owner_id
+        self.keep_owners = keep_owners
+        self.chunk_size = chunk_size
+        self.max_ids = max_ids
+        self.now = datetime.utcnow()
+        self.id_map = {}  # external id -> new id
+        self.pending = []  # (line, external id, external parent, row, level) of the current chunk
+        self.pending_levels = {}  # external id -> level in the current chunk
+        self.waiting = defaultdict(list)  # external parent -> [(line, external id, row)]
+        self.waiting_count = 0
+        self.owners = {}  # owner id -> exists
+        self.errors = []
+        self.lines = 0
+        self.imported = 0
+        self.skipped = 0
+        self.rejected = 0
+        self.started = time.perf_counter()
+
+    def _error(self, line: int, message: str):
+        self.rejected += 1
+        if self.rejected <= MAX_REPORTED_ERRORS:
+            self.errors.append({"type": "error", "line": line, "error": message})
+
+    def _owner_exists(self, owner_id: int) -> bool:
+        if owner_id not in self.owners:
+            self.owners[owner_id] = self.session.scalar(select(User.id).where(User.id == owner_id)) is not None
+        return self.owners[owner_id]
+
+    def _parse(self, line: int, record: Any) -> (int or None, int or None, dict):
+        if not isinstance(record, dict):
+            raise ValueError(f"Line {line}: object expected")
+        ext_id = _optional_int(record.get("id"), "id", line)
+        parent = _optional_int(record.get("parent"), "parent", line)
+        owner_id = self.owner_id
+        if self.keep_owners:
+            owner_id = _optional_int(record.get("owner_id"), "owner_id", line)
+            if owner_id is None or not self._owner_exists(owner_id):
+                raise ValueError(f"Line {line}: owner {owner_id} not found")
+        # Same validation as POST /tasks/batch, parent is resolved later
+        row = parse_task_item(f"Line {line}", {**record, "parent": None}, owner_id, self.now)
+        if record.get("creation_date") is not None:
+            try:
+                row["creation_date"] = datetime.fromisoformat(record["creation_date"])
+            except (TypeError, ValueError):
+                raise ValueError(f"Line {line}: invalid date format for creation_date")
+        return ext_id, parent, row
+
+    def _add(self, line: int, record: Any):
+        if isinstance(record, ValueError):
+            return self._error(line, str(record))
+        if isinstance(record, dict) and record.get("type", "tasks") != "tasks":
+            # Other sections of an export (users)
+            self.skipped += 1
+            return
+        try:
+            ext_id, parent, row = self._parse(line, record)
+        except ValueError as e:
+            return self._error(line, str(e))
+        if ext_id is not None and (ext_id in self.id_map or ext_id in self.pending_levels):
+            return self._error(line, f"Line {line}: duplicate id {ext_id}")
+        if parent is not None and parent not in self.id_map and parent not in self.pending_levels:
+            self.waiting[parent].append((line, ext_id, row))
+            self.waiting_count += 1
+            return
+        self._queue(line, ext_id, parent, row)
+
+    def _queue(self, line: int, ext_id: int or None, parent: int or None, row: dict):
+        # Tasks waiting for this one go to the same chunk right after it
+        stack = [(line, ext_id, parent, row)]
+        while stack:
+            line, ext_id, parent, row = stack.pop()
+            level = self.pending_levels[parent] + 1 if parent in self.pending_levels else 0
+            self.pending.append((line, ext_id, parent, row, level))
+            if ext_id is not None:
+                self.pending_levels[ext_id] = level
+                children = self.waiting.pop(ext_id, ())
+                self.waiting_count -= len(children)
+                stack.extend((child_line, child_id, ext_id, child_row) for child_line, child_id, child_row in children)
+
+    def _flush(self):
+        if not self.pending:
+            return
+        levels = defaultdict(list)
+        for entry in self.pending:
+            levels[entry[4]].append(entry)
+        try:
+            for level in range(len(levels)):
+                entries = levels[level]
+                for _, _, parent, row, _ in entries:
+                    if parent is not None:
+                        row["parent"] = self.id_map[parent]
+                ids = insert_task_rows(self.session, [entry[3] for entry in entries])
+                for entry, task_id in zip(entries, ids):
+                    if entry[1] is not None:
+                        self.id_map[entry[1]] = task_id
+                for i in range(0, len(ids), IN_CHUNK_SIZE):
+                    link_tasks(self.session.connection(), ids[i:i + IN_CHUNK_SIZE])
+            rows = [entry[3] for entry in self.pending]
+            bump_versions(
+                self.session.connection(),
+                {row["owner_id"] for row in rows},
+                any(row["access_politics"] in READABLE_POLITICS for row in rows),
+            )
+            self.session.commit()
+        except SQLAlchemyError:
+            self.session.rollback()
+            for entry in self.pending:
+                self.id_map.pop(entry[1], None)
+            raise
+        self.imported += len(self.pending)
+        self.pending = []
+        self.pending_levels = {}
+
+    def stats(self) -> {str: int or float}:
+        return {
+            "lines": self.lines,
+            "imported": self.imported,
+            "skipped": self.skipped,
+            "rejected": self.rejected,
+            "waiting": self.waiting_count,
+            "seconds": round(time.perf_counter() - self.started, 3),
+        }
+
+    def run(self, records: Iterator[tuple[int, Any]]) -> Iterator[{str: Any}]:
+        """
+Imports all records. Yields events while it goes: per-line errors ({"type": "error", "line", "error"}),
+progress after every committed chunk ({"type": "progress", **stats}) and result in the end
+({"type": "result", **stats, "aborted"}). If the input can't be read further (bad gzip, broken upload),
+records read so far are imported and the result is aborted. Chunks committed before a DB error stay imported.
+        """
+        failure = None
+        records = iter(records)
+        try:
+            while True:
+                try:
+                    line, record = next(records)
+                except StopIteration:
+                    break
+                except Exception as e:
+                    # Anything raised by the stream itself (gzip, zlib, client disconnect, ...)
+                    failure = f"Input is not readable after line {self.lines}: {e.__class__.__name__}: {e}"
+                    break
+                self.lines += 1
+                self._add(line, record)
+                if len(self.id_map) + len(self.pending_levels) + self.waiting_count > self.max_ids:
+                    failure = f"Line {line}: more than {self.max_ids} task ids in the dump (IMPORT_MAX_IDS)"
+                    break
+                if len(self.pending) >= self.chunk_size:
+                    self._flush()
+                    yield from self._drain()
+                    yield {"type": "progress", **self.stats()}
+                elif self.errors:
+                    yield from self._drain()
+            self._flush()
+        except SQLAlchemyError as e:
+            failure = f"Chunk is not imported: {e.__class__.__name__}"
+        if failure is not None:
+            yield from self._drain()
+            yield {"type": "error", "line": None, "error": failure}
+            yield {"type": "result", **self.stats(), "aborted": True}
+            return
+        for parent, tasks in self.waiting.items():
+            for line, _, _ in tasks:
+                self._error(line, f"Line {line}: parent {parent} is not in the dump")
+        yield from self._drain()
+        self.waiting.clear()
+        self.waiting_count = 0
+        yield {"type": "result", **self.stats(), "aborted": False}
+
+    def _drain(self) -> Iterator[{str: Any}]:
+        errors, self.errors = self.errors, []
+        yield from errors
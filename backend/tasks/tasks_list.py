@@ -1,9 +1,97 @@
-from typing import Any
+from datetime import datetime
+from typing import Any, Iterator
 
-from sqlalchemy.orm import Session
-from sqlalchemy import or_
-from ORM.tasks import Task, TaskShareLevel, TaskStatus, WRITABLE_POLITICS, READABLE_POLITICS
+import sqlalchemy as sa
+from sqlalchemy.orm import Session, Query
+from sqlalchemy import or_, and_
+from ORM.tasks import Task, TaskStatus, WRITABLE_POLITICS, READABLE_POLITICS
 from ORM.users import User
+from serialization import serialize_task_short
+from streaming import STREAM_CHUNK_SIZE
+
+from .pagination import encode_cursor, decode_cursor
+from .search import search_tasks, search_tasks_ranked
+
+PAGE_ORDERS = ("id", "deadline", "rank")
+
+
+def _load_users(session: Session, user_id: int, filter_user: int = None) -> (User or None, User or None):
+    """
+Loads request sender and filtered user (if any) with one query.
+    """
+    ids = {user_id} if filter_user is None else {user_id, filter_user}
+    users = {user.id: user for user in session.query(User).filter(User.id.in_(ids))}
+    return users.get(user_id), users.get(filter_user) if filter_user is not None else None
+
+
+def _user_tasks_query(
+    user_id: int,
+    session: Session,
+    write_permission_required: bool = False,
+    filter_user: int = None,
+    filter_status: str = None,
+    filter_search: str = None,
+    short_response: bool = True,
+) -> int or Query:
+    owner_id = user_id
+    if filter_user:
+        user, filtered = _load_users(session, user_id, filter_user)
+        if user is None or not user.is_admin:
+            return 403
+        if filtered is None:
+            return 404
+        owner_id = filtered.id
+
+    if short_response:
+        query = session.query(Task.id, Task.title, Task.status, Task.parent, Task.deadline)
+    else:
+        query = session.query(
+            Task.id,
+            Task.title,
+            Task.parent,
+            Task.description,
+            Task.status,
+            Task.creation_date,
+            Task.deadline,
+            Task.access_politics,
+            Task.owner_id,
+        )
+
+    # One OR predicate instead of UNION: both branches are served by indexes
+    # and nothing has to be materialized / de-duplicated.
+    shared_politics = WRITABLE_POLITICS if write_permission_required else READABLE_POLITICS
+    query = query.filter(
+        or_(
+            Task.owner_id == owner_id,
+            Task.access_politics.in_(shared_politics),
+        ),
+    )
+
+    if filter_status:
+        query = query.filter(Task.status == TaskStatus[filter_status])
+
+    if filter_search:
+        query = search_tasks(query, filter_search)
+
+    return query
+
+
+def _serialize_tasks(tasks, user_id: int, short_response: bool) -> [{str: Any}]:
+    if short_response:
+        return [serialize_task_short(task) for task in tasks]
+    # Full response is rendered by templates, dates are kept as datetime objects
+    # (app.json writes them in ISO format if such list is returned as JSON)
+    return [
+        {
+            **serialize_task_short(task),
+            "description": task.description,
+            "creation_date": task.creation_date,
+            "deadline": task.deadline,
+            "writable": task.access_politics in WRITABLE_POLITICS or user_id == task.owner_id,
+        }
+        for task in tasks
+    ]
+
 
 def get_user_tasks(
     user_id: int,
@@ -22,95 +110,172 @@ Function to search user's tasks
     :param write_permission_required: filter access by user's write permission
     :param filter_user: Search other user's tasks (Admin user only)
     :param filter_status: Filter by status
-    :param filter_search: Search of string in title and description
+    :param filter_search: Full-text search in title and description (results are ordered by relevance)
     :param short_response: Is all fields of Task class required.
     :return: Int error code or serialized response(list of dicts).
     """
-    user = session.query(User).filter_by(id=user_id).first()
-    if not filter_user:
-        filter_user = user
-    else:
-        if not user.is_admin:
-            return 403
-        filter_user =  session.query(User).filter_by(id=filter_user).first()
+    query = _user_tasks_query(
+        user_id,
+        session,
+        write_permission_required=write_permission_required,
+        filter_user=filter_user,
+        filter_status=filter_status,
+        filter_search=filter_search,
+        short_response=short_response,
+    )
+    if isinstance(query, int):
+        return query
 
-    q1 = session.query(Task).filter(Task.owner_id == filter_user.id)
-    if write_permission_required:
-        # q2 = session.query(Task).filter(Task.access_politics <= TaskShareLevel.RW_ONLY_1_LEVELS)
-        q2 = session.query(Task).filter(Task.access_politics.in_(WRITABLE_POLITICS))
-    else:
-        # q2 = session.query(Task).filter(
-        # (Task.access_politics <= TaskShareLevel.RW_ONLY_1_LEVELS) |
-        # (Task.access_politics >= TaskShareLevel.R_ONLY_1_LEVELS)
-        # )
-        q2 = session.query(Task).filter(
-            Task.access_politics.notin_([TaskShareLevel.PARENT_SELECT, TaskShareLevel.PRIVATE]),
-        )
+    return _serialize_tasks(query.all(), user_id, short_response)
 
-    query = q1.union(q2)
 
-    if filter_status:
-        query = query.filter(Task.status == TaskStatus[filter_status])
+def _deadline_page(query: Query, after: list or None, limit: int or None) -> list:
+    """
+Keyset page ordered by (deadline, id). Tasks without deadline go after all others, ordered by id.
+    """
+    rows = []
+    if after is None or after[0] == "d":
+        dated = query.filter(Task.deadline.isnot(None))
+        if after is not None:
+            deadline = datetime.fromisoformat(after[1])
+            dated = dated.filter(
+                or_(
+                    Task.deadline > deadline,
+                    and_(Task.deadline == deadline, Task.id > after[2]),
+                ),
+            )
+        rows = dated.order_by(Task.deadline, Task.id).limit(limit).all()
+        if limit is not None and len(rows) >= limit:
+            return rows
+        after = None
 
-    if filter_search:
-        query = query.filter(
-            or_(
-                Task.title.ilike(f"%{filter_search}%"),
-                Task.description.ilike(f"%{filter_search}%"),
-            ),
-        )
+    undated = query.filter(Task.deadline.is_(None))
+    if after is not None:
+        undated = undated.filter(Task.id > after[1])
+    return rows + undated.order_by(Task.id).limit(None if limit is None else limit - len(rows)).all()
 
-    # if write_permission_required:
-    #     query = query.filter(Task.access_politics.in_([
-    #         TaskShareLevel.RW_ALL,
-    #         TaskShareLevel.RW_ONLY_1_LEVELS,
-    #         TaskShareLevel.RW_ONLY_2_LEVELS
-    #     ]))
-    # else:
-    #     query = query.filter(Task.access_politics.in_([
-    #         TaskShareLevel.R_ALL,
-    #         TaskShareLevel.R_ONLY_1_LEVELS,
-    #         TaskShareLevel.R_ONLY_2_LEVELS,
-    #         # TaskShareLevel.PARENT_SELECT
-    #     ]))
 
+def _rank_page(query: Query, text: str, after: list or None, limit: int or None) -> list:
+    """
+Keyset page ordered by (relevance, id), rows get search_rank column for the cursor.
+Relevance of a task depends only on the task and the search text, so it is a stable key.
+Engines without relevance (LIKE fallback) order by id.
+    """
+    query, rank = search_tasks_ranked(query, text)
+    if rank is None:
+        rank = sa.null()
+    if after is not None and after[1] is None:
+        query = query.filter(Task.id > after[2])
+    elif after is not None:
+        query = query.filter(or_(rank > after[1], and_(rank == after[1], Task.id > after[2])))
+    return query.add_columns(rank.label("search_rank")).order_by(rank, Task.id).limit(limit).all()
 
-    if short_response:
-        query = query.with_entities(Task.id, Task.title, Task.status, Task.parent)
+
+def _check_cursor(after: list, order_by: str):
+    valid = False
+    match after:
+        case ["i", int()]:
+            valid = order_by == "id"
+        case ["d", str(), int()]:
+            valid = order_by == "deadline"
+        case ["n", int()]:
+            valid = order_by == "deadline"
+        case ["r", int() | float() | None as rank, int()] if not isinstance(rank, bool):
+            valid = order_by == "rank"
+    if not valid:
+        raise ValueError("Cursor does not match requested order")
+
+
+def get_user_tasks_page(
+    user_id: int,
+    session: Session,
+    limit: int or None,
+    cursor: str = None,
+    order_by: str = "id",
+    short_response: bool = True,
+    **filters,
+) -> int or ([{str: Any}], str or None):
+    """
+Keyset paginated version of get_user_tasks.
+    :param user_id: ID of request sender
+    :param session: DB session
+    :param limit: page size (None - all tasks after cursor in one page)
+    :param cursor: next_cursor from previous page (None for first page)
+    :param order_by: "id", "deadline" or "rank" (relevance of filter_search)
+    :param short_response: Is all fields of Task class required.
+    :param filters: filters of get_user_tasks
+    :return: Int error code or (serialized page, cursor of next page or None)
+    :raises ValueError: on malformed cursor
+    """
+    after = None
+    if cursor:
+        after = decode_cursor(cursor)
+        _check_cursor(after, order_by)
+
+    search_text = filters.get("filter_search")
+    if order_by == "rank":
+        # Searched by _rank_page, which needs the relevance expression
+        filters = {**filters, "filter_search": None}
+    query = _user_tasks_query(user_id, session, short_response=short_response, **filters)
+    if isinstance(query, int):
+        return query
+
+    fetch = limit + 1 if limit is not None else None
+    if order_by == "rank":
+        rows = _rank_page(query, search_text, after, fetch)
+    elif order_by == "deadline":
+        rows = _deadline_page(query.order_by(None), after, fetch)
     else:
-        query = query.with_entities(
-            Task.id,
-            Task.title,
-            Task.parent,
-            Task.description,
-            Task.status,
-            Task.creation_date,
-            Task.deadline,
-            Task.access_politics,
-            Task.owner_id,
-        )
+        query = query.order_by(None)
+        if after is not None:
+            query = query.filter(Task.id > after[1])
+        rows = query.order_by(Task.id).limit(fetch).all()
 
-    # if filter_user is not None:
-    #     query = query.filter(Task.owner_id == filter_user.id)
+    next_cursor = None
+    if limit is not None and len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        if order_by == "rank":
+            next_cursor = encode_cursor(["r", last.search_rank, last.id])
+        elif order_by == "id":
+            next_cursor = encode_cursor(["i", last.id])
+        elif last.deadline is not None:
+            next_cursor = encode_cursor(["d", last.deadline.isoformat(), last.id])
+        else:
+            next_cursor = encode_cursor(["n", last.id])
 
-    tasks = query.all()
+    return _serialize_tasks(rows, user_id, short_response), next_cursor
 
-    result = []
-    for task in tasks:
-        task_dict = {
-            "id": task.id,
-            "title": task.title,
-            "status": task.status.name,
-            "parent": task.parent,
-        }
-        if not short_response:
-            task_dict.update({
-                "description": task.description,
-                "creation_date": task.creation_date,
-                "deadline": task.deadline,
-                "parent": task.parent,
-                "writable": task.access_politics in WRITABLE_POLITICS or user.id == task.owner_id,
-            })
-        result.append(task_dict)
-
-    return result
+
+def iter_user_tasks(
+    user_id: int,
+    session: Session,
+    cursor: str = None,
+    chunk_size: int = STREAM_CHUNK_SIZE,
+    **filters,
+) -> int or Iterator[{str: Any}]:
+    """
+Streaming version of get_user_tasks_page: all tasks after cursor ordered by id. Rows are fetched by chunk_size
+with yield_per (server-side cursor on PostgreSQL and MariaDB), so memory use doesn't depend on number of tasks.
+Query runs on first next(), the session must stay open until the iterator is exhausted.
+    :param user_id: ID of request sender
+    :param session: DB session
+    :param cursor: next_cursor of a page ordered by id (None - from the first task)
+    :param chunk_size: rows per fetch
+    :param filters: filters of get_user_tasks
+    :return: Int error code or iterator of serialized tasks (short response)
+    :raises ValueError: on malformed cursor
+    """
+    after = None
+    if cursor:
+        after = decode_cursor(cursor)
+        _check_cursor(after, "id")
+
+    query = _user_tasks_query(user_id, session, **filters)
+    if isinstance(query, int):
+        return query
+
+    query = query.order_by(None)
+    if after is not None:
+        query = query.filter(Task.id > after[1])
+    return (serialize_task_short(row) for row in query.order_by(Task.id).yield_per(chunk_size))
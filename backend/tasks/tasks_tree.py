@@ -0,0 +1,141 @@
+from typing import Any
+
+from sqlalchemy import select, update, literal, or_, true
+from sqlalchemy.orm import Session, aliased
+
+from ORM.tasks import Task, TaskShareLevel, READABLE_POLITICS
+from ORM.taskclosure import TaskClosure
+from ORM.taskversion import bump_versions
+from serialization import serialize_task
+
+MAX_SUBTREE_DEPTH = 100
+
+# How many levels of descendants inherit share level of the task
+SHARE_DEPTHS = {
+    TaskShareLevel.R_ONLY_1_LEVELS: 1,
+    TaskShareLevel.R_ONLY_2_LEVELS: 2,
+    TaskShareLevel.RW_ONLY_1_LEVELS: 1,
+    TaskShareLevel.RW_ONLY_2_LEVELS: 2,
+}
+
+
+def build_task_tree(tasks):
+    """Build a tree structure from flat task list."""
+    task_dict = {task["id"]: task for task in tasks}
+    tree = []
+
+    for task in tasks:
+        # print(task)
+        if task.get("parent", None) is not None and task_dict.get(task["parent"], None) is not None:
+            parent = task_dict.get(task["parent"])
+            parent: dict
+            if "children" not in parent:
+                parent["children"] = []
+            parent["children"].append(task)
+        else:
+            tree.append(task)
+
+    return tree
+
+
+def _root_visible(task, user_id: int or None, is_admin: bool):
+    # Same rules as GET /tasks/<id>
+    if is_admin:
+        return true()
+    if user_id is None:
+        return task.access_politics.in_(READABLE_POLITICS)
+    return or_(task.owner_id == user_id, task.access_politics != TaskShareLevel.PRIVATE)
+
+
+def _child_visible(task, user_id: int or None, is_admin: bool):
+    # PARENT_SELECT children are reachable only through a visible parent, so they inherit its access
+    if is_admin:
+        return true()
+    politics = task.access_politics.in_(READABLE_POLITICS + [TaskShareLevel.PARENT_SELECT])
+    if user_id is None:
+        return politics
+    return or_(task.owner_id == user_id, politics)
+
+
+def get_task_subtree(
+    task_id: int,
+    session: Session,
+    user_id: int = None,
+    is_admin: bool = False,
+    max_depth: int = MAX_SUBTREE_DEPTH,
+) -> int or [{str: Any}]:
+    """
+Loads task and its descendants (up to max_depth levels) with one recursive CTE.
+Descendants not visible to user are skipped together with their own subtrees.
+    :param task_id: root task ID
+    :param session: DB session
+    :param user_id: ID of request sender (None for anonymous)
+    :param is_admin: admin can see everything
+    :param max_depth: max depth of descendants (0 - root only)
+    :return: Int error code or flat list of dicts (with "depth"), parents go before children.
+    """
+    max_depth = min(max_depth, MAX_SUBTREE_DEPTH)
+
+    def columns(task):
+        return (
+            task.id,
+            task.owner_id,
+            task.parent,
+            task.title,
+            task.description,
+            task.status,
+            task.access_politics,
+            task.creation_date,
+            task.deadline,
+        )
+
+    subtree = (
+        select(*columns(Task), literal(0).label("depth"))
+        .where(Task.id == task_id, _root_visible(Task, user_id, is_admin))
+        .cte("subtree", recursive=True)
+    )
+    child = aliased(Task)
+    subtree = subtree.union_all(
+        select(*columns(child), (subtree.c.depth + 1).label("depth"))
+        .join(subtree, child.parent == subtree.c.id)
+        .where(subtree.c.depth < max_depth, _child_visible(child, user_id, is_admin)),
+    )
+    rows = session.execute(select(subtree).order_by(subtree.c.depth, subtree.c.id)).all()
+
+    if not rows:
+        exists = session.query(Task.id).filter(Task.id == task_id).first()
+        return 403 if exists else 404
+
+    return [{**serialize_task(row), "depth": row.depth} for row in rows]
+
+
+def share_subtree(session: Session, task: Task, share_level: TaskShareLevel) -> int:
+    """
+Sets share level of task and its descendants with one UPDATE (descendants are taken from closure table).
+Depth is limited by the level (R_ONLY_1_LEVELS - children, R_ONLY_2_LEVELS - grandchildren, *_ALL/PRIVATE - all).
+Only descendants of the same owner are changed. Caller commits the session.
+    :param session: DB session
+    :param task: root task (permissions must be already checked)
+    :param share_level: new share level
+    :return: number of updated tasks
+    """
+    max_depth = SHARE_DEPTHS.get(share_level, MAX_SUBTREE_DEPTH)
+    subtree = select(TaskClosure.descendant_id).where(
+        TaskClosure.ancestor_id == task.id,
+        TaskClosure.depth <= max_depth,
+    )
+    result = session.execute(
+        update(Task)
+        .where(Task.id.in_(subtree), Task.owner_id == task.owner_id)
+        .values(access_politics=share_level)
+        .execution_options(synchronize_session=False),
+    )
+    session.expire(task, ["access_politics"])
+    # Tasks become shared or stop being shared. Task counters are bumped by one INSERT ... SELECT of the same subtree
+    bump_versions(
+        session.connection(),
+        [task.owner_id],
+        True,
+        select(Task.id).where(Task.id.in_(subtree), Task.owner_id == task.owner_id).order_by(Task.id),
+    )
+    return result.rowcount
@@ -0,0 +1,130 @@
+from typing import Any
+
+from sqlalchemy import select, update, delete, case, literal, Row
+from sqlalchemy.orm import Session, aliased
+
+from db import foreign_keys_enforced
+from serialization import TASK_COLUMNS
+from ORM.tasks import Task, READABLE_POLITICS
+from ORM.taskclosure import TaskClosure
+from ORM.taskversion import TaskVersion, bump_versions
+from .tasks_bulk import writable_predicate
+
+# FK cascades run at the end of the statement: a DELETE of the whole subtree deletes (and returns) every row itself.
+# SQLite and InnoDB cascade row by row, rows removed by a cascade are not in RETURNING.
+SUBTREE_DELETE_DIALECTS = ("postgresql",)
+
+
+def _missing_task_code(session: Session, task_id: int) -> int:
+    # Statement changed nothing: task doesn't exist or user has no rights
+    exists = session.scalar(select(Task.id).where(Task.id == task_id))
+    return 403 if exists is not None else 404
+
+
+def update_task_returning(
+    session: Session,
+    task_id: int,
+    user_id: int,
+    is_admin: bool,
+    values: {str: Any},
+    owner_values: {str: Any} = None,
+) -> int or Row:
+    """
+Updates task with one UPDATE ... WHERE <writable by user> RETURNING <task columns>
+(UPDATE + SELECT by ID on DBs without UPDATE ... RETURNING, e.g. MariaDB). Task isn't loaded into the session.
+Parent can't be changed here: moving a task needs cycle check and task_closure update (mapper events).
+Bumps version counters of the task (ETags). Caller commits the session.
+    :param session: DB session
+    :param task_id: task ID
+    :param user_id: ID of request sender
+    :param is_admin: admin can change any task
+    :param values: column values
+    :param owner_values: column values applied only if user is owner (or admin), e.g. access_politics
+    :return: Int error code (404, 403) or row with TASK_COLUMNS after update
+    """
+    values = dict(values)
+    for key, value in (owner_values or {}).items():
+        column = getattr(Task, key)
+        values[key] = value if is_admin else case(
+            (Task.owner_id == user_id, literal(value, column.type)),
+            else_=column,
+        )
+    statement = (
+        update(Task)
+        .where(Task.id == task_id, writable_predicate(user_id, is_admin))
+        .values(**values)
+        .execution_options(synchronize_session=False)
+    )
+    if session.get_bind().dialect.update_returning:
+        row = session.execute(statement.returning(*TASK_COLUMNS)).first()
+    else:
+        row = None
+        if session.execute(statement).rowcount:
+            row = session.execute(select(*TASK_COLUMNS).where(Task.id == task_id)).first()
+    if row is None:
+        return _missing_task_code(session, task_id)
+    bump_versions(
+        session.connection(),
+        [row.owner_id],
+        bool(owner_values) or row.access_politics in READABLE_POLITICS,
+        [row.id],
+    )
+    return row
+
+
+def delete_task_returning(session: Session, task_id: int, user_id: int, is_admin: bool) -> int or None:
+    """
+Deletes task (owner or admin only) with its descendants and bumps list counters of their owners.
+PostgreSQL: one DELETE of the subtree (from closure table) ... RETURNING owner_id, access_politics.
+Other DBs: owners of the subtree are selected first, then one DELETE ... WHERE ... deletes the task,
+descendants, task_closure and task_versions rows are removed by FK cascade. Caller commits the session.
+    :return: Int error code (404, 403) or None if deleted
+    """
+    if session.get_bind().dialect.name in SUBTREE_DELETE_DIALECTS:
+        root = aliased(Task)
+        subtree = (
+            select(TaskClosure.descendant_id)
+            .join(root, root.id == TaskClosure.ancestor_id)
+            .where(TaskClosure.ancestor_id == task_id, writable_predicate(user_id, is_admin, owner_only=True, task=root))
+        )
+        affected = session.execute(
+            delete(Task)
+            .where(Task.id.in_(subtree))
+            .returning(Task.owner_id, Task.access_politics)
+            .execution_options(synchronize_session=False),
+        ).all()
+        if not affected:
+            return _missing_task_code(session, task_id)
+    else:
+        # Owners of the subtree, their task lists change too
+        affected = session.execute(
+            select(Task.owner_id, Task.access_politics)
+            .distinct()
+            .join(TaskClosure, TaskClosure.descendant_id == Task.id)
+            .where(TaskClosure.ancestor_id == task_id),
+        ).all()
+        statement = (
+            delete(Task)
+            .where(Task.id == task_id, writable_predicate(user_id, is_admin, owner_only=True))
+            .execution_options(synchronize_session=False)
+        )
+        if session.get_bind().dialect.delete_returning:
+            deleted = session.execute(statement.returning(Task.id)).first() is not None
+        else:
+            deleted = session.execute(statement).rowcount > 0
+        if not deleted:
+            return _missing_task_code(session, task_id)
+    bump_versions(
+        session.connection(),
+        {row.owner_id for row in affected},
+        any(row.access_politics in READABLE_POLITICS for row in affected),
+    )
+    if not foreign_keys_enforced():
+        # Same cleanup as after_delete mapper events of TaskClosure and TaskVersion
+        session.execute(
+            delete(TaskClosure).where(
+                (TaskClosure.ancestor_id == task_id) | (TaskClosure.descendant_id == task_id),
+            ),
+        )
+        session.execute(delete(TaskVersion).where(TaskVersion.task_id == task_id))
+    return None
@@ -0,0 +1,156 @@
+import os
+import re
+import threading
+import time
+from collections import OrderedDict, namedtuple
+
+from sqlalchemy import select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from ORM.authtokens import TokenRevocations
+
+CachedToken = namedtuple("CachedToken", ["access_level", "user_id", "valid_until"])
+
+MISS = object()
+
+# Tokens are blake2s hex digests (api/auth.py, webapp/routes_token.py)
+TOKEN_FORMAT = re.compile(r"[0-9a-f]{64}")
+
+
+def is_token_format(token: str) -> bool:
+    """
+Cheap check done before any cache or DB lookup: malformed tokens can't exist, so they are never cached.
+    """
+    return TOKEN_FORMAT.fullmatch(token) is not None
+
+
+class TokenCache:
+    """
+Bounded LRU cache of validated auth tokens with TTL.
+Unknown tokens are cached too (with shorter TTL) to blunt brute-force traffic, in a separate smaller LRU,
+so a flood of unique bad tokens can't evict valid ones.
+Cache is per worker process. Revocations are shared through a counter in DB (auth_token_revocations),
+which is read on every request (sync): when it changes, valid tokens cached by the worker are dropped.
+    """
+
+    def __init__(self, max_size=10000, ttl=30.0, negative_ttl=5.0, negative_max_size=1000):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.negative_max_size = negative_max_size
+        self._entries = OrderedDict()
+        self._negative = OrderedDict()
+        self._lock = threading.Lock()
+        self._generation = None
+        self.hits = 0
+        self.negative_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl > 0
+
+    def sync(self, generation: int):
+        """
+Drops cached valid tokens if some token was revoked (by any worker) since they were cached.
+        :param generation: current revocation counter (get_revocation_generation)
+        """
+        with self._lock:
+            if generation == self._generation:
+                return
+            if self._entries:
+                self.invalidations += 1
+                self._entries.clear()
+            self._generation = generation
+
+    def get(self, token_id: str) -> CachedToken or None:
+        """
+        :return: cached token, None for cached unknown token, MISS if not cached.
+        """
+        if self.ttl <= 0:
+            return MISS
+        with self._lock:
+            entries = self._entries if token_id in self._entries else self._negative
+            entry = entries.get(token_id)
+            if entry is None or entry[0] < time.monotonic():
+                if entry is not None:
+                    del entries[token_id]
+                self.misses += 1
+                return MISS
+            entries.move_to_end(token_id)
+            if entry[1] is None:
+                self.negative_hits += 1
+            else:
+                self.hits += 1
+            return entry[1]
+
+    def put(self, token_id: str, token: CachedToken or None):
+        if self.ttl <= 0:
+            return
+        if token is not None:
+            entries, max_size, expires = self._entries, self.max_size, time.monotonic() + self.ttl
+        else:
+            entries, max_size, expires = self._negative, self.negative_max_size, time.monotonic() + self.negative_ttl
+        with self._lock:
+            entries[token_id] = (expires, token)
+            entries.move_to_end(token_id)
+            while len(entries) > max_size:
+                entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._negative.clear()
+
+    def stats(self) -> {str: int or float}:
+        with self._lock:
+            lookups = self.hits + self.negative_hits + self.misses
+            return {
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "negative_size": len(self._negative),
+                "negative_max_size": self.negative_max_size,
+                "hits": self.hits,
+                "negative_hits": self.negative_hits,
+                "misses": self.misses,
+                "hit_ratio": (self.hits + self.negative_hits) / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+            }
+
+
+token_cache = TokenCache(
+    max_size=int(os.environ.get("TOKEN_CACHE_SIZE", 10000)),
+    ttl=float(os.environ.get("TOKEN_CACHE_TTL", 30)),
+    negative_ttl=float(os.environ.get("TOKEN_CACHE_NEGATIVE_TTL", 5)),
+    negative_max_size=int(os.environ.get("TOKEN_CACHE_NEGATIVE_SIZE", 1000)),
+)
+
+
+def get_revocation_generation(session: Session) -> int:
+    """
+    :return: counter of token revocations, 0 if nothing was revoked yet
+    """
+    return session.execute(select(TokenRevocations.generation).where(TokenRevocations.id == 1)).scalar() or 0
+
+
+def record_revocation(session: Session):
+    """
+Increments revocation counter in the transaction of session, so it is committed together with token delete.
+Token caches of all workers drop their entries on the next request.
+    """
+    increment = update(TokenRevocations).where(TokenRevocations.id == 1).values(
+        generation=TokenRevocations.generation + 1,
+    )
+    if session.execute(increment).rowcount:
+        return
+    try:
+        with session.begin_nested():
+            session.add(TokenRevocations(id=1, generation=1))
+    except IntegrityError:
+        # Created by a concurrent revoke
+        session.execute(increment)
@@ -0,0 +1,100 @@
+import logging
+import os
+import threading
+import time
+from datetime import datetime
+
+from sqlalchemy import select, delete
+
+from ORM.authtokens import AuthToken
+
+logger = logging.getLogger(__name__)
+
+
+class TokenSweeper:
+    """
+Deletes expired auth tokens in bounded batches: every batch is a short transaction
+(SELECT of up to batch_size expired IDs by valid_until index + DELETE by IDs), so other writers
+wait for at most one batch. token_auth already rejects expired tokens, removing them only keeps
+auth_tokens table and its indexes small.
+    """
+
+    def __init__(self, batch_size=500, interval=3600.0, pause=0.1):
+        self.batch_size = batch_size
+        self.interval = interval
+        self.pause = pause
+        self._thread = None
+
+    def sweep(self, session_factory=None, max_batches: int = None) -> {str: int or float}:
+        """
+Deletes tokens expired before the call.
+    :param session_factory: callable returning new DB session (db.create_session by default)
+    :param max_batches: stop after this many batches (None - until no expired tokens left)
+    :return: {"deleted": rows removed, "batches": transactions made, "seconds": time spent}
+        """
+        if session_factory is None:
+            from db import create_session
+            session_factory = create_session
+        # Same clock as expiry check of token_auth
+        now = datetime.now()
+        started = time.perf_counter()
+        deleted = 0
+        batches = 0
+        while max_batches is None or batches < max_batches:
+            with session_factory() as session:
+                ids = list(session.scalars(
+                    select(AuthToken.id)
+                    .where(AuthToken.valid_until < now)
+                    .order_by(AuthToken.valid_until)
+                    .limit(self.batch_size),
+                ))
+                if not ids:
+                    break
+                session.execute(delete(AuthToken).where(AuthToken.id.in_(ids)))
+                session.commit()
+            deleted += len(ids)
+            batches += 1
+            if len(ids) < self.batch_size:
+                break
+            time.sleep(self.pause)
+        result = {"deleted": deleted, "batches": batches, "seconds": round(time.perf_counter() - started, 3)}
+        logger.info("Token sweep: %(deleted)s expired tokens removed in %(batches)s batches, %(seconds)ss", result)
+        return result
+
+    def start(self) -> bool:
+        """
+Starts daemon thread which sweeps every `interval` seconds (interval <= 0 disables it).
+Under uWSGI the thread runs only in the master process (app is loaded there before workers are forked,
+needs enable-threads). With lazy-apps the app is loaded by every worker, so the thread isn't started,
+use `utils_cmd.py sweep_tokens` from cron instead.
+    :return: True if thread was started
+        """
+        if self.interval <= 0 or self._thread is not None:
+            return False
+        try:
+            import uwsgi
+        except ImportError:
+            uwsgi = None
+        if uwsgi is not None and uwsgi.worker_id() != 0:
+            return False
+        self._thread = threading.Thread(target=self._run, name="token-sweeper", daemon=True)
+        self._thread.start()
+        return True
+
+    def _run(self):
+        from db import create_standalone_session_factory
+        # Own engine: connections of the master must not be shared with forked workers
+        session_factory = create_standalone_session_factory()
+        while True:
+            time.sleep(self.interval)
+            try:
+                self.sweep(session_factory)
+            except Exception as e:
+                logger.error(f"Token sweep failed: {e.__class__.__name__}: {e}")
+
+
+token_sweeper = TokenSweeper(
+    batch_size=int(os.environ.get("TOKEN_SWEEP_BATCH_SIZE", 500)),
+    interval=float(os.environ.get("TOKEN_SWEEP_INTERVAL", 3600)),
+    pause=float(os.environ.get("TOKEN_SWEEP_PAUSE", 0.1)),
+)
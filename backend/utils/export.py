@@ -0,0 +1,40 @@
+import time
+
+from db import create_session
+from data_export import export_chunks, gzip_chunks, EXPORT_SECTIONS
+
+
+def export(output=None, format="ndjson", sections=None, user=None, cursor=None, **kwargs):
+    """
+Writes export of users and tasks (of one user with --user ID) to a file, e.g.:
+    python3 utils_cmd.py export --output backup.ndjson.gz
+    python3 utils_cmd.py export --format csv --sections tasks --cursor tasks:1234 --output tasks.csv
+Output is gzipped with --gzip or if file name ends with .gz.
+    """
+    if not output:
+        print("Export failed: --output FILE is required")
+        return False
+    compress = "gzip" in kwargs or output.endswith(".gz")
+    started = time.perf_counter()
+    with create_session() as session:
+        try:
+            chunks = export_chunks(
+                session,
+                format,
+                sections.split(",") if sections else tuple(EXPORT_SECTIONS),
+                owner_id=int(user) if user is not None else None,
+                cursor=cursor,
+            )
+        except ValueError as e:
+            print(F"Export failed: {e}")
+            return False
+        if compress:
+            chunks = gzip_chunks(chunks)
+        written = 0
+        with open(output, "wb") as stream:
+            for chunk in chunks:
+                data = chunk if compress else chunk.encode("utf-8")
+                stream.write(data)
+                written += len(data)
+    print(F"Exported {written} bytes in {time.perf_counter() - started:.2f} s.")
+    return True
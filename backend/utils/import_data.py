@@ -0,0 +1,48 @@
+import gzip
+
+from db import create_session
+from ORM.users import User
+from tasks import TaskImporter, read_records
+
+
+def import_data(input=None, format=None, user=None, chunk_size=None, **kwargs):
+    """
+Imports tasks from NDJSON or CSV file (format of export command), e.g.:
+    python3 utils_cmd.py import --input backup.ndjson.gz
+    python3 utils_cmd.py import --input tasks.csv --user 12
+Tasks keep owner_id of the dump (owners must exist) unless --user ID gives the owner of all of them.
+Format is taken from file name (.csv, .csv.gz) if --format isn't given, .gz files are decompressed on the fly.
+    """
+    if not input:
+        print("Import failed: --input FILE is required")
+        return False
+    name = input[:-3] if input.endswith(".gz") else input
+    import_format = format or ("csv" if name.endswith(".csv") else "ndjson")
+    stream = gzip.open(input, "rb") if input.endswith(".gz") else open(input, "rb")
+    with stream, create_session() as session:
+        try:
+            records = read_records(stream, import_format)
+        except ValueError as e:
+            print(F"Import failed: {e}")
+            return False
+        if user is not None and session.get(User, int(user)) is None:
+            print(F"Import failed: user {user} not found")
+            return False
+        importer = TaskImporter(
+            session,
+            int(user) if user is not None else None,
+            keep_owners=user is None,
+            **({"chunk_size": int(chunk_size)} if chunk_size is not None else {}),
+        )
+        for event in importer.run(records):
+            match event["type"]:
+                case "error":
+                    print(event["error"])
+                case "progress":
+                    print(F"{event['imported']} tasks imported ({event['lines']} lines, {event['seconds']} s)")
+                case "result":
+                    print(
+                        F"Done: {event['imported']} tasks imported, {event['rejected']} lines rejected, "
+                        F"{event['skipped']} skipped in {event['seconds']} s.",
+                    )
+                    return not event["aborted"]
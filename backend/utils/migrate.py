@@ -0,0 +1,9 @@
+import time
+
+from db import init_schema
+
+
+def migrate():
+    started = time.perf_counter()
+    init_schema()
+    print(F"DB schema is up to date ({time.perf_counter() - started:.2f} s).")
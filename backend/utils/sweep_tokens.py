@@ -0,0 +1,13 @@
+from token_sweeper import token_sweeper
+
+
+def sweep_tokens(batch_size=None, max_batches=None, **kwargs):
+    """
+Deletes expired auth tokens. For cron, e.g. hourly:
+    0 * * * * cd /app && python3 utils_cmd.py sweep_tokens
+    """
+    if batch_size is not None:
+        token_sweeper.batch_size = int(batch_size)
+    result = token_sweeper.sweep(max_batches=int(max_batches) if max_batches is not None else None)
+    print(F"Removed {result['deleted']} expired tokens in {result['batches']} batches, {result['seconds']} s.")
+    return result
@@ -2,6 +2,10 @@
 import os
 import sys
 from utils.add_user import add_user, add_user_not_interactive
+from utils.sweep_tokens import sweep_tokens
+from utils.migrate import migrate
+from utils.export import export
+from utils.import_data import import_data
 
 
 def parse_args(args):
@@ -26,6 +30,11 @@ def help_dialog():
  exit - exit the program
  help - show this message
  add_user - add a new user
+ sweep_tokens - delete expired auth tokens (--batch_size N, --max_batches N)
+ migrate - create missing tables and indexes (required before start with STARTUP_MODE=production)
+ export - export users and tasks (--output FILE, --format ndjson|csv, --sections users,tasks, --user ID,
+          --cursor SECTION:ID, --gzip)
+ import - import tasks of export file (--input FILE, --format ndjson|csv, --user ID, --chunk_size N)
     """
     print(text)
 
@@ -36,6 +45,16 @@ def main():
         match cmd:
             case "add_user":
                 add_user_not_interactive(**kwargs)
+            case "sweep_tokens":
+                sweep_tokens(**kwargs)
+            case "migrate":
+                migrate()
+            case "export":
+                if not export(**kwargs):
+                    sys.exit(1)
+            case "import":
+                if not import_data(**kwargs):
+                    sys.exit(1)
             case _:
                 print("Not supported in not interactive mode!")
                 sys.exit(1)
@@ -51,6 +70,14 @@ def main():
                 help_dialog()
             case "add_user":
                 add_user()
+            case "sweep_tokens":
+                sweep_tokens()
+            case "migrate":
+                migrate()
+            case "export":
+                export(output=input("Output file: "))
+            case "import":
+                import_data(input=input("Input file: "), user=input("Owner user ID (empty - keep owners): ") or None)
             case _:
                 print("Unknown command.")
     print()
@@ -1,9 +1,9 @@
 from flask import Blueprint, render_template, request, redirect, url_for, session, flash, get_flashed_messages
 # from flask_login import login_user, logout_user, login_required, current_user
 import logging
-from db import create_session
+from db import get_session
 from ORM import User
-from werkzeug.security import generate_password_hash, check_password_hash
+from password_hashing import password_hasher, HashingBusy
 
 bp_auth = Blueprint("auth", __name__, url_prefix="/auth")
 logger = logging.getLogger(__name__)
@@ -22,7 +22,7 @@ def validate_password(password):
 @bp_auth.route("/register", methods=["GET", "POST"])
 def register():
     if request.method == "POST":
-        session_db = create_session()
+        session_db = get_session()
         username = request.form["username"]
         password = request.form["password"]
 
@@ -33,7 +33,11 @@ def register():
             flash("Username already exists", "danger")
             return redirect(url_for("webapp.auth.register"))
 
-        user = User(username=username, password_hash=generate_password_hash(password))
+        try:
+            user = User(username=username, password_hash=password_hasher.hash(password))
+        except HashingBusy:
+            flash("Server is busy, try again later", "warning")
+            return render_template("webapp/register.html")
         session_db.add(user)
         session_db.commit()
         flash("Registration successful! Please log in.", "success")
@@ -50,14 +54,21 @@ def login():
 
 def process_login(request):
     """Process login request, can be called directly if CSRF fails in development"""
-    session_db = create_session()
+    session_db = get_session()
     username = request.form["username"]
     password = request.form["password"]
     user = session_db.query(User).filter_by(username=username).first()
 
-    if not user or not check_password_hash(user.password_hash, password):
+    try:
+        password_ok = user is not None and password_hasher.check_user(user, password)
+    except HashingBusy:
+        flash("Too many login attempts, try again later", "warning")
+        return redirect(url_for("webapp.auth.login"))
+    if not password_ok:
         flash("Invalid username or password", "danger")
         return redirect(url_for("webapp.auth.login"))
+    # Hash was upgraded to current PASSWORD_HASH_METHOD
+    session_db.commit()
 
     session["user_id"] = user.id
     session["is_admin"] = user.is_admin
@@ -1,13 +1,13 @@
 from flask import Blueprint, render_template, request, redirect, url_for, session, flash
-from db import create_session
+from db import get_session
 from ORM import User
-from werkzeug.security import generate_password_hash
+from password_hashing import password_hasher, HashingBusy
 
 bp_profile = Blueprint("profile", __name__, url_prefix="/profile")
 
 
 def get_current_user():
-    session_db = create_session()
+    session_db = get_session()
     return session_db.query(User).get(session.get("user_id"))
 
 
@@ -18,7 +18,7 @@ def profile(user_id=None):
         flash("Please login first.", "warning")
         return redirect(url_for("webapp.auth.login"))
 
-    session_db = create_session()
+    session_db = get_session()
 
     # Determine target user
     if user_id:
@@ -42,7 +42,12 @@ def profile(user_id=None):
         user.email = email
 
         if password:
-            user.password_hash = generate_password_hash(password)
+            try:
+                user.password_hash = password_hasher.hash(password)
+            except HashingBusy:
+                session_db.rollback()
+                flash("Server is busy, try again later", "warning")
+                return redirect(url_for("webapp.profile.profile", user_id=user_id))
 
         session_db.commit()
         flash("Profile updated successfully.", "success")
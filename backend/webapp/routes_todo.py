@@ -2,41 +2,22 @@ from datetime import datetime
 from flask import Blueprint, render_template, request, redirect, url_for, session, flash
 
 from ORM.tasks import TaskShareLevel
-from db import create_session
+from db import get_session, use_replica
 from datetime import datetime, UTC
 
-from tasks import get_user_tasks
+from tasks import get_user_tasks, build_task_tree, share_subtree, update_task_returning, delete_task_returning
 from ORM import User, Task
 
 bp_todo = Blueprint("todo", __name__, url_prefix="/todo")
 
 
-def build_task_tree(tasks):
-    """Build a tree structure from flat task list."""
-    task_dict = {task["id"]: task for task in tasks}
-    tree = []
-
-    for task in tasks:
-        # print(task)
-        if task.get("parent", None) is not None and task_dict.get(task["parent"], None) is not None:
-            parent = task_dict.get(task["parent"])
-            parent: dict
-            if "children" not in parent:
-                parent["children"] = []
-            parent["children"].append(task)
-        else:
-            tree.append(task)
-
-    return tree
-
-
 @bp_todo.route("/", methods=["GET", "POST"])
 def todo_list():
     if "user_id" not in session:
         flash("Please login first.", "warning")
         return redirect(url_for("webapp.auth.login"))
 
-    session_db = create_session()
+    session_db = get_session()
     user = session_db.query(User).get(session["user_id"])
 
     if request.method == "POST":
@@ -59,24 +40,25 @@ def todo_list():
                 print(e)
                 flash("Please enter a valid data.", "warning")
             if is_data_valid:
-                task = session_db.query(Task).get(task_id)
-                task: Task
-                if task.owner_id == user.id or task.writable:
-                    task.title = title
-                    task.description = description
-                    task.status = status
-                    if deadline is not None:
-                        task.deadline = deadline
-                    try:
-                        session_db.add(task)
+                values = {"title": title, "description": description, "status": status}
+                if deadline is not None:
+                    values["deadline"] = deadline
+                try:
+                    # Owner or RW_* shared task only, checked by the UPDATE itself
+                    result = update_task_returning(session_db, task_id, user.id, False, values)
+                    if result == 404:
+                        flash("Task not found.", "danger")
+                    elif result == 403:
+                        flash("Access denied.", "warning")
+                    else:
                         session_db.commit()
-                    except Exception as e:
-                        print(e)
-                        flash("Failed to update task. Something went wrong.", "danger")
-
-                else:
-                    flash("Access denied.", "warning")
+                except Exception as e:
+                    print(e)
+                    session_db.rollback()
+                    flash("Failed to update task. Something went wrong.", "danger")
 
+    # Task list may come from a replica (from primary for a while after the update above)
+    use_replica(session_db, user.id)
     tasks = get_user_tasks(user.id, session_db, short_response=False, write_permission_required=False)
 
     tree = build_task_tree(tasks)
@@ -90,7 +72,7 @@ def add_task(parent_id):
         flash("Please login first.", "warning")
         return redirect(url_for("webapp.auth.login"))
 
-    session_db = create_session()
+    session_db = get_session()
     user = session_db.query(User).get(session["user_id"])
     parent_task = session_db.query(Task).get(parent_id)
 
@@ -138,7 +120,7 @@ def add_root_task():
         flash("Please login first.", "warning")
         return redirect(url_for("webapp.auth.login"))
 
-    session_db = create_session()
+    session_db = get_session()
     user = session_db.query(User).get(session["user_id"])
 
     if request.method == "POST":
@@ -175,19 +157,18 @@ def delete_task(task_id):
         flash("Please login first.", "warning")
         return redirect(url_for("webapp.auth.login"))
 
-    session_db = create_session()
+    session_db = get_session()
     user = session_db.query(User).get(session["user_id"])
-    task = session_db.query(Task).get(task_id)
+    error = delete_task_returning(session_db, task_id, user.id, user.is_admin)
 
-    if not task:
+    if error == 404:
         flash("Task not found.", "danger")
         return redirect(url_for("webapp.todo.todo_list"))
 
-    if task.owner_id != user.id and not user.is_admin:
+    if error == 403:
         flash("You do not have permission to delete this task.", "danger")
         return redirect(url_for("webapp.todo.todo_list"))
 
-    session_db.delete(task)
     session_db.commit()
 
     flash("Task deleted successfully!", "success")
@@ -200,7 +181,7 @@ def share_task(task_id):
         flash("Please login first.", "warning")
         return redirect(url_for("webapp.auth.login"))
 
-    session_db = create_session()
+    session_db = get_session()
     user = session_db.query(User).get(session["user_id"])
     task = session_db.query(Task).get(task_id)
 
@@ -225,12 +206,10 @@ def share_task(task_id):
         if TaskShareLevel.level2int(share_level) == 0:
             flash("Invalid level. Sharing stopped.", "warning")
             return redirect(url_for("webapp.todo.todo_list"))
-        # TODO: implement recursive access changed (for children)
-        task.access_politics = share_level
         try:
-            session_db.add(task)
+            updated = share_subtree(session_db, task, share_level)
             session_db.commit()
-            flash(f"Task shared.", "success")
+            flash(f"Task shared ({updated} tasks updated).", "success")
         except Exception as e:
             print(e)
             flash("Failed to share this task!", "danger")
@@ -3,9 +3,11 @@ import random
 from datetime import datetime, UTC
 
 from flask import Blueprint, render_template, request, redirect, url_for, session, flash
-from db import create_session
+from db import get_session
 from ORM import User, AuthToken
 from ORM.authtokens import TokensAccessLevels
+from token_cache import record_revocation
+from serialization import serialize_token
 
 bp_token = Blueprint("token", __name__, url_prefix="/token")
 
@@ -16,11 +18,14 @@ def token():
         flash("Please login first.", "warning")
         return redirect(url_for("webapp.auth.login"))
 
-    session_db = create_session()
+    session_db = get_session()
     user = session_db.query(User).get(session["user_id"])
 
-    tokens = session_db.query(AuthToken).filter(AuthToken.user_id == user.id).all()
-    tokens_data_list = [t.serialize_from_object() for t in tokens]
+    # Expired tokens are rejected anyway and removed by token_sweeper
+    tokens = session_db.query(AuthToken).filter(
+        AuthToken.user_id == user.id, AuthToken.valid_until >= datetime.now(),
+    ).all()
+    tokens_data_list = [serialize_token(t) for t in tokens]
     for i, t in enumerate(tokens):
         tokens_data_list[i]["access_level"] = F"{
         str(t.access_level).split('.')[1]
@@ -76,7 +81,7 @@ def revoke(token_id):
         flash("Please login first.", "warning")
         return redirect(url_for("webapp.auth.login"))
 
-    session_db = create_session()
+    session_db = get_session()
     user = session_db.query(User).get(session["user_id"])
     _token = session_db.query(AuthToken).get(token_id)
     if not _token:
@@ -86,7 +91,7 @@ def revoke(token_id):
             flash("Access denied!", "danger")
         else:
             session_db.delete(_token)
+            record_revocation(session_db)
             session_db.commit()
             flash(F"Token {token_id} deleted.", "success")
-    session_db.close()
     return redirect(url_for("webapp.token.token"))
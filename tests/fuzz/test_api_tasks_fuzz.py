@@ -194,4 +194,47 @@ def test_malformed_json_fuzz(api_url, auth_headers, malformed_json):
         assert response.status_code != 500, f"Server error on malformed input: {response.text}"
     except requests.RequestException:
         # Connection errors are OK - the server might close the connection for very invalid data
-        pass 
\ No newline at end of file
+        pass
+
+
+@settings(
+    max_examples=30,
+    deadline=None,
+    suppress_health_check=[HealthCheck.function_scoped_fixture],
+)
+@given(
+    batch=st.lists(task_creation_data, min_size=1, max_size=20),
+    parent_links=st.lists(st.booleans(), min_size=20, max_size=20),
+)
+def test_create_tasks_batch_fuzz(api_url, auth_headers, batch, parent_links):
+    """Test batch task creation with fuzzed data and intra-batch parents."""
+    batch_url = join_url_path(api_url, "tasks/batch")
+
+    items = []
+    for i, task_data in enumerate(batch):
+        item = {k: v for k, v in task_data.items() if v is not None}
+        item["temp_id"] = f"t{i}"
+        if i > 0 and parent_links[i]:
+            item["parent_temp_id"] = f"t{i - 1}"
+        items.append(item)
+
+    response = requests.post(batch_url, json=items, headers=auth_headers)
+
+    if response.status_code == 201:
+        ids = response.json()["ids"]
+        assert len(ids) == len(items)
+        assert len(set(ids)) == len(ids)
+        for i, task_id in enumerate(ids):
+            task = requests.get(join_url_path(api_url, f"tasks/{task_id}"), headers=auth_headers).json()
+            assert task["title"] == items[i]["title"]
+            if "parent_temp_id" in items[i]:
+                assert task["parent"] == ids[i - 1]
+
+        # Cleanup (children are removed together with parents)
+        for task_id in reversed(ids):
+            requests.delete(join_url_path(api_url, f"tasks/{task_id}"), headers=auth_headers)
+    elif response.status_code in (400, 403):
+        # Known error cases - bad request or forbidden
+        pass
+    else:
+        assert False, f"Unexpected response: {response.status_code} - {response.text}"
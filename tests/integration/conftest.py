@@ -0,0 +1,70 @@
+import os
+import secrets
+import sys
+import tempfile
+from datetime import datetime, timedelta, UTC
+
+import pytest
+
+BACKEND_DIR = os.path.join(os.path.dirname(__file__), "..", "..", "backend")
+
+
+@pytest.fixture(scope="session")
+def app():
+    """
+Imports the app like a uWSGI worker does: DB env from environment, temporary SQLite file by default.
+    """
+    tmp_dir = tempfile.mkdtemp()
+    os.environ.setdefault("DB_TYPE", "sqlite")
+    os.environ.setdefault("DB_FILE_PATH", os.path.join(tmp_dir, "integration_test.sqlite3"))
+    os.environ["TOKEN_SWEEP_INTERVAL"] = "0"
+    sys.path.insert(0, os.path.abspath(BACKEND_DIR))
+    import app as app_module
+
+    return app_module.app
+
+
+@pytest.fixture(scope="session")
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture(scope="session")
+def make_user(app):
+    """
+Creates a user with a token directly in DB (no password hashing, no token/create rate limit).
+    :return: function (access_level=3, is_admin=False) -> (user id, headers with the token)
+    """
+    from db import create_session
+    from ORM.users import User
+    from ORM.authtokens import AuthToken, TokensAccessLevels
+
+    def _make_user(access_level: int = 3, is_admin: bool = False) -> (int, {str: str}):
+        with create_session() as session:
+            user = User(username=f"test_{secrets.token_hex(8)}", password_hash="!", is_admin=is_admin)
+            session.add(user)
+            session.flush()
+            token = AuthToken(
+                id=secrets.token_hex(32),
+                user_id=user.id,
+                access_level=TokensAccessLevels.level_by_id(access_level),
+                valid_until=datetime.now(UTC) + timedelta(days=1),
+            )
+            session.add(token)
+            session.commit()
+            return user.id, {"Authorization": f"Token {token.id}"}
+
+    return _make_user
+
+
+@pytest.fixture(scope="session")
+def create_task(client):
+    """
+    :return: function (headers, **fields) -> created task (JSON of POST /tasks)
+    """
+    def _create_task(headers: {str: str}, **fields) -> dict:
+        response = client.post("/api/v1/tasks", json={"title": "task", **fields}, headers=headers)
+        assert response.status_code == 201, response.get_data(as_text=True)
+        return response.get_json()
+
+    return _create_task
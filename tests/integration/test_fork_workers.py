@@ -0,0 +1,97 @@
+import os
+import threading
+
+import pytest
+
+# Mark all tests in this module as integration tests
+pytestmark = [pytest.mark.integration, pytest.mark.api]
+
+WORKERS = 4
+REQUESTS_PER_WORKER = 100
+
+
+@pytest.fixture(scope="module")
+def master_app(app, make_user):
+    """
+Uses the DB in this process (like uWSGI master does after importing the app) before workers are forked.
+    """
+    if not hasattr(os, "fork"):
+        pytest.skip("os.fork is not available")
+    _, headers = make_user()
+    # Pool of the master now holds open connections, workers inherit them
+    assert app.test_client().get("/api/v1/tasks", headers=headers).status_code == 200
+    return app, headers
+
+
+def hammer(app, headers, count) -> [str]:
+    """Alternates task list reads and task creation, returns descriptions of failed requests."""
+    client = app.test_client()
+    errors = []
+    for i in range(count):
+        try:
+            if i % 2:
+                response = client.post("/api/v1/tasks", json={"title": f"fork {os.getpid()} {i}"}, headers=headers)
+                expected = 201
+            else:
+                response = client.get("/api/v1/tasks", headers=headers)
+                expected = 200
+            if response.status_code != expected:
+                errors.append(f"request {i}: {response.status_code} {response.get_data(as_text=True)[:200]}")
+        except Exception as e:
+            errors.append(f"request {i}: {e.__class__.__name__}: {e}")
+    return errors
+
+
+def _run_worker(app, headers, write_fd):
+    """Body of a forked worker: errors go to the parent through the pipe, exit code 1 if there are any."""
+    from db import get_pool_stats
+
+    errors = []
+    try:
+        # Connections inherited from the master are dropped by the fork hook
+        inherited = get_pool_stats()["primary"]["checked_in"]
+        if inherited:
+            errors.append(f"{inherited} connections inherited from the master")
+        errors += hammer(app, headers, REQUESTS_PER_WORKER)
+    except BaseException as e:
+        errors.append(f"{e.__class__.__name__}: {e}")
+    finally:
+        with os.fdopen(write_fd, "w") as pipe:
+            pipe.write("\n".join(f"worker {os.getpid()}: {error}" for error in errors))
+        os._exit(1 if errors else 0)
+
+
+def test_forked_workers_hammer_tasks(master_app):
+    """Forked workers and the master use the DB concurrently without sharing connections."""
+    from db import get_pool_stats
+
+    app, headers = master_app
+    assert get_pool_stats()["primary"]["checked_in"] > 0
+    workers = []
+    for _ in range(WORKERS):
+        read_fd, write_fd = os.pipe()
+        pid = os.fork()
+        if pid == 0:
+            os.close(read_fd)
+            _run_worker(app, headers, write_fd)
+        os.close(write_fd)
+        workers.append((pid, read_fd))
+
+    # Master keeps using its own connections meanwhile
+    master_errors = []
+    thread = threading.Thread(target=lambda: master_errors.extend(hammer(app, headers, REQUESTS_PER_WORKER)))
+    thread.start()
+    errors = []
+    exit_codes = []
+    for pid, read_fd in workers:
+        with os.fdopen(read_fd) as pipe:
+            output = pipe.read()
+        errors += output.splitlines()
+        exit_codes.append(os.waitstatus_to_exitcode(os.waitpid(pid, 0)[1]))
+    thread.join()
+
+    assert errors == []
+    assert exit_codes == [0] * WORKERS
+    assert master_errors == []
+    response = app.test_client().get("/api/v1/tasks", headers=headers)
+    assert response.status_code == 200
@@ -0,0 +1,88 @@
+import pytest
+
+pytestmark = [pytest.mark.integration, pytest.mark.api]
+
+
+def _status(client, headers, task_id):
+    return client.get(f"/api/v1/tasks/{task_id}", headers=headers).get_json()["status"]
+
+
+def test_patch_by_ids_skips_tasks_without_write_access(client, make_user, create_task):
+    _, headers = make_user()
+    _, other_headers = make_user()
+    own = create_task(headers, title="own")["id"]
+    shared_rw = create_task(other_headers, title="rw", access_politics="RW_ALL")["id"]
+    shared_r = create_task(other_headers, title="r", access_politics="R_ALL")["id"]
+    private = create_task(other_headers, title="private")["id"]
+
+    response = client.patch("/api/v1/tasks", json={
+        "ids": [own, shared_rw, shared_r, private, 999999999],
+        "patch": {"status": "DONE"},
+    }, headers=headers)
+    assert response.status_code == 200
+    assert response.get_json() == {
+        "updated": sorted([own, shared_rw]),
+        "forbidden": sorted([shared_r, private]),
+        "not_found": [999999999],
+    }
+    assert _status(client, other_headers, shared_rw) == "DONE"
+    assert _status(client, other_headers, shared_r) == "NONE"
+    assert _status(client, other_headers, private) == "NONE"
+
+
+def test_access_politics_only_in_own_tasks(client, make_user, create_task):
+    _, headers = make_user()
+    _, other_headers = make_user()
+    own = create_task(headers, title="own")["id"]
+    shared_rw = create_task(other_headers, title="rw", access_politics="RW_ALL")["id"]
+
+    response = client.patch("/api/v1/tasks", json={
+        "ids": [own, shared_rw],
+        "patch": {"access_politics": "R_ALL"},
+    }, headers=headers)
+    assert response.get_json()["updated"] == [own]
+    assert response.get_json()["forbidden"] == [shared_rw]
+    task = client.get(f"/api/v1/tasks/{shared_rw}", headers=other_headers).get_json()
+    assert task["access_politics"] == "RW_ALL"
+
+
+def test_patch_by_filter(client, make_user, create_task):
+    _, headers = make_user()
+    _, other_headers = make_user()
+    parent = create_task(headers, title="parent")["id"]
+    children = [create_task(headers, title=f"child {i}", parent=parent)["id"] for i in range(3)]
+    other = create_task(other_headers, title="other child", parent=parent)["id"]
+
+    response = client.patch("/api/v1/tasks", json={
+        "filter": {"parent": parent},
+        "patch": {"status": "PENDING", "title": "renamed"},
+    }, headers=headers)
+    assert response.status_code == 200
+    assert response.get_json() == {"updated": children}
+    assert _status(client, other_headers, other) == "NONE"
+    assert client.get(f"/api/v1/tasks/{children[0]}", headers=headers).get_json()["title"] == "renamed"
+
+
+@pytest.mark.parametrize("body", [
+    {"patch": {"status": "DONE"}},
+    {"ids": [1], "filter": {"status": "NONE"}, "patch": {"status": "DONE"}},
+    {"ids": [], "patch": {"status": "DONE"}},
+    {"ids": [True], "patch": {"status": "DONE"}},
+    {"ids": [1], "patch": {}},
+    {"ids": [1], "patch": {"parent": 1}},
+    {"ids": [1], "patch": {"status": "WRONG"}},
+    {"filter": {"owner_id": 1}, "patch": {"status": "DONE"}},
+])
+def test_invalid_requests(client, make_user, body):
+    _, headers = make_user()
+    assert client.patch("/api/v1/tasks", json=body, headers=headers).status_code == 400
+
+
+def test_readonly_token_is_rejected(client, make_user, create_task):
+    _, headers = make_user()
+    _, readonly_headers = make_user(access_level=0)
+    task_id = create_task(headers, title="task")["id"]
+
+    response = client.patch("/api/v1/tasks", json={"ids": [task_id], "patch": {"status": "DONE"}},
+                            headers=readonly_headers)
+    assert response.status_code == 403
@@ -0,0 +1,69 @@
+import pytest
+
+pytestmark = [pytest.mark.integration, pytest.mark.api]
+
+
+def _closure(ids):
+    """task_closure rows of given tasks as {(ancestor, descendant): depth}"""
+    from db import create_session
+    from ORM.taskclosure import TaskClosure
+
+    with create_session() as session:
+        rows = session.query(TaskClosure).filter(TaskClosure.descendant_id.in_(ids)).all()
+        return {(row.ancestor_id, row.descendant_id): row.depth for row in rows}
+
+
+def _expected_closure(parents):
+    """Closure of {task id: parent id} built by walking parent links"""
+    expected = {}
+    for task_id in parents:
+        ancestor, depth = task_id, 0
+        while ancestor is not None:
+            expected[(ancestor, task_id)] = depth
+            ancestor, depth = parents.get(ancestor), depth + 1
+    return expected
+
+
+@pytest.fixture
+def chain(make_user, create_task):
+    """a <- b <- c and a separate root d"""
+    _, headers = make_user()
+    a = create_task(headers, title="a")["id"]
+    b = create_task(headers, title="b", parent=a)["id"]
+    c = create_task(headers, title="c", parent=b)["id"]
+    d = create_task(headers, title="d")["id"]
+    return headers, a, b, c, d
+
+
+def test_closure_of_created_tasks(chain):
+    _, a, b, c, d = chain
+    assert _closure([a, b, c, d]) == _expected_closure({a: None, b: a, c: b, d: None})
+
+
+def test_move_subtree(client, chain):
+    headers, a, b, c, d = chain
+
+    response = client.put(f"/api/v1/tasks/{b}", json={"parent": d}, headers=headers)
+    assert response.status_code == 200
+    assert _closure([a, b, c, d]) == _expected_closure({a: None, b: d, c: b, d: None})
+
+    response = client.put(f"/api/v1/tasks/{b}", json={"parent": None}, headers=headers)
+    assert response.status_code == 200
+    assert _closure([a, b, c, d]) == _expected_closure({a: None, b: None, c: b, d: None})
+
+
+def test_move_under_descendant_is_rejected(client, chain):
+    headers, a, b, c, d = chain
+
+    for parent in (a, c):
+        response = client.put(f"/api/v1/tasks/{a}", json={"parent": parent}, headers=headers)
+        assert response.status_code == 400
+    assert _closure([a, b, c, d]) == _expected_closure({a: None, b: a, c: b, d: None})
+
+
+def test_delete_removes_subtree_rows(client, chain):
+    headers, a, b, c, d = chain
+
+    assert client.delete(f"/api/v1/tasks/{b}", headers=headers).status_code == 204
+    assert client.get(f"/api/v1/tasks/{c}", headers=headers).status_code == 404
+    assert _closure([a, b, c, d]) == _expected_closure({a: None, d: None})
@@ -0,0 +1,69 @@
+import pytest
+
+pytestmark = [pytest.mark.integration, pytest.mark.api]
+
+
+def test_task_not_modified_until_update(client, make_user, create_task):
+    _, headers = make_user()
+    task_id = create_task(headers, title="task")["id"]
+
+    response = client.get(f"/api/v1/tasks/{task_id}", headers=headers)
+    etag = response.headers["ETag"]
+    response = client.get(f"/api/v1/tasks/{task_id}", headers={**headers, "If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.headers["ETag"] == etag
+
+    assert client.put(f"/api/v1/tasks/{task_id}", json={"title": "new"}, headers=headers).status_code == 200
+    response = client.get(f"/api/v1/tasks/{task_id}", headers={**headers, "If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["ETag"] != etag
+    assert response.get_json()["title"] == "new"
+
+
+def test_task_etag_depends_on_requester(client, make_user, create_task):
+    _, owner_headers = make_user()
+    _, headers = make_user()
+    task_id = create_task(owner_headers, title="shared", access_politics="R_ALL")["id"]
+
+    owner_etag = client.get(f"/api/v1/tasks/{task_id}", headers=owner_headers).headers["ETag"]
+    response = client.get(f"/api/v1/tasks/{task_id}", headers={**headers, "If-None-Match": owner_etag})
+    assert response.status_code == 200
+    assert response.headers["ETag"] != owner_etag
+
+
+def test_forged_etag_of_unreadable_task_is_denied(app, client, make_user, create_task):
+    from types import SimpleNamespace
+    from tasks import task_etag
+
+    _, owner_headers = make_user()
+    user_id, headers = make_user()
+    task_id = create_task(owner_headers, title="private")["id"]
+
+    # Even a correct tag (as if the secret key leaked) or "*" must not turn 403 into 304
+    with app.app_context():
+        etag = task_etag(SimpleNamespace(id=task_id, version=0), user_id, 3)
+    for if_none_match in (etag, "*"):
+        response = client.get(f"/api/v1/tasks/{task_id}", headers={**headers, "If-None-Match": if_none_match})
+        assert response.status_code == 403
+        assert "ETag" not in response.headers
+        response = client.get(f"/api/v1/tasks/{task_id}", headers={"If-None-Match": if_none_match})
+        assert response.status_code == 403
+    response = client.get("/api/v1/tasks/999999999", headers={**headers, "If-None-Match": "*"})
+    assert response.status_code == 404
+
+
+def test_task_list_not_modified_until_change(client, make_user, create_task):
+    _, headers = make_user()
+    create_task(headers, title="first")
+
+    etag = client.get("/api/v1/tasks?limit=10", headers=headers).headers["ETag"]
+    response = client.get("/api/v1/tasks?limit=10", headers={**headers, "If-None-Match": etag})
+    assert response.status_code == 304
+    # Query string is a part of the tag
+    response = client.get("/api/v1/tasks?limit=5", headers={**headers, "If-None-Match": etag})
+    assert response.status_code == 200
+
+    create_task(headers, title="second")
+    response = client.get("/api/v1/tasks?limit=10", headers={**headers, "If-None-Match": etag})
+    assert response.status_code == 200
+    assert {"first", "second"} <= {task["title"] for task in response.get_json()["tasks"]}
@@ -0,0 +1,90 @@
+import csv
+import gzip
+import io
+import json
+
+import pytest
+
+pytestmark = [pytest.mark.integration, pytest.mark.api]
+
+
+def _ndjson(response):
+    return [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+
+
+@pytest.fixture
+def own_data(make_user, create_task):
+    """User with a small tree of tasks, other user has a task too"""
+    user_id, headers = make_user()
+    _, other_headers = make_user()
+    root = create_task(headers, title="root", description="first line\nsecond, \"quoted\"")["id"]
+    child = create_task(headers, title="child", parent=root, deadline="2030-01-01T00:00:00")["id"]
+    create_task(other_headers, title="foreign", access_politics="R_ALL")
+    return user_id, headers, [root, child]
+
+
+def test_export_own_data(client, own_data):
+    user_id, headers, task_ids = own_data
+
+    response = client.get("/api/v1/export", headers=headers)
+    assert response.status_code == 200
+    assert response.mimetype == "application/x-ndjson"
+    records = _ndjson(response)
+    assert [(record["type"], record["id"]) for record in records] == [
+        ("users", user_id), *(("tasks", task_id) for task_id in task_ids),
+    ]
+    assert "password_hash" not in records[0]
+    assert records[2]["parent"] == task_ids[0]
+    assert all(client.get(f"/api/v1/tasks/{record['id']}", headers=headers).get_json() == {
+        key: value for key, value in record.items() if key != "type"
+    } for record in records[1:])
+
+
+def test_export_everything_for_admin(client, make_user, own_data):
+    user_id, _, task_ids = own_data
+    _, admin_headers = make_user(access_level=4, is_admin=True)
+
+    records = _ndjson(client.get("/api/v1/export", headers=admin_headers))
+    ids = {(record["type"], record["id"]) for record in records}
+    assert {("users", user_id), *(("tasks", task_id) for task_id in task_ids)} <= ids
+    assert {record["owner_id"] for record in records if record["type"] == "tasks"} != {user_id}
+
+
+def test_export_is_resumable_by_cursor(client, own_data):
+    _, headers, task_ids = own_data
+
+    records = _ndjson(client.get(f"/api/v1/export?cursor=tasks:{task_ids[0]}", headers=headers))
+    assert [(record["type"], record["id"]) for record in records] == [("tasks", task_ids[1])]
+
+
+def test_export_csv_and_gzip(client, own_data):
+    _, headers, task_ids = own_data
+    url = "/api/v1/export?format=csv&sections=tasks"
+
+    response = client.get(url, headers=headers)
+    assert response.mimetype == "text/csv"
+    rows = list(csv.DictReader(io.StringIO(response.get_data(as_text=True))))
+    assert [int(row["id"]) for row in rows] == task_ids
+    assert rows[0]["description"] == "first line\nsecond, \"quoted\""
+    assert rows[0]["parent"] == ""
+    assert rows[1]["parent"] == str(task_ids[0])
+
+    compressed = client.get(url, headers={**headers, "Accept-Encoding": "gzip"})
+    assert compressed.headers["Content-Encoding"] == "gzip"
+    assert gzip.decompress(compressed.get_data()) == response.get_data()
+
+
+@pytest.mark.parametrize("query", [
+    "format=xml",
+    "sections=passwords",
+    "format=csv",
+    "cursor=tasks",
+    "sections=tasks&cursor=users:1",
+])
+def test_invalid_export_requests(client, make_user, query):
+    _, headers = make_user()
+    assert client.get(f"/api/v1/export?{query}", headers=headers).status_code == 400
+
+
+def test_export_requires_token(client):
+    assert client.get("/api/v1/export").status_code == 401
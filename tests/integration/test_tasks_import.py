@@ -0,0 +1,115 @@
+import gzip
+import json
+
+import pytest
+
+pytestmark = [pytest.mark.integration, pytest.mark.api]
+
+TASK_FIELDS = ("title", "description", "status", "access_politics", "deadline", "creation_date")
+
+
+def _events(response):
+    return [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+
+
+def _import(client, headers, data, query=""):
+    response = client.post(f"/api/v1/import{query}", data=data, headers=headers)
+    assert response.status_code == 200
+    events = _events(response)
+    assert events[-1]["type"] == "result"
+    return events
+
+
+def _own_tasks(client, headers):
+    """Own tasks from export, parents replaced by titles: comparable between users"""
+    response = client.get("/api/v1/export?sections=tasks", headers=headers)
+    tasks = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+    titles = {task["id"]: task["title"] for task in tasks}
+    return sorted((tuple(task[field] for field in TASK_FIELDS), titles.get(task["parent"])) for task in tasks)
+
+
+@pytest.fixture
+def source(make_user, create_task):
+    """Headers of a user with a tree of tasks: a <- b <- c, d"""
+    _, headers = make_user()
+    a = create_task(headers, title="a", description="line 1\nline 2, \"quoted\"", access_politics="R_ALL")["id"]
+    b = create_task(headers, title="b", parent=a, status="PENDING")["id"]
+    create_task(headers, title="c", parent=b, deadline="2030-01-01T12:00:00")
+    create_task(headers, title="d", status="DONE")
+    return headers
+
+
+@pytest.mark.parametrize("export_format", ["ndjson", "csv"])
+def test_round_trip(client, make_user, source, export_format):
+    _, headers = make_user()
+    dump = client.get(f"/api/v1/export?format={export_format}&sections=tasks", headers=source).get_data()
+
+    events = _import(client, headers, dump, f"?format={export_format}")
+    assert events == [{**events[-1], "lines": 4, "imported": 4, "skipped": 0, "rejected": 0, "waiting": 0,
+                       "aborted": False}]
+    assert _own_tasks(client, headers) == _own_tasks(client, source)
+
+
+def test_gzip_round_trip_skips_users(client, make_user, source):
+    _, headers = make_user()
+    dump = client.get("/api/v1/export", headers=source).get_data()
+
+    events = _import(client, {**headers, "Content-Encoding": "gzip"}, gzip.compress(dump))
+    assert events[-1]["imported"] == 4
+    assert events[-1]["skipped"] == 1
+    assert _own_tasks(client, headers) == _own_tasks(client, source)
+
+
+def test_parent_later_in_dump(client, make_user):
+    _, headers = make_user()
+    dump = "\n".join(json.dumps(task) for task in [
+        {"id": 3, "title": "grandchild", "parent": 2},
+        {"id": 2, "title": "child", "parent": 1},
+        {"id": 1, "title": "root"},
+    ])
+
+    events = _import(client, headers, dump)
+    assert events[-1]["imported"] == 3
+    assert [parent for _, parent in _own_tasks(client, headers)] == ["root", "child", None]
+
+
+def test_per_line_errors(client, make_user):
+    _, headers = make_user()
+    dump = "\n".join([
+        json.dumps({"id": 1, "title": "ok"}),
+        "{broken",
+        json.dumps({"id": 2, "title": "orphan", "parent": 100}),
+        json.dumps({"id": 1, "title": "duplicate"}),
+        json.dumps({"id": 3, "title": "bad deadline", "deadline": "tomorrow"}),
+        json.dumps({"id": 4, "title": "child", "parent": 1}),
+    ])
+
+    events = _import(client, headers, dump)
+    errors = {event["line"]: event["error"] for event in events if event["type"] == "error"}
+    assert sorted(errors) == [2, 3, 4, 5]
+    assert "parent 100" in errors[3]
+    assert "duplicate" in errors[4]
+    assert events[-1]["imported"] == 2
+    assert events[-1]["rejected"] == 4
+    assert [task[0] for task, _ in _own_tasks(client, headers)] == ["child", "ok"]
+
+
+def test_keep_owners_requires_admin(client, make_user, source):
+    _, headers = make_user()
+    _, readonly_headers = make_user(access_level=0)
+    dump = client.get("/api/v1/export?sections=tasks", headers=source).get_data()
+
+    assert client.post("/api/v1/import?keep_owners=1", data=dump, headers=headers).status_code == 403
+    assert client.post("/api/v1/import", data=dump, headers=readonly_headers).status_code == 403
+    assert client.post("/api/v1/import?format=xml", data=dump, headers=headers).status_code == 400
+
+
+def test_keep_owners(client, make_user, source):
+    owner_id, owner_headers = make_user()
+    _, admin_headers = make_user(access_level=4, is_admin=True)
+    dump = client.get("/api/v1/export?sections=tasks", headers=source).get_data().decode()
+    dump = "\n".join(json.dumps({**json.loads(line), "owner_id": owner_id}) for line in dump.splitlines())
+
+    events = _import(client, admin_headers, dump, "?keep_owners=1")
+    assert events[-1]["imported"] == 4
+    assert _own_tasks(client, owner_headers) == _own_tasks(client, source)
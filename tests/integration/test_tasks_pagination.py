@@ -0,0 +1,84 @@
+import pytest
+
+pytestmark = [pytest.mark.integration, pytest.mark.api]
+
+
+def _all_pages(client, headers, query):
+    tasks = []
+    cursor = None
+    for _ in range(100):
+        url = f"/api/v1/tasks?{query}" + (f"&cursor={cursor}" if cursor else "")
+        response = client.get(url, headers=headers)
+        assert response.status_code == 200
+        page = response.get_json()
+        tasks.extend(page["tasks"])
+        cursor = page["next_cursor"]
+        if cursor is None:
+            return tasks
+    pytest.fail("Pagination didn't end")
+
+
+def test_list_without_limit_is_array_of_all_tasks(client, make_user, create_task):
+    _, headers = make_user()
+    ids = {create_task(headers, title=f"array {i}")["id"] for i in range(3)}
+
+    response = client.get("/api/v1/tasks", headers=headers)
+    assert response.status_code == 200
+    tasks = response.get_json()
+    assert isinstance(tasks, list)
+    assert ids <= {task["id"] for task in tasks}
+
+
+def test_pages_by_id_cover_all_tasks_once(client, make_user, create_task):
+    _, headers = make_user()
+    ids = [create_task(headers, title=f"page {i}")["id"] for i in range(7)]
+
+    first = client.get("/api/v1/tasks?limit=3", headers=headers).get_json()
+    assert len(first["tasks"]) == 3
+    assert first["next_cursor"] is not None
+
+    tasks = _all_pages(client, headers, "limit=3")
+    listed = [task["id"] for task in tasks]
+    assert len(listed) == len(set(listed))
+    assert [task_id for task_id in listed if task_id in ids] == sorted(ids)
+
+
+def test_pages_by_deadline(client, make_user, create_task):
+    _, headers = make_user()
+    deadlines = ["2030-01-03T00:00:00", "2030-01-01T00:00:00", "2030-01-02T00:00:00", "2030-01-01T00:00:00"]
+    ids = [create_task(headers, title=f"deadline {i}", deadline=deadline)["id"] for i, deadline in enumerate(deadlines)]
+
+    tasks = _all_pages(client, headers, "limit=2&order_by=deadline")
+    expected = [task_id for _, task_id in sorted(zip(deadlines, ids))]
+    assert [task["id"] for task in tasks if task["id"] in ids] == expected
+
+
+@pytest.mark.parametrize("query", [
+    "cursor=not-a-cursor",
+    "limit=abc",
+    "order_by=rank",
+    "order_by=title",
+    "filter_status=UNKNOWN",
+])
+def test_invalid_parameters(client, make_user, query):
+    _, headers = make_user()
+    assert client.get(f"/api/v1/tasks?{query}", headers=headers).status_code == 400
+
+
+def test_cursor_of_other_order_is_rejected(client, make_user, create_task):
+    _, headers = make_user()
+    for i in range(3):
+        create_task(headers, title=f"cursor {i}")
+    cursor = client.get("/api/v1/tasks?limit=1", headers=headers).get_json()["next_cursor"]
+
+    response = client.get(f"/api/v1/tasks?limit=1&order_by=deadline&cursor={cursor}", headers=headers)
+    assert response.status_code == 400
+
+
+def test_filter_user_requires_admin(client, make_user):
+    user_id, headers = make_user()
+    _, admin_headers = make_user(access_level=4, is_admin=True)
+
+    assert client.get(f"/api/v1/tasks?filter_user={user_id}", headers=headers).status_code == 403
+    assert client.get(f"/api/v1/tasks?filter_user={user_id}", headers=admin_headers).status_code == 200
+    assert client.get("/api/v1/tasks?filter_user=999999999", headers=admin_headers).status_code == 404
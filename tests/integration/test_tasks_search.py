@@ -0,0 +1,72 @@
+import secrets
+
+import pytest
+
+pytestmark = [pytest.mark.integration, pytest.mark.api]
+
+
+def _search(client, headers, text, query=""):
+    response = client.get(f"/api/v1/tasks?filter_search={text}{query}", headers=headers)
+    assert response.status_code == 200
+    return response.get_json()
+
+
+def test_search_by_title_and_description(client, make_user, create_task):
+    _, headers = make_user()
+    word = f"w{secrets.token_hex(6)}"
+    in_title = create_task(headers, title=f"buy {word}")["id"]
+    in_description = create_task(headers, title="other", description=f"about {word} here")["id"]
+    create_task(headers, title="unrelated")
+
+    assert {task["id"] for task in _search(client, headers, word)} == {in_title, in_description}
+
+
+def test_index_follows_updates_and_deletes(client, make_user, create_task):
+    _, headers = make_user()
+    old_word = f"w{secrets.token_hex(6)}"
+    new_word = f"w{secrets.token_hex(6)}"
+    task_id = create_task(headers, title=old_word)["id"]
+
+    response = client.put(f"/api/v1/tasks/{task_id}", json={"title": new_word}, headers=headers)
+    assert response.status_code == 200
+    assert _search(client, headers, old_word) == []
+    assert [task["id"] for task in _search(client, headers, new_word)] == [task_id]
+
+    assert client.delete(f"/api/v1/tasks/{task_id}", headers=headers).status_code == 204
+    assert _search(client, headers, new_word) == []
+
+
+def test_search_input_is_not_query_syntax(client, make_user, create_task):
+    _, headers = make_user()
+    create_task(headers, title="quoted")
+
+    for text in ('"', "NOT", "a OR", "title:x", "*"):
+        _search(client, headers, text)
+
+
+def test_blank_search_is_no_filter(client, make_user, create_task):
+    _, headers = make_user()
+    task_id = create_task(headers, title="blank")["id"]
+
+    assert task_id in {task["id"] for task in _search(client, headers, "%20%20")}
+
+
+def test_rank_pages_follow_relevance(client, make_user, create_task):
+    _, headers = make_user()
+    word = f"w{secrets.token_hex(6)}"
+    ids = [create_task(headers, title=f"{word} " * count + "task")["id"] for count in (1, 3, 2, 1, 2)]
+
+    ranked = [task["id"] for task in _search(client, headers, word)]
+    assert sorted(ranked) == sorted(ids)
+    # The most repeated word is the best match
+    assert ranked[0] == ids[1]
+
+    paged = []
+    cursor = None
+    while True:
+        page = _search(client, headers, word, "&limit=2&order_by=rank" + (f"&cursor={cursor}" if cursor else ""))
+        paged.extend(task["id"] for task in page["tasks"])
+        cursor = page["next_cursor"]
+        if cursor is None:
+            break
+    assert paged == ranked
@@ -0,0 +1,74 @@
+import pytest
+
+pytestmark = [pytest.mark.integration, pytest.mark.api]
+
+
+@pytest.fixture
+def tree(make_user, create_task):
+    """
+root (R_ALL)
+    visible (PARENT_SELECT)
+        grandchild (PARENT_SELECT)
+    hidden (PRIVATE)
+        under_hidden (PARENT_SELECT)
+    """
+    owner_id, headers = make_user()
+    root = create_task(headers, title="root", access_politics="R_ALL")["id"]
+    visible = create_task(headers, title="visible", parent=root, access_politics="PARENT_SELECT")["id"]
+    grandchild = create_task(headers, title="grandchild", parent=visible, access_politics="PARENT_SELECT")["id"]
+    hidden = create_task(headers, title="hidden", parent=root, access_politics="PRIVATE")["id"]
+    under_hidden = create_task(headers, title="under hidden", parent=hidden, access_politics="PARENT_SELECT")["id"]
+    return headers, {
+        "root": root, "visible": visible, "grandchild": grandchild, "hidden": hidden, "under_hidden": under_hidden,
+    }
+
+
+def _flat(client, task_id, headers=None, query=""):
+    response = client.get(f"/api/v1/tasks/{task_id}/subtree?format=flat{query}", headers=headers or {})
+    assert response.status_code == 200
+    return {task["id"]: task["depth"] for task in response.get_json()}
+
+
+def test_owner_sees_whole_subtree(client, tree):
+    headers, ids = tree
+    assert _flat(client, ids["root"], headers) == {
+        ids["root"]: 0, ids["visible"]: 1, ids["hidden"]: 1, ids["grandchild"]: 2, ids["under_hidden"]: 2,
+    }
+
+
+def test_private_branch_is_skipped_for_others(client, make_user, tree):
+    _, ids = tree
+    _, other_headers = make_user()
+    expected = {ids["root"]: 0, ids["visible"]: 1, ids["grandchild"]: 2}
+
+    assert _flat(client, ids["root"], other_headers) == expected
+    # Anonymous users see shared subtrees too
+    assert _flat(client, ids["root"]) == expected
+
+
+def test_max_depth(client, tree):
+    headers, ids = tree
+    assert _flat(client, ids["root"], headers, "&max_depth=0") == {ids["root"]: 0}
+    assert set(_flat(client, ids["root"], headers, "&max_depth=1")) == {ids["root"], ids["visible"], ids["hidden"]}
+
+
+def test_nested_format(client, tree):
+    headers, ids = tree
+    response = client.get(f"/api/v1/tasks/{ids['root']}/subtree", headers=headers)
+    assert response.status_code == 200
+    root = response.get_json()
+    assert root["id"] == ids["root"]
+    children = {child["id"]: child for child in root["children"]}
+    assert set(children) == {ids["visible"], ids["hidden"]}
+    assert [task["id"] for task in children[ids["visible"]]["children"]] == [ids["grandchild"]]
+
+
+def test_errors(client, make_user, tree):
+    headers, ids = tree
+    _, other_headers = make_user()
+
+    assert client.get(f"/api/v1/tasks/{ids['hidden']}/subtree", headers=other_headers).status_code == 403
+    assert client.get(f"/api/v1/tasks/{ids['hidden']}/subtree").status_code == 403
+    assert client.get("/api/v1/tasks/999999999/subtree", headers=headers).status_code == 404
+    assert client.get(f"/api/v1/tasks/{ids['root']}/subtree?max_depth=-1", headers=headers).status_code == 400
+    assert client.get(f"/api/v1/tasks/{ids['root']}/subtree?format=xml", headers=headers).status_code == 400
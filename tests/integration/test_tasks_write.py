@@ -0,0 +1,63 @@
+import pytest
+
+pytestmark = [pytest.mark.integration, pytest.mark.api]
+
+
+def test_update_returns_changed_task(client, make_user, create_task):
+    _, headers = make_user()
+    task = create_task(headers, title="old", description="description")
+
+    response = client.put(f"/api/v1/tasks/{task['id']}", json={
+        "title": "new", "status": "PENDING", "deadline": "2030-05-01T10:00:00", "access_politics": "R_ALL",
+    }, headers=headers)
+    assert response.status_code == 200
+    updated = response.get_json()
+    assert updated == {
+        **task,
+        "title": "new",
+        "status": "PENDING",
+        "deadline": "2030-05-01T10:00:00",
+        "access_politics": "R_ALL",
+    }
+    assert client.get(f"/api/v1/tasks/{task['id']}", headers=headers).get_json() == updated
+
+
+def test_update_of_shared_task_keeps_owner_fields(client, make_user, create_task):
+    _, owner_headers = make_user()
+    _, headers = make_user()
+    task_id = create_task(owner_headers, title="shared", access_politics="RW_ALL")["id"]
+
+    response = client.put(f"/api/v1/tasks/{task_id}", json={"title": "edited", "access_politics": "PRIVATE"},
+                          headers=headers)
+    assert response.status_code == 200
+    assert response.get_json()["title"] == "edited"
+    assert response.get_json()["access_politics"] == "RW_ALL"
+
+
+def test_update_errors(client, make_user, create_task):
+    _, owner_headers = make_user()
+    _, headers = make_user()
+    readonly = create_task(owner_headers, title="readonly", access_politics="R_ALL")["id"]
+    private = create_task(owner_headers, title="private")["id"]
+
+    for task_id in (readonly, private):
+        assert client.put(f"/api/v1/tasks/{task_id}", json={"title": "x"}, headers=headers).status_code == 403
+    assert client.put("/api/v1/tasks/999999999", json={"title": "x"}, headers=headers).status_code == 404
+    response = client.put(f"/api/v1/tasks/{private}", json={"deadline": "tomorrow"}, headers=owner_headers)
+    assert response.status_code == 400
+    assert client.get(f"/api/v1/tasks/{readonly}", headers=owner_headers).get_json()["title"] == "readonly"
+
+
+def test_delete_is_owner_only(client, make_user, create_task):
+    _, owner_headers = make_user()
+    _, headers = make_user()
+    _, admin_headers = make_user(access_level=4, is_admin=True)
+    shared = create_task(owner_headers, title="shared", access_politics="RW_ALL")["id"]
+    other = create_task(owner_headers, title="other")["id"]
+
+    assert client.delete(f"/api/v1/tasks/{shared}", headers=headers).status_code == 403
+    assert client.delete("/api/v1/tasks/999999999", headers=headers).status_code == 404
+    assert client.delete(f"/api/v1/tasks/{shared}", headers=owner_headers).status_code == 204
+    assert client.get(f"/api/v1/tasks/{shared}", headers=owner_headers).status_code == 404
+    assert client.delete(f"/api/v1/tasks/{other}", headers=admin_headers).status_code == 204
+    assert client.delete(f"/api/v1/tasks/{other}", headers=owner_headers).status_code == 404
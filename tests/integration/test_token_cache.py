@@ -0,0 +1,29 @@
+import pytest
+
+pytestmark = [pytest.mark.integration, pytest.mark.api]
+
+
+def test_revoke_by_other_worker_drops_cached_token(client, make_user):
+    from db import create_session
+    from ORM.authtokens import AuthToken
+    from token_cache import token_cache, record_revocation
+
+    _, headers = make_user()
+    assert client.get("/api/v1/tasks", headers=headers).status_code == 200
+    token_id = headers["Authorization"].split()[1]
+    if token_cache.enabled:
+        assert token_cache.get(token_id) is not None
+
+    # Revoke like another worker does: its cache entry is dropped, this worker's entry is left as is
+    with create_session() as session:
+        session.delete(session.get(AuthToken, token_id))
+        record_revocation(session)
+        session.commit()
+
+    assert client.get("/api/v1/tasks", headers=headers).status_code == 401
+
+
+def test_malformed_token_is_rejected(client):
+    for token in ("short", "X" * 64, "0" * 63 + "g"):
+        response = client.get("/api/v1/tasks", headers={"Authorization": f"Token {token}"})
+        assert response.status_code == 401